@@ -0,0 +1,106 @@
+"""
+Объединение одинаковых одновременных запросов на чтение (single flight).
+
+Пока один поток вычисляет результат по ключу, остальные потоки процесса
+с тем же ключом ждут и получают тот же результат. Между процессами
+(воркерами gunicorn) вычисление защищено короткой блокировкой в кэше
+SINGLE_FLIGHT_CACHE: воркер, получивший блокировку, кладет результат
+в кэш под ключом своей блокировки, остальные ждут его не дольше
+SINGLE_FLIGHT_WAIT_TIMEOUT секунд и после этого вычисляют сами.
+Следующий запрос после завершения вычисления считает заново, поэтому
+ответ устаревает не больше чем на время одного вычисления.
+
+cache.add атомарен в memcached, redis и кэше в БД; в файловом кэше
+(по умолчанию) возможна гонка, при которой результат вычислят
+два воркера.
+"""
+import threading
+import time
+import uuid
+from typing import Any, Callable
+
+from django.conf import settings
+from django.core.cache import caches
+
+POLL_INTERVAL = 0.01
+MISSING = object()
+
+
+class Flight:
+    """Вычисление по ключу, которого ждут другие потоки процесса."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+
+    def __init__(self, prefix: str = 'single_flight'):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.flights = {}
+
+    def do(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Результат compute(), общий для одновременных вызовов с key."""
+        if not settings.SINGLE_FLIGHT_ENABLED:
+            return compute()
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = self.do_shared(key, compute)
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.done.set()
+        return flight.result
+
+    def do_shared(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Вычисление одним воркером из всех, подключенных к кэшу."""
+        cache = caches[settings.SINGLE_FLIGHT_CACHE]
+        lock_key = f'{self.prefix}_lock_{key}'
+        token = uuid.uuid4().hex
+        if cache.add(lock_key, token, settings.SINGLE_FLIGHT_LOCK_TIMEOUT):
+            try:
+                result = compute()
+                cache.set(
+                    f'{self.prefix}_result_{token}', result,
+                    settings.SINGLE_FLIGHT_LOCK_TIMEOUT
+                )
+                return result
+            finally:
+                cache.delete(lock_key)
+        result = self.wait(cache, lock_key)
+        return compute() if result is MISSING else result
+
+    def wait(self, cache, lock_key: str) -> Any:
+        """
+        Ожидание результата воркера, удерживающего блокировку.
+        MISSING, если он не успел за SINGLE_FLIGHT_WAIT_TIMEOUT
+        или завершился ошибкой.
+        """
+        token = cache.get(lock_key)
+        deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT_TIMEOUT
+        while token is not None and time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            # Результат записывается до снятия блокировки.
+            released = cache.get(lock_key) != token
+            result = cache.get(f'{self.prefix}_result_{token}', MISSING)
+            if result is not MISSING or released:
+                return result
+        return MISSING
+
+
+single_flight = SingleFlight()
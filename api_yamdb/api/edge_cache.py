@@ -0,0 +1,99 @@
+"""
+Кэширование анонимных GET-запросов к каталогу на стороне nginx.
+
+API отдает Cache-Control: public, max-age для анонимных запросов
+без строки запроса и Vary: Authorization для всех ответов. nginx
+кэширует ответы в proxy_cache с ключом $request_uri. При изменении
+данных приложение удаляет файлы кэша затронутых адресов из каталога
+EDGE_CACHE_ROOT, общего с nginx: путь к файлу однозначно определяется
+md5 ключа и параметром levels зоны кэша.
+
+Страницы, фильтры и сортировки списков (?offset=, ?genre=, ?ordering=)
+не кэшируются: их ключи нельзя перечислить при очистке, и они
+отдавали бы устаревшие данные до истечения max-age.
+"""
+import hashlib
+import logging
+import os
+from functools import partial
+from typing import Iterable
+
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+
+def is_cacheable(request, response) -> bool:
+    return (
+        request.method in SAFE_METHODS
+        and 'HTTP_AUTHORIZATION' not in request.META
+        and not request.META.get('QUERY_STRING')
+        and response.status_code == 200
+        and settings.EDGE_CACHE_MAX_AGE > 0
+    )
+
+
+def add_cache_headers(request, response) -> None:
+    patch_vary_headers(response, ('Authorization',))
+    if is_cacheable(request, response):
+        patch_cache_control(
+            response, public=True, max_age=settings.EDGE_CACHE_MAX_AGE
+        )
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+
+
+def cache_file_path(uri: str) -> str:
+    """Путь к файлу кэша nginx для ключа uri (proxy_cache_path levels)."""
+    key = hashlib.md5(uri.encode()).hexdigest()
+    parts, end = [], len(key)
+    for level in settings.EDGE_CACHE_LEVELS:
+        parts.append(key[end - level:end])
+        end -= level
+    return os.path.join(settings.EDGE_CACHE_ROOT, *parts, key)
+
+
+def purge(uris: Iterable[str]) -> None:
+    """Удаление из кэша nginx ответов для адресов uris."""
+    for uri in set(uris):
+        try:
+            os.remove(cache_file_path(uri))
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logger.warning('Failed to purge edge cache for %s', uri,
+                           exc_info=True)
+
+
+def schedule_purge(uris: Iterable[str]) -> None:
+    """Очистка кэша после фиксации текущей транзакции."""
+    if settings.EDGE_CACHE_ROOT:
+        transaction.on_commit(partial(purge, list(uris)))
+
+
+def title_uris(*title_ids) -> list:
+    uris = [reverse('api:titles-list')]
+    for pk in title_ids:
+        uris += [
+            reverse('api:titles-detail', args=(pk,)),
+            reverse('api:titles-similar', args=(pk,)),
+        ]
+    return uris
+
+
+def review_uris(title_id, review_id) -> list:
+    return title_uris(title_id) + [
+        reverse('api:reviews-list', args=(title_id,)),
+        reverse('api:reviews-detail', args=(title_id, review_id)),
+    ]
+
+
+def comment_uris(title_id, review_id, comment_id) -> list:
+    return [
+        reverse('api:comments-list', args=(title_id, review_id)),
+        reverse('api:comments-detail', args=(title_id, review_id, comment_id)),
+    ]
@@ -0,0 +1,62 @@
+from typing import List
+
+from django.utils.encoding import smart_str
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+from reviews.slugs import SlugMap
+
+
+class CachedManySlugRelatedField(serializers.ManyRelatedField):
+    """Список slug, разрешаемый одним обращением к SlugMap."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        return self.child_relation.resolve(list(data))
+
+
+class CachedSlugRelatedField(serializers.SlugRelatedField):
+    """
+    SlugRelatedField, разрешающий slug через словарь SlugMap
+    без запроса к базе данных на каждое значение.
+    """
+
+    def __init__(self, slug_map: SlugMap, **kwargs):
+        self.slug_map = slug_map
+        kwargs.setdefault('slug_field', 'slug')
+        if not kwargs.get('read_only'):
+            kwargs.setdefault('queryset', slug_map.model.objects.all())
+        super().__init__(**kwargs)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return CachedManySlugRelatedField(**list_kwargs)
+
+    def to_internal_value(self, data):
+        return self.resolve([data])[0]
+
+    def resolve(self, slugs: List[str]) -> list:
+        if not all(isinstance(slug, str) for slug in slugs):
+            self.fail('invalid')
+        pks = self.slug_map.resolve(slugs)
+        model = self.slug_map.model
+        objs = []
+        for slug in slugs:
+            if slug not in pks:
+                self.fail(
+                    'does_not_exist',
+                    slug_name=self.slug_field,
+                    value=smart_str(slug)
+                )
+            objs.append(model.from_db(
+                self.get_queryset().db,
+                (model._meta.pk.attname, self.slug_field),
+                (pks[slug], slug)
+            ))
+        return objs
@@ -1,12 +1,112 @@
+import math
+
 import django_filters as filters
+from django import forms
+from django.db import connections
+from django.db.models import F
 from reviews.models import Title
+from reviews.slugs import category_slugs, genre_slugs
+
+SLUG_MAPS = {
+    'genre': genre_slugs,
+    'category': category_slugs,
+}
+
+# Допустимые значения ?ordering=. Каждому соответствуют индексы
+# (поле, id) и (category, поле, id) модели Title, сортировки
+# по нескольким полям и по полям без индекса отклоняются, чтобы запрос
+# не сортировал всю таблицу. Произведения без отзывов (rating NULL)
+# считаются самыми низкими.
+TITLE_ORDERINGS = {
+    'rating': (F('rating').asc(nulls_first=True), F('id').asc()),
+    '-rating': (F('rating').desc(nulls_last=True), F('id').desc()),
+    'year': ('year', 'id'),
+    '-year': ('-year', '-id'),
+    'name': ('name', 'id'),
+    '-name': ('-name', '-id'),
+}
+
+
+# Фильтры, которые выбирают строки по своему индексу (или через join
+# жанров): вместе с сортировкой по другому полю выбранные строки
+# пришлось бы сортировать целиком. Значение - поле сортировки,
+# с которой фильтр совместим.
+INDEXED_FILTERS = {
+    'genre': None,
+    'year': 'year',
+    'year__gte': 'year',
+    'year__lte': 'year',
+    'rating__gte': 'rating',
+    'rating__lte': 'rating',
+}
+
+
+class TitleFilterForm(forms.Form):
+
+    def clean(self):
+        data = super().clean()
+        ordering = data.get('ordering')
+        if not ordering:
+            return data
+        conflicts = [
+            name for name, field in INDEXED_FILTERS.items()
+            if data.get(name) not in (None, '')
+            and field != ordering.lstrip('-')
+        ]
+        if conflicts:
+            raise forms.ValidationError(
+                f'Сортировка {ordering} не поддерживается вместе '
+                f'с фильтрами: {", ".join(conflicts)}.'
+            )
+        return data
 
 
 class TitleFilter(filters.FilterSet):
-    genre = filters.CharFilter(field_name='genre__slug')
-    category = filters.CharFilter(field_name='category__slug')
+    genre = filters.CharFilter(field_name='genre', method='filter_genre')
+    category = filters.CharFilter(field_name='category', method='filter_slug')
     name = filters.CharFilter(field_name='name', lookup_expr='contains')
+    year__gte = filters.NumberFilter(field_name='year', lookup_expr='gte')
+    year__lte = filters.NumberFilter(field_name='year', lookup_expr='lte')
+    rating__gte = filters.NumberFilter(
+        field_name='rating', method='filter_rating_gte'
+    )
+    rating__lte = filters.NumberFilter(
+        field_name='rating', method='filter_rating_lte'
+    )
+    ordering = filters.ChoiceFilter(
+        choices=[(value, value) for value in TITLE_ORDERINGS],
+        method='filter_ordering'
+    )
 
     class Meta:
         model = Title
-        fields = '__all__'
+        form = TitleFilterForm
+        exclude = ('genres', 'rating', 'rating_sum', 'rating_count',
+                   'pending_deletion')
+
+    def filter_slug(self, queryset, name, value):
+        """Фильтрация по slug через pk из кэша, без join справочника."""
+        pk = SLUG_MAPS[name].resolve((value,)).get(value)
+        if pk is None:
+            return queryset.none()
+        return queryset.filter(**{name: pk})
+
+    def filter_genre(self, queryset, name, value):
+        """
+        В PostgreSQL - по денормализованному Title.genres (jsonb @>,
+        индекс GIN), в остальных СУБД - через связь genre.
+        """
+        if connections[queryset.db].vendor == 'postgresql':
+            return queryset.filter(genres__contains=[{'slug': value}])
+        return self.filter_slug(queryset, name, value)
+
+    # API отдает целую часть средней оценки, границы рейтинга
+    # сравниваются с ней же.
+    def filter_rating_gte(self, queryset, name, value):
+        return queryset.filter(rating__gte=math.ceil(value))
+
+    def filter_rating_lte(self, queryset, name, value):
+        return queryset.filter(rating__lt=math.floor(value) + 1)
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by(*TITLE_ORDERINGS[value])
@@ -0,0 +1,205 @@
+"""
+Память воркера: RSS/PSS процесса, количество объектов Python по типам
+и прирост выделенной памяти по строкам кода проекта (tracemalloc).
+
+Прирост считается между двумя снимками tracemalloc и относится к самой
+глубокой строке приложений api, reviews и users в стеке выделения,
+поэтому память, выделенная внутри Django по вызову из проекта,
+попадает на строку проекта. Трассировка замедляет каждое выделение
+памяти и включается только на время поиска утечки: эндпоинтом
+/api/v1/memory/snapshot/ или переменной MEMORY_TRACEMALLOC.
+
+При MEMORY_LOG_INTERVAL > 0 каждый воркер gunicorn раз в интервал
+пишет в лог api.memory свою память, самые многочисленные типы объектов
+и прирост по строкам с прошлой записи.
+"""
+import gc
+import logging
+import os
+import resource
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MEMORY_FIELDS = ('Rss', 'Pss', 'Private_Clean', 'Private_Dirty')
+SOURCE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_DIRS = tuple(
+    os.path.join(SOURCE_ROOT, app) + os.sep
+    for app in ('api', 'reviews', 'users')
+)
+
+
+def memory_usage(pid):
+    """Rss, Pss и приватная память процесса в килобайтах."""
+    usage = dict.fromkeys(MEMORY_FIELDS, 0)
+    with open(f'/proc/{pid}/smaps_rollup') as file:
+        for line in file:
+            name, _, value = line.partition(':')
+            if name in usage:
+                usage[name] = int(value.split()[0])
+    usage['Private'] = usage.pop('Private_Clean') + usage.pop('Private_Dirty')
+    return usage
+
+
+def process_memory() -> dict:
+    """
+    Память текущего процесса в килобайтах. Без /proc (не Linux) -
+    только пиковый RSS.
+    """
+    try:
+        return memory_usage(os.getpid())
+    except OSError:
+        return {'MaxRss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+def object_counts(limit: int) -> List[dict]:
+    """Самые многочисленные типы объектов, отслеживаемых сборщиком."""
+    counts = Counter(
+        f'{type(obj).__module__}.{type(obj).__qualname__}'
+        for obj in gc.get_objects()
+    )
+    return [
+        {'type': name, 'count': count}
+        for name, count in counts.most_common(limit)
+    ]
+
+
+def project_snapshot() -> tracemalloc.Snapshot:
+    """
+    Снимок выделений, в стеке которых есть код проекта, без выделений
+    самого этого модуля (отчеты и снимки).
+    """
+    return tracemalloc.take_snapshot().filter_traces([
+        *(tracemalloc.Filter(True, directory + '*', all_frames=True)
+          for directory in PROJECT_DIRS),
+        tracemalloc.Filter(False, __file__, all_frames=True),
+    ])
+
+
+def project_frame(traceback) -> Optional[tracemalloc.Frame]:
+    """Самая глубокая строка проекта в стеке выделения."""
+    for frame in reversed(traceback):
+        if frame.filename.startswith(PROJECT_DIRS):
+            return frame
+    return None
+
+
+def allocation_growth(current, previous, limit: int) -> List[dict]:
+    """Строки проекта с наибольшим приростом памяти между снимками."""
+    sizes = Counter()
+    counts = Counter()
+    for stat in current.compare_to(previous, 'traceback'):
+        frame = project_frame(stat.traceback)
+        if frame is None:
+            continue
+        line = (frame.filename, frame.lineno)
+        sizes[line] += stat.size_diff
+        counts[line] += stat.count_diff
+    return [
+        {
+            'file': os.path.relpath(filename, SOURCE_ROOT),
+            'line': lineno,
+            'size_diff': size,
+            'count_diff': counts[filename, lineno],
+        }
+        for (filename, lineno), size in sizes.most_common(limit)
+        if size > 0
+    ]
+
+
+class AllocationTracker:
+    """Трассировка выделений и снимок, с которым сравнивается текущий."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.baseline = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self) -> None:
+        """Включение трассировки и новый исходный снимок."""
+        with self.lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(settings.MEMORY_TRACEMALLOC_FRAMES)
+            self.baseline = project_snapshot()
+
+    def stop(self) -> None:
+        with self.lock:
+            tracemalloc.stop()
+            self.baseline = None
+
+    def growth(self, limit: int) -> Optional[List[dict]]:
+        """Прирост с исходного снимка, None без трассировки."""
+        with self.lock:
+            if self.baseline is None or not tracemalloc.is_tracing():
+                return None
+            return allocation_growth(
+                project_snapshot(), self.baseline, limit
+            )
+
+
+tracker = AllocationTracker()
+
+
+def memory_report(limit: int) -> dict:
+    traced, peak = tracemalloc.get_traced_memory()
+    return {
+        'pid': os.getpid(),
+        'memory': process_memory(),
+        'objects': object_counts(limit),
+        'tracemalloc': {
+            'tracing': tracker.tracing,
+            'traced': traced,
+            'peak': peak,
+            'growth': tracker.growth(limit),
+        },
+    }
+
+
+def log_memory(interval: float, limit: int) -> None:
+    """Периодическая запись памяти воркера в лог."""
+    previous = project_snapshot() if tracemalloc.is_tracing() else None
+    while True:
+        time.sleep(interval)
+        logger.info(
+            'pid %s memory %s; objects %s', os.getpid(), process_memory(),
+            ', '.join(
+                f'{item["type"]}={item["count"]}'
+                for item in object_counts(limit)
+            )
+        )
+        if not tracemalloc.is_tracing():
+            previous = None
+            continue
+        current = project_snapshot()
+        if previous is not None:
+            for item in allocation_growth(current, previous, limit):
+                logger.info(
+                    'pid %s growth %s:%s %+d B (%+d blocks)', os.getpid(),
+                    item['file'], item['line'], item['size_diff'],
+                    item['count_diff']
+                )
+        previous = current
+
+
+def start_worker_monitoring() -> None:
+    """
+    Запуск в воркере gunicorn: трассировка при MEMORY_TRACEMALLOC
+    и поток записи в лог при MEMORY_LOG_INTERVAL > 0.
+    """
+    if settings.MEMORY_TRACEMALLOC:
+        tracker.start()
+    if settings.MEMORY_LOG_INTERVAL > 0:
+        threading.Thread(
+            target=log_memory,
+            args=(settings.MEMORY_LOG_INTERVAL, settings.MEMORY_REPORT_TOP),
+            name='memory-log', daemon=True
+        ).start()
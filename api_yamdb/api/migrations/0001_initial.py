@@ -0,0 +1,26 @@
+# Generated by Django 3.2 on 2026-10-19 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThrottleBucket',
+            fields=[
+                ('key', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('tokens', models.FloatField()),
+                ('updated', models.FloatField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Корзина ограничения запросов',
+                'verbose_name_plural': 'Корзины ограничения запросов',
+            },
+        ),
+    ]
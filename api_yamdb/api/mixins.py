@@ -1,3 +1,8 @@
+import hashlib
+
+from api.coalescing import single_flight
+from api.edge_cache import add_cache_headers
+from django.http import HttpResponse
 from rest_framework.mixins import (CreateModelMixin, DestroyModelMixin,
                                    ListModelMixin)
 from rest_framework.viewsets import GenericViewSet
@@ -6,3 +11,46 @@ from rest_framework.viewsets import GenericViewSet
 class ModelMixinSet(CreateModelMixin, ListModelMixin,
                     DestroyModelMixin, GenericViewSet):
     pass
+
+
+class EdgeCacheMixin:
+    """Заголовки Cache-Control и Vary для кэширования каталога в nginx."""
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        add_cache_headers(request, response)
+        return response
+
+
+class SingleFlightMixin:
+    """
+    Один расчет ответа на одинаковые одновременные GET-запросы
+    (api.coalescing). Ключ - полный URL запроса и формат ответа, ответ
+    не должен зависеть от пользователя. Общий результат - отрисованный
+    ответ расчета: статус, заголовки и тело.
+    """
+
+    def render(self, request, response):
+        """Отрисовка ответа представления в формате запроса."""
+        response.accepted_renderer = request.accepted_renderer
+        response.accepted_media_type = request.accepted_media_type
+        response.renderer_context = self.get_renderer_context()
+        response.render()
+        return response.status_code, list(response.items()), response.content
+
+    def coalesce(self, request, handler, *args, **kwargs):
+        key = hashlib.md5(
+            f'{request.build_absolute_uri()} {request.accepted_media_type}'
+            .encode()
+        ).hexdigest()
+        status, headers, content = single_flight.do(
+            key, lambda: self.render(
+                request, handler(request, *args, **kwargs)
+            )
+        )
+        response = HttpResponse(content, status=status)
+        for name, value in headers:
+            response[name] = value
+        return response
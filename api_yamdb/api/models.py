@@ -0,0 +1,18 @@
+from django.db import models
+
+
+class ThrottleBucket(models.Model):
+    """
+    Корзина ограничения частоты запросов (api.throttling): остаток
+    токенов по ключу и время последнего списания в секундах Unix.
+    """
+    key = models.CharField(primary_key=True, max_length=100)
+    tokens = models.FloatField()
+    updated = models.FloatField(db_index=True)
+
+    class Meta:
+        verbose_name = 'Корзина ограничения запросов'
+        verbose_name_plural = 'Корзины ограничения запросов'
+
+    def __str__(self):
+        return self.key
@@ -0,0 +1,136 @@
+import binascii
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from typing import List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class AuthorActivityPagination(CursorPagination):
+    """
+    Keyset-пагинация списков отзывов и комментариев автора
+    по индексу (author, -pub_date, -id).
+    """
+    ordering = ('-pub_date', '-id')
+
+    def get_paginated_response(self, data, count=None):
+        return Response(OrderedDict((
+            ('count', count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        )))
+
+
+class SearchPagination:
+    """
+    Keyset-пагинация результатов поиска по ключу (rank, kind, id)
+    последнего результата страницы.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def decode_cursor(self, request) -> Optional[tuple]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            rank, kind, pk = json.loads(b64decode(encoded.encode()))
+            return float(rank), str(kind), int(pk)
+        except (TypeError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row: dict) -> str:
+        key = (row['rank'], row['kind'], row['id'])
+        return b64encode(json.dumps(key).encode()).decode()
+
+    def get_paginated_response(self, request, data, rows: List[dict],
+                               limit: int):
+        next_link = None
+        if len(rows) == limit:
+            next_link = replace_query_param(
+                request.build_absolute_uri(),
+                self.cursor_query_param,
+                self.encode_cursor(rows[-1])
+            )
+        return Response(OrderedDict((
+            ('next', next_link),
+            ('results', data),
+        )))
+
+
+class CursorExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = (
+        'Курсор старше срока хранения журнала изменений, '
+        'нужна полная синхронизация.'
+    )
+    default_code = 'cursor_expired'
+
+
+class ChangeFeedPagination:
+    """
+    Keyset-пагинация журнала изменений по позиции (txid, id) последней
+    записи страницы. В курсоре также хранится время этой записи:
+    курсор старше CHANGE_FEED_RETENTION_DAYS мог пропустить удаленные
+    сжатием отметки об удалении. since=now - курсор последней записи,
+    без результатов.
+    """
+    cursor_query_param = 'since'
+    head_cursor = 'now'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def wants_head(self, request) -> bool:
+        return request.query_params.get(
+            self.cursor_query_param
+        ) == self.head_cursor
+
+    def decode_cursor(self, request) -> Optional[tuple]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            txid, pk, created = json.loads(b64decode(encoded.encode()))
+            position = int(txid), int(pk)
+            created = float(created)
+        except (TypeError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        retention = settings.CHANGE_FEED_RETENTION_DAYS * 24 * 60 * 60
+        if created < timezone.now().timestamp() - retention:
+            raise CursorExpired
+        return position
+
+    def encode_cursor(self, change) -> str:
+        key = (change.txid, change.id, change.created.timestamp())
+        return b64encode(json.dumps(key).encode()).decode()
+
+    def get_paginated_response(self, request, data, changes: list,
+                               limit: int):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if changes:
+            cursor = self.encode_cursor(changes[-1])
+        next_link = None
+        if len(changes) == limit:
+            next_link = replace_query_param(
+                request.build_absolute_uri(), self.cursor_query_param, cursor
+            )
+        return Response(OrderedDict((
+            ('next', next_link),
+            ('cursor', cursor),
+            ('results', data),
+        )))
+
+    def get_head_response(self, change):
+        """Курсор последней записи; None - журнал пуст."""
+        return Response(OrderedDict((
+            ('next', None),
+            ('cursor', change and self.encode_cursor(change)),
+            ('results', []),
+        )))
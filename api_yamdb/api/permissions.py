@@ -9,6 +9,15 @@ class IsAdmin(permissions.BasePermission):
                 and (request.user.is_admin or request.user.is_superuser))
 
 
+class IsModerator(permissions.BasePermission):
+    """Разрешение для модератора, администратора или суперпользователя."""
+
+    def has_permission(self, request, view):
+        return (request.user.is_authenticated
+                and (request.user.is_moderator or request.user.is_admin
+                     or request.user.is_superuser))
+
+
 class IsAdminOrReadOnly(permissions.BasePermission):
     message = 'Изменить контент может только админ.'
 
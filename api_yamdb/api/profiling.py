@@ -0,0 +1,254 @@
+"""
+Профилирование отдельных запросов API по требованию.
+
+Запрос профилируется, если:
+- в заголовке X-Profile передан подписанный токен, выданный
+  администратору эндпоинтом /api/v1/profiles/token/;
+- администратор добавил к запросу параметр ?profile=<режим>;
+- запрос попал в случайную выборку PROFILING_SAMPLE_RATE.
+
+Режимы: cprofile - детерминированный профилировщик (файл .prof для
+pstats/snakeviz), sampling - снимки стека потока запроса раз
+в PROFILING_SAMPLING_INTERVAL секунд (файл collapsed stacks для
+flamegraph/speedscope). Профили хранятся в каталоге PROFILING_ROOT,
+старые удаляются сверх PROFILING_MAX_FILES.
+
+При PROFILING_ENABLED = False middleware отключается при запуске
+и не добавляет к запросам никакой работы.
+"""
+import cProfile
+import glob
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from types import SimpleNamespace
+from typing import List, Optional
+
+from api.permissions import IsAdmin
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from users.models import User
+
+HEADER = 'X-Profile'
+QUERY_PARAM = 'profile'
+SIGNING_SALT = 'api.profiling'
+PROFILE_ID_PATTERN = r'\d{20}-[0-9a-f]{8}'
+
+
+class DeterministicProfiler:
+    """cProfile: все вызовы функций потока запроса."""
+    mode = 'cprofile'
+    extension = '.prof'
+
+    def __enter__(self):
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profile.disable()
+
+    def dump(self, path: str) -> None:
+        self.profile.dump_stats(path)
+
+
+class SamplingProfiler:
+    """
+    Снимки стека потока запроса из отдельного потока. Накладные
+    расходы не зависят от числа вызовов функций.
+    """
+    mode = 'sampling'
+    extension = '.txt'
+
+    def __enter__(self):
+        self.stacks = Counter()
+        self.thread_id = threading.get_ident()
+        self.stopped = threading.Event()
+        self.sampler = threading.Thread(target=self.sample, daemon=True)
+        self.sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.sampler.join()
+
+    def sample(self):
+        while not self.stopped.wait(settings.PROFILING_SAMPLING_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f'{code.co_name} '
+                    f'({code.co_filename}:{code.co_firstlineno})'
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump(self, path: str) -> None:
+        with open(path, 'w') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f'{stack} {count}\n')
+
+
+PROFILERS = {
+    profiler.mode: profiler
+    for profiler in (DeterministicProfiler, SamplingProfiler)
+}
+
+
+class ProfileStore:
+    """
+    Кольцо профилей на диске: файл профиля и JSON с описанием запроса,
+    самые старые удаляются сверх PROFILING_MAX_FILES.
+    """
+
+    @property
+    def root(self) -> str:
+        return settings.PROFILING_ROOT
+
+    def meta_path(self, profile_id: str) -> str:
+        return os.path.join(self.root, f'{profile_id}.json')
+
+    def save(self, request, response, profiler, duration: float) -> str:
+        os.makedirs(self.root, exist_ok=True)
+        now = time.time()
+        profile_id = (
+            f'{time.strftime("%Y%m%d%H%M%S", time.gmtime(now))}'
+            f'{int(now % 1 * 1000000):06d}-{uuid.uuid4().hex[:8]}'
+        )
+        filename = profile_id + profiler.extension
+        profiler.dump(os.path.join(self.root, filename))
+        meta = {
+            'id': profile_id,
+            'created': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 1),
+            'mode': profiler.mode,
+            'file': filename,
+        }
+        # Описание пишется последним: список видит только полные профили.
+        with open(self.meta_path(profile_id), 'w') as file:
+            json.dump(meta, file)
+        self.trim()
+        return profile_id
+
+    def ids(self) -> List[str]:
+        """id профилей от новых к старым."""
+        return sorted(
+            (os.path.basename(path)[:-len('.json')]
+             for path in glob.glob(os.path.join(self.root, '*.json'))),
+            reverse=True
+        )
+
+    def trim(self) -> None:
+        for profile_id in self.ids()[settings.PROFILING_MAX_FILES:]:
+            meta = self.get(profile_id)
+            paths = [self.meta_path(profile_id)]
+            if meta is not None:
+                paths.append(os.path.join(self.root, meta['file']))
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    # Удален другим воркером.
+                    pass
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        try:
+            with open(self.meta_path(profile_id)) as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def list(self) -> List[dict]:
+        return [
+            meta for meta in map(self.get, self.ids()) if meta is not None
+        ]
+
+    def file_path(self, meta: dict) -> str:
+        return os.path.join(self.root, meta['file'])
+
+
+store = ProfileStore()
+
+
+def make_token(user, mode: str) -> str:
+    """Подписанный токен для заголовка X-Profile."""
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign(
+        f'{user.pk}:{mode}'
+    )
+
+
+def is_admin(user) -> bool:
+    return IsAdmin().has_permission(SimpleNamespace(user=user), None)
+
+
+class ProfilingMiddleware:
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = self.requested_mode(request)
+        if mode is None:
+            return self.get_response(request)
+        started = time.perf_counter()
+        with PROFILERS[mode]() as profiler:
+            response = self.get_response(request)
+        response[HEADER + '-Id'] = store.save(
+            request, response, profiler, time.perf_counter() - started
+        )
+        return response
+
+    def requested_mode(self, request) -> Optional[str]:
+        token = request.headers.get(HEADER)
+        if token:
+            return self.token_mode(token)
+        mode = request.GET.get(QUERY_PARAM)
+        if mode:
+            if mode in PROFILERS and self.is_admin_request(request):
+                return mode
+            return None
+        rate = settings.PROFILING_SAMPLE_RATE
+        if rate and random.random() < rate:
+            return settings.PROFILING_SAMPLE_MODE
+        return None
+
+    def token_mode(self, token: str) -> Optional[str]:
+        try:
+            value = signing.TimestampSigner(salt=SIGNING_SALT).unsign(
+                token, max_age=settings.PROFILING_TOKEN_MAX_AGE
+            )
+        except signing.BadSignature:
+            return None
+        pk, _, mode = value.partition(':')
+        user = User.objects.filter(pk=pk).first()
+        if mode in PROFILERS and user is not None and is_admin(user):
+            return mode
+        return None
+
+    def is_admin_request(self, request) -> bool:
+        """Администратор по JWT или по сессии админки."""
+        try:
+            result = JWTAuthentication().authenticate(request)
+        except APIException:
+            return False
+        if result:
+            return is_admin(result[0])
+        # В профиле api_yamdb.settings_api сессий и request.user нет.
+        return hasattr(request, 'user') and is_admin(request.user)
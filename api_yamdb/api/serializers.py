@@ -1,9 +1,15 @@
+from api.fields import CachedSlugRelatedField
+from api.profiling import PROFILERS
 from api.validators import me_name_forbidden
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import DatabaseError, connection, transaction
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
-from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.models import (CatalogStat, Category, Change, Comment, Genre,
+                            ModerationJob, Review, Title)
+from reviews.slugs import category_slugs, genre_slugs
 
 User = get_user_model()
 
@@ -67,29 +73,32 @@ class GenreSerializer(serializers.ModelSerializer):
 
 
 class TitlesReadSerializer(serializers.ModelSerializer):
-    genre = GenreSerializer(read_only=True, many=True)
+    genre = serializers.JSONField(source='genres', read_only=True)
     category = CategorySerializer(read_only=True)
     rating = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Title
-        fields = '__all__'
+        exclude = ('genres', 'pending_deletion')
+
+
+class SimilarTitleSerializer(TitlesReadSerializer):
+    similarity = serializers.FloatField(read_only=True)
 
 
 class TitlesEditorSerializer(serializers.ModelSerializer):
-    genre = serializers.SlugRelatedField(
-        slug_field='slug',
-        queryset=Genre.objects.all(),
+    genre = CachedSlugRelatedField(
+        slug_map=genre_slugs,
         many=True
     )
-    category = serializers.SlugRelatedField(
-        slug_field='slug',
-        queryset=Category.objects.all(),
+    category = CachedSlugRelatedField(
+        slug_map=category_slugs,
     )
 
     class Meta:
         model = Title
-        fields = '__all__'
+        exclude = ('genres', 'rating', 'rating_sum', 'rating_count',
+                   'pending_deletion')
 
 
 class CurrentTitleDefault:
@@ -128,6 +137,24 @@ class ReviewSerializer(serializers.ModelSerializer):
         )
 
 
+class AuthorReviewSerializer(ReviewSerializer):
+    """Сериализатор для списка отзывов пользователя."""
+    title = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    class Meta(ReviewSerializer.Meta):
+        validators = ()
+
+
+class ReviewUpsertSerializer(ReviewSerializer):
+    """
+    Сериализатор для эндпоинта создания или обновления своего отзыва.
+    Уникальность пары (title, author) обеспечивает сам запрос upsert.
+    """
+
+    class Meta(ReviewSerializer.Meta):
+        validators = ()
+
+
 class CommentSerializer(serializers.ModelSerializer):
     """Сериализатор модели Comment."""
     author = serializers.SlugRelatedField(
@@ -138,3 +165,151 @@ class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = '__all__'
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    """Параметры эндпоинта полнотекстового поиска."""
+    q = serializers.CharField(max_length=200)
+    type = serializers.ChoiceField(
+        choices=('review', 'comment'), required=False
+    )
+    title = serializers.IntegerField(required=False)
+    author = serializers.RegexField(
+        regex=r'^[\w.@+-]+$',
+        max_length=150,
+        required=False
+    )
+    pub_date_after = serializers.DateTimeField(required=False)
+    pub_date_before = serializers.DateTimeField(required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+
+class AutocompleteQuerySerializer(serializers.Serializer):
+    """Параметры эндпоинта автодополнения."""
+    q = serializers.CharField(max_length=200)
+    type = serializers.ChoiceField(
+        choices=('title', 'genre', 'category'), required=False
+    )
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.AUTOCOMPLETE_MAX_LIMIT,
+        default=settings.AUTOCOMPLETE_LIMIT
+    )
+
+
+class SearchResultSerializer(serializers.Serializer):
+    """Сериализатор результата полнотекстового поиска."""
+    type = serializers.CharField(source='kind')
+    id = serializers.IntegerField()
+    title = serializers.IntegerField()
+    review = serializers.IntegerField(allow_null=True)
+    author = serializers.CharField()
+    text = serializers.CharField()
+    pub_date = serializers.DateTimeField()
+    rank = serializers.FloatField()
+
+
+class CatalogStatSerializer(serializers.ModelSerializer):
+    """Сериализатор статистики каталога."""
+
+    class Meta:
+        model = CatalogStat
+        exclude = ('id',)
+
+
+class ProfilingTokenSerializer(serializers.Serializer):
+    mode = serializers.ChoiceField(
+        choices=tuple(PROFILERS), default='cprofile'
+    )
+
+
+class ProfileSerializer(serializers.Serializer):
+    id = serializers.CharField()
+    created = serializers.DateTimeField()
+    method = serializers.CharField()
+    path = serializers.CharField()
+    status = serializers.IntegerField()
+    duration_ms = serializers.FloatField()
+    mode = serializers.CharField()
+
+
+class SlowQuerySerializer(serializers.Serializer):
+    fingerprint = serializers.CharField()
+    sql = serializers.CharField()
+    count = serializers.IntegerField()
+    total_ms = serializers.FloatField()
+    max_ms = serializers.FloatField()
+    last_seen = serializers.DateTimeField()
+    origins = serializers.DictField(child=serializers.IntegerField())
+    plan = serializers.CharField(allow_null=True)
+
+
+class ChangeSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='object_id')
+
+    class Meta:
+        model = Change
+        fields = ('model', 'id', 'action', 'data', 'created')
+
+
+class ModerationJobSerializer(serializers.ModelSerializer):
+    """
+    Задание массового удаления. Хотя бы один из фильтров author,
+    pub_date_after, pub_date_before, text_pattern обязателен.
+    """
+    type = serializers.ChoiceField(
+        source='kind', choices=ModerationJob.KINDS, required=False,
+        allow_blank=True
+    )
+    author = serializers.SlugRelatedField(
+        slug_field='username', queryset=User.objects.all(), required=False
+    )
+    created_by = serializers.SlugRelatedField(
+        slug_field='username', read_only=True
+    )
+
+    class Meta:
+        model = ModerationJob
+        fields = (
+            'id', 'type', 'author', 'pub_date_after', 'pub_date_before',
+            'text_pattern', 'status', 'reviews_matched',
+            'comments_matched', 'reviews_deleted', 'comments_deleted',
+            'error', 'created_by', 'created', 'updated', 'finished',
+        )
+        read_only_fields = (
+            'status', 'reviews_matched', 'comments_matched',
+            'reviews_deleted', 'comments_deleted', 'error', 'created',
+            'updated', 'finished',
+        )
+
+    def validate_text_pattern(self, value):
+        """
+        Выражение проверяет сама СУБД тем же оператором, что и фильтр
+        задания (~* в PostgreSQL): ее синтаксис отличается от модуля re.
+        """
+        if not value:
+            return value
+        lookup = connection.operators['iregex']
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f'SELECT %s {lookup}', ('', value))
+        except DatabaseError as error:
+            raise serializers.ValidationError(
+                f'Неверное регулярное выражение: {error}'
+            )
+        return value
+
+    def validate(self, data):
+        if not any(data.get(field) for field in (
+            'author', 'pub_date_after', 'pub_date_before', 'text_pattern'
+        )):
+            raise serializers.ValidationError(
+                'Укажите автора, период публикации или регулярное '
+                'выражение по тексту.'
+            )
+        after, before = data.get('pub_date_after'), data.get('pub_date_before')
+        if after and before and after > before:
+            raise serializers.ValidationError(
+                'pub_date_after должна быть не позже pub_date_before.'
+            )
+        return data
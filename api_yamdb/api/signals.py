@@ -0,0 +1,61 @@
+from api.edge_cache import (comment_uris, review_uris, schedule_purge,
+                            title_uris)
+from django.conf import settings
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from django.urls import reverse
+from reviews.models import Category, Comment, Genre, Review, Title
+
+
+@receiver((post_save, post_delete), sender=Title)
+def purge_title(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_purge(title_uris(instance.pk))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def purge_title_genres(sender, instance, action, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if kwargs['reverse']:
+        schedule_purge(title_uris(*(pk_set or ())))
+    else:
+        schedule_purge(title_uris(instance.pk))
+
+
+@receiver((post_save, pre_delete), sender=Category)
+@receiver((post_save, pre_delete), sender=Genre)
+def purge_catalog_group(sender, instance, raw=False, created=False,
+                        **kwargs):
+    if raw or not settings.EDGE_CACHE_ROOT:
+        return
+    name = 'categories' if sender is Category else 'genres'
+    title_ids = () if created else instance.titles.values_list(
+        'pk', flat=True
+    )
+    schedule_purge(
+        [reverse(f'api:{name}-list')] + title_uris(*title_ids)
+    )
+
+
+@receiver((post_save, post_delete), sender=Review)
+def purge_review(sender, instance, raw=False, **kwargs):
+    if not raw and instance.title_id is not None:
+        schedule_purge(review_uris(instance.title_id, instance.pk))
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def purge_comment(sender, instance, raw=False, **kwargs):
+    if raw or not settings.EDGE_CACHE_ROOT:
+        return
+    if Comment.review.is_cached(instance):
+        title_id = instance.review.title_id
+    else:
+        title_id = Review.objects.filter(
+            pk=instance.review_id
+        ).values_list('title_id', flat=True).first()
+    if title_id is not None:
+        schedule_purge(
+            comment_uris(title_id, instance.review_id, instance.pk)
+        )
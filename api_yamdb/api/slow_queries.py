@@ -0,0 +1,252 @@
+"""
+Журнал медленных запросов к базе.
+
+SlowQueryMiddleware оборачивает выполнение SQL (execute_wrapper) всех
+соединений на время запроса к сайту и записывает каждый запрос дольше
+SLOW_QUERY_THRESHOLD_MS вместе с представлением, которое его выполнило
+(метод и имя маршрута, например GET api:titles-list или
+admin:reviews_title_changelist), и отпечатком - текстом SQL, в котором
+литералы и списки IN заменены на ?. По отпечатку одинаковые запросы
+с разными параметрами складываются в одну строку таблицы: количество,
+суммарное и максимальное время, представления. При SLOW_QUERY_EXPLAIN
+к новой строке таблицы сохраняется план запроса (EXPLAIN без ANALYZE,
+сам запрос повторно не выполняется).
+
+Таблица хранится в памяти воркера, не больше SLOW_QUERY_MAX_ENTRIES
+отпечатков (давно не встречавшиеся вытесняются), и доступна
+администратору по адресу /api/v1/slow-queries/. Каждый медленный
+запрос также пишется в лог api.slow_queries.
+
+В тестах: with capture(SlowQueryLog(threshold_ms=...)) as log: ...,
+затем log.assert_no_new(known) - падение на незнакомых отпечатках.
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import ExitStack, contextmanager
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+EXPLAIN_PREFIXES = {
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+MAX_ORIGINS = 10
+
+NORMALIZE = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\bIN \((?:\?, )*\?\)', re.IGNORECASE), 'IN (...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+local = threading.local()
+
+
+def normalize(sql: str) -> str:
+    """SQL без литералов и параметров: одинаков для любых значений."""
+    for pattern, replacement in NORMALIZE:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def digest(normalized: str) -> str:
+    """Отпечаток нормализованного SQL."""
+    return hashlib.md5(normalized.encode()).hexdigest()[:16]
+
+
+def current_origin() -> Optional[str]:
+    """Представление, выполняющее запрос в этом потоке."""
+    request = getattr(local, 'request', None)
+    if request is None:
+        return None
+    match = request.resolver_match
+    if match is None:
+        return f'{request.method} {request.path}'
+    return f'{request.method} {match.view_name}'
+
+
+def explain_plan(connection, sql: str, params) -> Optional[str]:
+    """План запроса SELECT, None для остальных запросов и ошибок."""
+    prefix = EXPLAIN_PREFIXES.get(connection.vendor)
+    words = sql.split(None, 1)
+    if prefix is None or not words or words[0].upper() not in (
+        'SELECT', 'WITH'
+    ):
+        return None
+    # Курсор бэкенда, а не CursorWrapper: мимо execute_wrapper
+    # и без потери результатов исходного запроса.
+    cursor = connection.create_cursor()
+    try:
+        savepoint = (
+            connection.savepoint() if connection.in_atomic_block else None
+        )
+        try:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+        except DatabaseError:
+            # Ошибка EXPLAIN не должна прерывать транзакцию запроса.
+            if savepoint is not None:
+                connection.savepoint_rollback(savepoint)
+            return None
+        if savepoint is not None:
+            connection.savepoint_commit(savepoint)
+        return '\n'.join(str(row[-1]) for row in rows)
+    finally:
+        cursor.close()
+
+
+class SlowQueryLog:
+    """
+    Агрегаты медленных запросов по отпечаткам. Параметры, не заданные
+    явно, берутся из настроек SLOW_QUERY_*.
+    """
+
+    def __init__(self, threshold_ms: Optional[float] = None,
+                 explain: Optional[bool] = None,
+                 max_entries: Optional[int] = None):
+        self._threshold_ms = threshold_ms
+        self._explain = explain
+        self._max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    @property
+    def threshold_ms(self) -> float:
+        if self._threshold_ms is None:
+            return settings.SLOW_QUERY_THRESHOLD_MS
+        return self._threshold_ms
+
+    @property
+    def explain(self) -> bool:
+        if self._explain is None:
+            return settings.SLOW_QUERY_EXPLAIN
+        return self._explain
+
+    @property
+    def max_entries(self) -> int:
+        if self._max_entries is None:
+            return settings.SLOW_QUERY_MAX_ENTRIES
+        return self._max_entries
+
+    def record(self, connection, sql: str, params, duration_ms: float,
+               origin: Optional[str]) -> None:
+        normalized = normalize(sql)
+        key = digest(normalized)
+        with self.lock:
+            entry = self.entries.get(key)
+            new = entry is None
+            if new:
+                entry = self.entries[key] = {
+                    'fingerprint': key,
+                    'sql': normalized,
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'origins': Counter(),
+                    'plan': None,
+                }
+            self.entries.move_to_end(key)
+            entry['count'] += 1
+            entry['total_ms'] += duration_ms
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+            entry['last_seen'] = timezone.now()
+            if origin in entry['origins'] or len(
+                entry['origins']
+            ) < MAX_ORIGINS:
+                entry['origins'][origin] += 1
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        logger.warning('Slow query %.1f ms [%s] %s: %s',
+                       duration_ms, key, origin, normalized)
+        if new and self.explain:
+            entry['plan'] = explain_plan(connection, sql, params)
+
+    def wrapper(self, execute, sql, params, many, context):
+        if getattr(local, 'explaining', False):
+            return execute(sql, params, many, context)
+        with self.timer(context['connection'], sql,
+                        None if many else params):
+            return execute(sql, params, many, context)
+
+    @contextmanager
+    def timer(self, connection, sql: str, params):
+        """Запись запроса, если он выполнился дольше порога."""
+        started = time.perf_counter()
+        yield
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms < self.threshold_ms:
+            return
+        local.explaining = True
+        try:
+            self.record(connection, sql, params, duration_ms,
+                        current_origin())
+        finally:
+            local.explaining = False
+
+    def list(self) -> List[dict]:
+        """Отпечатки по убыванию суммарного времени."""
+        with self.lock:
+            entries = [
+                dict(entry, origins=dict(entry['origins']))
+                for entry in self.entries.values()
+            ]
+        return sorted(entries, key=lambda entry: -entry['total_ms'])
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def assert_no_new(self, known: Iterable[str] = ()) -> None:
+        """AssertionError, если записаны отпечатки не из known."""
+        known = set(known)
+        new = [
+            entry for entry in self.list()
+            if entry['fingerprint'] not in known
+        ]
+        if new:
+            raise AssertionError('Новые медленные запросы:\n' + '\n'.join(
+                f'[{entry["fingerprint"]}] {entry["max_ms"]:.1f} ms '
+                f'{", ".join(map(str, entry["origins"]))}: {entry["sql"]}'
+                + (f'\n{entry["plan"]}' if entry['plan'] else '')
+                for entry in new
+            ))
+
+
+slow_queries = SlowQueryLog()
+
+
+@contextmanager
+def capture(log: SlowQueryLog):
+    """Запись медленных запросов всех соединений текущего потока."""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(log.wrapper))
+        yield log
+
+
+class SlowQueryMiddleware:
+
+    def __init__(self, get_response):
+        if not settings.SLOW_QUERY_LOG_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        local.request = request
+        try:
+            with capture(slow_queries):
+                return self.get_response(request)
+        finally:
+            local.request = None
@@ -0,0 +1,153 @@
+import hashlib
+from typing import Iterable, List, Optional
+
+from api.models import ThrottleBucket
+from django.db import transaction
+from rest_framework import permissions
+from rest_framework.throttling import SimpleRateThrottle
+
+
+def take_tokens(keys: Iterable[str], capacity: int, duration: int,
+                now: float) -> float:
+    """
+    Списание токена из каждой корзины keys, если токены есть во всех;
+    иначе ничего не списывается и возвращается время ожидания в секундах.
+
+    Строки корзин блокируются в порядке ключей (SELECT ... FOR UPDATE),
+    поэтому одновременные запросы разных воркеров не теряют списаний
+    и не взаимоблокируются, а запросы с общим ключом ждут друг друга.
+    Проверка - пишущая транзакция в основной базе, ее стоимость
+    замеряет команда benchmark_throttle. Корзины не вытесняются:
+    неактивные удаляет команда purge_throttle.
+    """
+    keys = sorted(set(keys))
+    refill = capacity / duration
+    with transaction.atomic():
+        ThrottleBucket.objects.bulk_create(
+            [ThrottleBucket(key=key, tokens=capacity, updated=now)
+             for key in keys],
+            ignore_conflicts=True
+        )
+        buckets = list(ThrottleBucket.objects.select_for_update().filter(
+            key__in=keys
+        ).order_by('key'))
+        wait = 0.0
+        for bucket in buckets:
+            bucket.tokens = min(
+                capacity,
+                bucket.tokens + max(0.0, now - bucket.updated) * refill
+            )
+            bucket.updated = now
+            if bucket.tokens < 1:
+                wait = max(wait, (1 - bucket.tokens) / refill)
+        if wait:
+            return wait
+        for bucket in buckets:
+            bucket.tokens -= 1
+        ThrottleBucket.objects.bulk_update(buckets, ('tokens', 'updated'))
+    return 0.0
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Ограничение частоты запросов по алгоритму token bucket.
+
+    Для каждого ключа в таблице ThrottleBucket хранится только пара
+    (остаток токенов, время последнего обращения), поэтому проверка
+    занимает одну транзакцию независимо от частоты запросов. Запрос
+    ограничивается, если хотя бы для одного из ключей (IP, username,
+    email и т.п.) токены закончились.
+    Частота задается через REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'][scope],
+    значение None отключает ограничение.
+    """
+    key_format = '%(scope)s:%(kind)s:%(ident)s'
+
+    def get_idents(self, request, view) -> List[str]:
+        """
+        Список ключей вида '<тип>:<значение>' для текущего запроса,
+        по умолчанию - IP клиента.
+        """
+        return [f'ip:{self.get_ident(request)}']
+
+    def get_bucket_keys(self, request, view) -> List[str]:
+        keys = []
+        for ident in self.get_idents(request, view):
+            kind, _, value = ident.partition(':')
+            if value:
+                keys.append(self.key_format % {
+                    'scope': self.scope,
+                    'kind': kind,
+                    'ident': hashlib.md5(
+                        value.lower().encode()
+                    ).hexdigest(),
+                })
+        return keys
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        keys = self.get_bucket_keys(request, view)
+        if not keys:
+            return True
+        self.now = self.timer()
+        wait = take_tokens(keys, self.num_requests, self.duration, self.now)
+        if wait:
+            self.wait_time = wait
+            return False
+        return True
+
+    def wait(self) -> Optional[float]:
+        return getattr(self, 'wait_time', None)
+
+    def get_ident_value(self, request, field: str) -> Optional[str]:
+        # Тело запроса может быть списком или строкой JSON: тогда
+        # ключа нет, а ошибку формата вернет сериализатор.
+        if not isinstance(request.data, dict):
+            return None
+        value = request.data.get(field)
+        return value if isinstance(value, str) else None
+
+
+class SignupThrottle(TokenBucketThrottle):
+    """Ограничение регистрации по IP, username и email."""
+    scope = 'signup'
+
+    def get_idents(self, request, view):
+        return [
+            f'ip:{self.get_ident(request)}',
+            f'username:{self.get_ident_value(request, "username") or ""}',
+            f'email:{self.get_ident_value(request, "email") or ""}',
+        ]
+
+
+class ObtainTokenThrottle(TokenBucketThrottle):
+    """Ограничение получения токена по IP и username."""
+    scope = 'token'
+
+    def get_idents(self, request, view):
+        return [
+            f'ip:{self.get_ident(request)}',
+            f'username:{self.get_ident_value(request, "username") or ""}',
+        ]
+
+
+class WriteThrottle(TokenBucketThrottle):
+    """
+    Ограничение изменяющих запросов пользователя.
+    Безопасные методы не ограничиваются.
+    """
+
+    def get_idents(self, request, view):
+        if request.method in permissions.SAFE_METHODS:
+            return []
+        if request.user.is_authenticated:
+            return [f'user:{request.user.pk}']
+        return [f'ip:{self.get_ident(request)}']
+
+
+class ReviewWriteThrottle(WriteThrottle):
+    scope = 'review_write'
+
+
+class CommentWriteThrottle(WriteThrottle):
+    scope = 'comment_write'
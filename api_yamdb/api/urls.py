@@ -1,9 +1,12 @@
-from api.views import ObtainTokenView, SignupView
+from api.views import (AutocompleteStatsView, AutocompleteView,
+                       ObtainTokenView, SearchView, SignupView)
 from django.urls import include, path
 from rest_framework import routers
 
-from .views import (CategoriesViewSet, CommentViewSet, GenresViewSet,
-                    ReviewViewSet, TitleViewSet, UserViewSet)
+from .views import (CatalogStatViewSet, CategoriesViewSet, ChangeViewSet,
+                    CommentViewSet, GenresViewSet, MemoryViewSet,
+                    ModerationJobViewSet, ProfileViewSet, ReviewViewSet,
+                    SlowQueryViewSet, TitleViewSet, UserViewSet)
 
 app_name = 'api'
 
@@ -18,10 +21,20 @@ router.register(
     CommentViewSet, 'comments'
 )
 router.register(r'users', UserViewSet, 'users')
+router.register('stats', CatalogStatViewSet, 'stats')
+router.register('profiles', ProfileViewSet, 'profiles')
+router.register('memory', MemoryViewSet, 'memory')
+router.register('slow-queries', SlowQueryViewSet, 'slow-queries')
+router.register('changes', ChangeViewSet, 'changes')
+router.register('moderation', ModerationJobViewSet, 'moderation')
 
 
 urlpatterns = [
     path('v1/', include(router.urls)),
     path('v1/auth/signup/', SignupView.as_view(), name='signup'),
     path('v1/auth/token/', ObtainTokenView.as_view(), name='obtain_token'),
+    path('v1/search/', SearchView.as_view(), name='search'),
+    path('v1/autocomplete/', AutocompleteView.as_view(), name='autocomplete'),
+    path('v1/autocomplete/stats/', AutocompleteStatsView.as_view(),
+         name='autocomplete_stats'),
 ]
@@ -1,24 +1,45 @@
 from api.filters import TitleFilter
-from api.mixins import ModelMixinSet
+from api.memory import memory_report, tracker
+from api.mixins import EdgeCacheMixin, ModelMixinSet, SingleFlightMixin
+from api.pagination import (AuthorActivityPagination, ChangeFeedPagination,
+                            SearchPagination)
 from api.permissions import (CreateAndUpdatePermission, IsAdmin,
-                             IsAdminOrReadOnly)
-from api.serializers import (CategorySerializer, CommentSerializer,
+                             IsAdminOrReadOnly, IsModerator)
+from api.profiling import HEADER, PROFILE_ID_PATTERN, make_token, store
+from api.serializers import (AuthorReviewSerializer,
+                             AutocompleteQuerySerializer,
+                             CatalogStatSerializer, CategorySerializer,
+                             ChangeSerializer, CommentSerializer,
                              GenreSerializer, MeUserSerializer,
-                             ObtainTokenSerializer, ReviewSerializer,
+                             ModerationJobSerializer, ObtainTokenSerializer,
+                             ProfileSerializer, ProfilingTokenSerializer,
+                             ReviewSerializer, ReviewUpsertSerializer,
+                             SearchQuerySerializer, SearchResultSerializer,
+                             SimilarTitleSerializer, SlowQuerySerializer,
                              TitlesEditorSerializer, TitlesReadSerializer,
                              UserSerializer, UserSignupSerializer)
+from api.slow_queries import slow_queries
+from api.throttling import (CommentWriteThrottle, ObtainTokenThrottle,
+                            ReviewWriteThrottle, SignupThrottle)
 from api.utils import get_token, send_confirmation_code
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import IntegrityError
-from django.db.models import Avg
+from django.db.models import F
+from django.http import FileResponse, Http404
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, status, viewsets
+from rest_framework import filters, mixins, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from reviews.models import Category, Genre, Review, Title
+from reviews import moderation
+from reviews.autocomplete import autocomplete
+from reviews.changes import feed, head
+from reviews.models import (CatalogStat, Category, Genre, ModerationJob,
+                            Review, Title)
+from reviews.search import search
 
 User = get_user_model()
 
@@ -26,6 +47,7 @@ User = get_user_model()
 class SignupView(APIView):
     """Регистрация пользователя и получение кода подтверждения."""
     permission_classes = (AllowAny,)
+    throttle_classes = (SignupThrottle,)
 
     def post(self, request):
         serializer = UserSignupSerializer(data=request.data)
@@ -51,6 +73,7 @@ class SignupView(APIView):
 class ObtainTokenView(APIView):
     """Получение токена по имени пользователя и коду подтверждения."""
     permission_classes = (AllowAny,)
+    throttle_classes = (ObtainTokenThrottle,)
 
     def post(self, request):
         serializer = ObtainTokenSerializer(data=request.data)
@@ -80,9 +103,68 @@ class ObtainTokenView(APIView):
         return Response({'token': f'{token}'}, status=status.HTTP_200_OK)
 
 
+class SearchView(APIView):
+    """Полнотекстовый поиск по отзывам и комментариям."""
+    permission_classes = (AllowAny,)
+
+    def get(self, request):
+        serializer = SearchQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        params = serializer.validated_data
+        paginator = SearchPagination()
+        rows = search(
+            query=params['q'],
+            kind=params.get('type'),
+            title_id=params.get('title'),
+            author=params.get('author'),
+            pub_date_after=params.get('pub_date_after'),
+            pub_date_before=params.get('pub_date_before'),
+            after=paginator.decode_cursor(request),
+            limit=params['limit'],
+        )
+        return paginator.get_paginated_response(
+            request,
+            SearchResultSerializer(rows, many=True).data,
+            rows,
+            params['limit']
+        )
+
+
+class AutocompleteView(APIView):
+    """
+    Автодополнение названий произведений, жанров и категорий
+    из индекса воркера (reviews.autocomplete).
+    """
+    permission_classes = (AllowAny,)
+
+    def get(self, request):
+        serializer = AutocompleteQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        params = serializer.validated_data
+        return Response({'results': autocomplete.lookup(
+            params['q'], params.get('type'), params['limit']
+        )})
+
+
+class AutocompleteStatsView(APIView):
+    """Размер и память индекса автодополнения воркера."""
+    permission_classes = (IsAdmin,)
+
+    def get(self, request):
+        return Response(autocomplete.stats())
+
+
 class UserViewSet(viewsets.ModelViewSet):
     """Управление пользователями."""
-    queryset = User.objects.all()
+    queryset = User.objects.filter(pending_deletion=False)
     serializer_class = UserSerializer
     permission_classes = (IsAdmin,)
     filter_backends = (filters.SearchFilter,)
@@ -111,8 +193,63 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer = MeUserSerializer(request.user)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    def get_author(self):
+        """Пользователь из url, для username 'me' - текущий пользователь."""
+        username = self.kwargs.get(self.lookup_field)
+        if username == 'me':
+            return self.request.user
+        return get_object_or_404(self.get_queryset(), username=username)
+
+    def perform_destroy(self, instance):
+        instance.request_deletion()
+
+    def list_author_activity(self, queryset, title_lookup, serializer_class,
+                             count):
+        """
+        Список без отзывов и комментариев к скрытым произведениям.
+        Счетчик автора учитывает их до process_deletions, поэтому они
+        вычитаются из него: скрытых произведений мало.
+        """
+        hidden = {f'{title_lookup}__in': Title.all_objects.filter(
+            pending_deletion=True
+        ).values('pk')}
+        count -= queryset.filter(**hidden).count()
+        queryset = queryset.exclude(**hidden)
+        paginator = AuthorActivityPagination()
+        page = paginator.paginate_queryset(queryset, self.request, view=self)
+        serializer = serializer_class(
+            page, many=True, context=self.get_serializer_context()
+        )
+        return paginator.get_paginated_response(serializer.data, count=count)
+
+    @action(
+        detail=True, methods=('get',),
+        permission_classes=(IsAuthenticated,)
+    )
+    def reviews(self, request, username):
+        """Отзывы пользователя, начиная с последних."""
+        author = self.get_author()
+        return self.list_author_activity(
+            author.reviews.select_related('author'), 'title',
+            AuthorReviewSerializer,
+            author.reviews_count
+        )
+
+    @action(
+        detail=True, methods=('get',),
+        permission_classes=(IsAuthenticated,)
+    )
+    def comments(self, request, username):
+        """Комментарии пользователя, начиная с последних."""
+        author = self.get_author()
+        return self.list_author_activity(
+            author.comments.select_related('author'), 'review__title',
+            CommentSerializer,
+            author.comments_count
+        )
+
 
-class CategoriesViewSet(ModelMixinSet):
+class CategoriesViewSet(EdgeCacheMixin, ModelMixinSet):
     """Получить список всех категорий. Права доступа: Доступно без токена."""
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
@@ -122,7 +259,7 @@ class CategoriesViewSet(ModelMixinSet):
     lookup_field = "slug"
 
 
-class GenresViewSet(ModelMixinSet):
+class GenresViewSet(EdgeCacheMixin, ModelMixinSet):
     """Получить список всех жанров. Права доступа: Доступно без токена."""
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
@@ -132,11 +269,10 @@ class GenresViewSet(ModelMixinSet):
     lookup_field = "slug"
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(EdgeCacheMixin, SingleFlightMixin,
+                   viewsets.ModelViewSet):
     """Получить список всех объектов. Права доступа: Доступно без токена."""
-    queryset = Title.objects.annotate(
-        rating=Avg('reviews__score')).select_related(
-        'category').prefetch_related('genre')
+    queryset = Title.objects.select_related('category')
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
@@ -146,24 +282,94 @@ class TitleViewSet(viewsets.ModelViewSet):
             return TitlesEditorSerializer
         return TitlesReadSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        return self.coalesce(request, super().retrieve, *args, **kwargs)
+
+    def perform_destroy(self, instance):
+        instance.request_deletion()
+
+    @action(detail=True, methods=('get',))
+    def similar(self, request, pk):
+        """Похожие произведения, рассчитанные заранее."""
+        title = self.get_object()
+        queryset = self.get_queryset().filter(
+            similar_for__title=title
+        ).annotate(
+            similarity=F('similar_for__score')
+        ).order_by('-similarity')
+        serializer = SimilarTitleSerializer(
+            queryset, many=True, context=self.get_serializer_context()
+        )
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class CatalogStatViewSet(EdgeCacheMixin, mixins.ListModelMixin,
+                         viewsets.GenericViewSet):
+    """Статистика оценок по категориям, жанрам и годам. Только чтение."""
+    queryset = CatalogStat.objects.all()
+    serializer_class = CatalogStatSerializer
+    permission_classes = (AllowAny,)
+    filter_backends = (DjangoFilterBackend,)
+    filterset_fields = ('dimension', 'key')
+
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(EdgeCacheMixin, SingleFlightMixin,
+                    viewsets.ModelViewSet):
     """Пользователи просматривают и оставляют свои отзывы."""
     serializer_class = ReviewSerializer
     permission_classes = (CreateAndUpdatePermission,)
+    throttle_classes = (ReviewWriteThrottle,)
 
     def get_queryset(self):
         title_id = self.kwargs.get('title_id')
         title = get_object_or_404(Title, id=title_id)
-        return title.reviews.all().select_related('author')
+        return title.reviews.filter(
+            author__pending_deletion=False
+        ).select_related('author')
+
+    def list(self, request, *args, **kwargs):
+        """Первая страница отзывов - общий расчет для одновременных."""
+        if self.paginator.get_offset(request):
+            return super().list(request, *args, **kwargs)
+        return self.coalesce(request, super().list, *args, **kwargs)
 
     def perform_create(self, serializer):
         title_id = self.kwargs.get('title_id')
         title = get_object_or_404(Title, id=title_id)
         serializer.save(author=self.request.user, title=title)
 
+    @action(
+        detail=False, methods=('put',),
+        permission_classes=(IsAuthenticated,)
+    )
+    def me(self, request, title_id):
+        """Создание или обновление своего отзыва на произведение."""
+        serializer = ReviewUpsertSerializer(
+            data=request.data,
+            context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+        title = get_object_or_404(Title, id=title_id)
+        try:
+            review, created = Review.objects.upsert(
+                author=request.user,
+                title_id=title.pk,
+                text=serializer.validated_data['text'],
+                score=serializer.validated_data['score'],
+            )
+        except IntegrityError:
+            # Произведение могли удалить после проверки, остальные
+            # ошибки целостности - не 404.
+            if Title.all_objects.filter(pk=title.pk).exists():
+                raise
+            raise Http404('Произведение не найдено.')
+        return Response(
+            ReviewUpsertSerializer(review).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(EdgeCacheMixin, viewsets.ModelViewSet):
     """
     Получить список всех комментариев.
     Добавление нового комментария к отзыву.
@@ -173,17 +379,137 @@ class CommentViewSet(viewsets.ModelViewSet):
     """
     serializer_class = CommentSerializer
     permission_classes = (CreateAndUpdatePermission,)
+    throttle_classes = (CommentWriteThrottle,)
 
     def get_review(self):
         return get_object_or_404(
-            Review,
+            Review.objects.filter(
+                title__pending_deletion=False,
+                author__pending_deletion=False
+            ),
             id=self.kwargs.get('review_id'),
         )
 
     def get_queryset(self):
-        return self.get_review().comments.all().select_related('author')
+        return self.get_review().comments.filter(
+            author__pending_deletion=False
+        ).select_related('author')
 
     def perform_create(self, serializer):
         serializer.save(
             author=self.request.user, review=self.get_review()
         )
+
+
+class ProfileViewSet(viewsets.ViewSet):
+    """
+    Профили запросов (api.profiling): список, скачивание файла
+    и выдача токена для заголовка X-Profile. Только администратор.
+    """
+    permission_classes = (IsAdmin,)
+    lookup_value_regex = PROFILE_ID_PATTERN
+
+    def list(self, request):
+        return Response(ProfileSerializer(store.list(), many=True).data)
+
+    def retrieve(self, request, pk):
+        meta = store.get(pk)
+        if meta is None:
+            raise Http404('Профиль не найден.')
+        try:
+            file = open(store.file_path(meta), 'rb')
+        except FileNotFoundError:
+            raise Http404('Профиль не найден.')
+        return FileResponse(file, as_attachment=True, filename=meta['file'])
+
+    @action(detail=False, methods=('post',))
+    def token(self, request):
+        """Токен для профилирования запросов в заголовке X-Profile."""
+        serializer = ProfilingTokenSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({
+            'header': HEADER,
+            'token': make_token(
+                request.user, serializer.validated_data['mode']
+            ),
+        })
+
+
+class MemoryViewSet(viewsets.ViewSet):
+    """
+    Память воркера, обработавшего запрос (api.memory): RSS/PSS, типы
+    объектов и прирост памяти по строкам кода с исходного снимка
+    tracemalloc. Только администратор.
+    """
+    permission_classes = (IsAdmin,)
+
+    def list(self, request):
+        return Response(memory_report(settings.MEMORY_REPORT_TOP))
+
+    @action(detail=False, methods=('post', 'delete'))
+    def snapshot(self, request):
+        """
+        POST - включение трассировки и новый исходный снимок,
+        DELETE - выключение трассировки.
+        """
+        if request.method == 'DELETE':
+            tracker.stop()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        tracker.start()
+        return Response(memory_report(settings.MEMORY_REPORT_TOP))
+
+
+class SlowQueryViewSet(viewsets.ViewSet):
+    """
+    Медленные запросы к базе, записанные воркером (api.slow_queries),
+    по убыванию суммарного времени. Только администратор.
+    """
+    permission_classes = (IsAdmin,)
+
+    def list(self, request):
+        return Response(
+            SlowQuerySerializer(slow_queries.list(), many=True).data
+        )
+
+    @action(detail=False, methods=('post',))
+    def reset(self, request):
+        slow_queries.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ChangeViewSet(viewsets.ViewSet):
+    """
+    Журнал изменений для внешних зеркал (reviews.changes): записи после
+    курсора ?since= в порядке фиксации транзакций. Только администратор.
+    """
+    permission_classes = (IsAdmin,)
+
+    def list(self, request):
+        paginator = ChangeFeedPagination()
+        if paginator.wants_head(request):
+            return paginator.get_head_response(head())
+        limit = settings.CHANGE_FEED_PAGE_SIZE
+        changes = feed(paginator.decode_cursor(request), limit)
+        return paginator.get_paginated_response(
+            request, ChangeSerializer(changes, many=True).data, changes,
+            limit
+        )
+
+
+class ModerationJobViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
+                           mixins.RetrieveModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    Массовое удаление отзывов и комментариев (reviews.moderation).
+    POST создает задание и запускает его в фоне, GET показывает
+    прогресс. Модератор или администратор.
+    """
+    queryset = ModerationJob.objects.select_related('author', 'created_by')
+    serializer_class = ModerationJobSerializer
+    permission_classes = (IsModerator,)
+
+    def perform_create(self, serializer):
+        job = serializer.save(created_by=self.request.user)
+        moderation.count_matches(job)
+        job.refresh_from_db()
+        moderation.start(job)
@@ -0,0 +1,19 @@
+from django.contrib import admin
+
+
+class DeferredDeletionAdmin(admin.ModelAdmin):
+    """
+    Удаление через админку только помечает объекты (request_deletion),
+    зависимые строки удаляет команда process_deletions. Страница
+    подтверждения не собирает список всех связанных объектов.
+    """
+
+    def get_deleted_objects(self, objs, request):
+        return [str(obj) for obj in objs], {}, set(), []
+
+    def delete_model(self, request, obj):
+        obj.request_deletion()
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            obj.request_deletion()
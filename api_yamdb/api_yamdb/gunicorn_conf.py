@@ -0,0 +1,144 @@
+"""
+Настройки gunicorn для продакшена:
+gunicorn -c python:api_yamdb.gunicorn_conf api_yamdb.wsgi:application
+
+Количество процессов и потоков считается по доступным контейнеру ядрам
+и переопределяется переменными окружения GUNICORN_*. Приложение
+загружается в мастер-процессе до fork, после загрузки объекты
+переносятся в постоянное поколение сборщика мусора (gc.freeze), чтобы
+сборка мусора в воркерах не копировала общие страницы памяти.
+
+Прогрев открывает соединения с БД в потоках воркера, только если они
+переиспользуются между запросами: при DB_CONN_MAX_AGE = 0 Django
+закрывает соединение в конце каждого запроса, и прогрев его пропускает.
+В docker-compose для web и api задано DB_CONN_MAX_AGE=60.
+"""
+import gc
+import logging
+import math
+import os
+import threading
+from concurrent import futures
+
+logger = logging.getLogger('gunicorn.error')
+
+CGROUP_V2_CPU_MAX = '/sys/fs/cgroup/cpu.max'
+CGROUP_V1_CPU_QUOTA = '/sys/fs/cgroup/cpu/cpu.cfs_quota_us'
+CGROUP_V1_CPU_PERIOD = '/sys/fs/cgroup/cpu/cpu.cfs_period_us'
+
+
+def read_cgroup_quota():
+    """Лимит CPU контейнера по cgroup v2 или v1, None если не задан."""
+    try:
+        with open(CGROUP_V2_CPU_MAX) as file:
+            quota, period = file.read().split()
+        if quota != 'max':
+            return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open(CGROUP_V1_CPU_QUOTA) as file:
+            quota = int(file.read())
+        with open(CGROUP_V1_CPU_PERIOD) as file:
+            period = int(file.read())
+        if quota > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cpus():
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = read_cgroup_quota()
+    if quota is not None:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return cpus
+
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', available_cpus() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = timeout
+keepalive = 5
+# Файл heartbeat воркеров в памяти: на overlay-файловой системе
+# контейнера fchmod может блокироваться и воркеры убиваются по таймауту.
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+accesslog = os.getenv('GUNICORN_ACCESS_LOG')
+errorlog = '-'
+
+
+def import_urlconf():
+    from django.urls import get_resolver
+
+    get_resolver()._populate()
+
+
+def when_ready(server):
+    """После загрузки приложения в мастере, до запуска воркеров."""
+    if not server.cfg.preload_app:
+        return
+    from django.db import connections
+
+    import_urlconf()
+    # Соединения мастера не должны попасть в воркеры после fork.
+    connections.close_all()
+    gc.collect()
+    gc.freeze()
+    logger.info('Application preloaded, %d objects frozen',
+                gc.get_freeze_count())
+
+
+def open_connections():
+    """Открытие соединений, которые живут дольше запроса (CONN_MAX_AGE)."""
+    from django.db import connections
+
+    for connection in connections.all():
+        if connection.settings_dict['CONN_MAX_AGE']:
+            connection.ensure_connection()
+
+
+def warm_up_threads(pool, count):
+    """
+    Открытие соединений с БД в каждом потоке воркера: соединения Django
+    привязаны к потоку, барьер не дает двум задачам попасть в один поток.
+    """
+    barrier = threading.Barrier(count)
+
+    def warm_up():
+        try:
+            open_connections()
+        finally:
+            barrier.wait(timeout=10)
+
+    for task in [pool.submit(warm_up) for _ in range(count)]:
+        task.result()
+
+
+def post_worker_init(worker):
+    """Прогрев воркера до приема первого запроса."""
+    try:
+        if not worker.cfg.preload_app:
+            import_urlconf()
+        pool = getattr(worker, 'tpool', None)
+        if isinstance(pool, futures.ThreadPoolExecutor):
+            warm_up_threads(pool, worker.cfg.threads)
+        else:
+            open_connections()
+        from reviews.autocomplete import autocomplete
+
+        # Индекс автодополнения строится до первого запроса.
+        autocomplete.refresh()
+    except Exception:
+        logger.warning('Worker warm-up failed', exc_info=True)
+    from api.memory import start_worker_monitoring
+
+    start_worker_monitoring()
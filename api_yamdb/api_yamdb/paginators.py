@@ -0,0 +1,53 @@
+from typing import Optional
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset: QuerySet) -> Optional[int]:
+    """
+    Оценка числа строк таблицы по статистике PostgreSQL (pg_class).
+    Для секционированной таблицы (reviews.partitioning) - сумма оценок
+    секций. Для остальных СУБД возвращает None.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        table = queryset.model._meta.db_table
+        cursor.execute(
+            'SELECT coalesce(('
+            'SELECT sum(greatest(part.reltuples, 0))::bigint '
+            'FROM pg_inherits JOIN pg_class part '
+            'ON part.oid = pg_inherits.inhrelid '
+            'WHERE pg_inherits.inhparent = %s::regclass'
+            '), reltuples::bigint) FROM pg_class WHERE oid = %s::regclass',
+            (table, table)
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор админки для больших таблиц.
+    Для списка без фильтров и поиска, если по статистике в таблице больше
+    ADMIN_ESTIMATED_COUNT_THRESHOLD строк, вместо COUNT(*) используется
+    оценка из pg_class. Фильтр менеджера по умолчанию (скрытые
+    pending_deletion произведения) не считается фильтром: таких строк
+    мало, и оценка их включает. Отфильтрованные списки считаются точно.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        default = queryset.model._default_manager.all().query.where
+        if queryset.query.where == default:
+            estimate = estimate_count(queryset)
+            if (estimate is not None
+                    and estimate > settings.ADMIN_ESTIMATED_COUNT_THRESHOLD):
+                return estimate
+        return queryset.count()
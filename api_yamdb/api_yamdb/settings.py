@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -11,6 +12,7 @@ ALLOWED_HOSTS = [
     'localhost',
     '127.0.0.1',
     'web',
+    'api',
 ]
 
 
@@ -35,6 +37,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.profiling.ProfilingMiddleware',
+    'api.slow_queries.SlowQueryMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -68,7 +72,8 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', 'postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'igdriodgd'),
         'HOST': os.getenv('DB_HOST', 'db'),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 0)),
     }
 }
 
@@ -125,8 +130,144 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 5,
+    'DEFAULT_THROTTLE_RATES': {
+        'signup': os.getenv('THROTTLE_SIGNUP_RATE', '5/min'),
+        'token': os.getenv('THROTTLE_TOKEN_RATE', '10/min'),
+        'review_write': os.getenv('THROTTLE_REVIEW_WRITE_RATE'),
+        'comment_write': os.getenv('THROTTLE_COMMENT_WRITE_RATE'),
+    },
+}
+
+# Кэши, общие для всех воркеров узла. По умолчанию это файловые кэши
+# в /dev/shm (разделяемая память), при его отсутствии - во временном
+# каталоге. Для нескольких узлов backend и location переопределяются
+# через переменные окружения.
+SHARED_CACHE_ROOT = (
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': os.getenv(
+            'SHARED_CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv(
+            'SHARED_CACHE_LOCATION',
+            os.path.join(SHARED_CACHE_ROOT, 'yamdb_shared')
+        ),
+    },
+}
+
+# Канал инвалидации кэша slug -> pk категорий и жанров. Версия в канале
+# проверяется, а словарь при неизвестном slug перезагружается не чаще
+# раза в SLUG_CACHE_CHECK_SECONDS секунд.
+SLUG_CACHE_CHANNEL = os.getenv(
+    'SLUG_CACHE_CHANNEL', 'reviews.slugs.SharedCacheChannel'
+)
+SLUG_CACHE_CHECK_SECONDS = float(os.getenv('SLUG_CACHE_CHECK_SECONDS', 1))
+
+# Начиная с этого числа строк (по статистике СУБД) админка показывает
+# для списков без фильтров оценку количества вместо COUNT(*).
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100000
+
+# Кэширование анонимных запросов к каталогу в nginx (infra/nginx).
+# EDGE_CACHE_ROOT - каталог proxy_cache_path, общий с nginx; если не задан,
+# кэш не очищается при изменении данных.
+EDGE_CACHE_MAX_AGE = int(os.getenv('EDGE_CACHE_MAX_AGE', 60))
+EDGE_CACHE_ROOT = os.getenv('EDGE_CACHE_ROOT')
+EDGE_CACHE_LEVELS = (1, 2)
+
+# Объединение одинаковых одновременных запросов на чтение (api/coalescing.py):
+# карточка произведения и первая страница отзывов считаются один раз
+# на все потоки воркера; между воркерами - под блокировкой в кэше
+# SINGLE_FLIGHT_CACHE, результат другого воркера ждем не дольше
+# SINGLE_FLIGHT_WAIT_TIMEOUT секунд.
+SINGLE_FLIGHT_ENABLED = os.getenv('SINGLE_FLIGHT_ENABLED', '1') == '1'
+SINGLE_FLIGHT_CACHE = 'shared'
+SINGLE_FLIGHT_WAIT_TIMEOUT = float(os.getenv('SINGLE_FLIGHT_WAIT_TIMEOUT', 1))
+SINGLE_FLIGHT_LOCK_TIMEOUT = 10
+
+# Профилирование отдельных запросов (api/profiling.py). Выключенное
+# профилирование не добавляет работы к запросам. PROFILING_SAMPLE_RATE -
+# доля случайных запросов, которые профилируются в режиме
+# PROFILING_SAMPLE_MODE; в кольце PROFILING_ROOT хранится не больше
+# PROFILING_MAX_FILES профилей.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', '0') == '1'
+PROFILING_ROOT = os.getenv(
+    'PROFILING_ROOT', os.path.join(tempfile.gettempdir(), 'yamdb_profiles')
+)
+PROFILING_MAX_FILES = int(os.getenv('PROFILING_MAX_FILES', 100))
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_SAMPLE_MODE = 'sampling'
+PROFILING_SAMPLING_INTERVAL = 0.001
+PROFILING_TOKEN_MAX_AGE = 3600
+
+# Память воркеров (api/memory.py). MEMORY_LOG_INTERVAL > 0 - период
+# записи памяти каждого воркера gunicorn в лог api.memory, секунды;
+# MEMORY_TRACEMALLOC включает трассировку выделений с запуска воркера
+# (замедляет выделение памяти, только для поиска утечек).
+MEMORY_LOG_INTERVAL = float(os.getenv('MEMORY_LOG_INTERVAL', 0))
+MEMORY_TRACEMALLOC = os.getenv('MEMORY_TRACEMALLOC', '0') == '1'
+MEMORY_TRACEMALLOC_FRAMES = 25
+MEMORY_REPORT_TOP = 20
+
+# Журнал медленных запросов к базе (api/slow_queries.py): запросы дольше
+# SLOW_QUERY_THRESHOLD_MS миллисекунд складываются по отпечаткам
+# в таблицу воркера из не более SLOW_QUERY_MAX_ENTRIES строк
+# и пишутся в лог api.slow_queries. SLOW_QUERY_EXPLAIN - сохранять
+# план первого запроса каждого отпечатка (лишний запрос EXPLAIN).
+SLOW_QUERY_LOG_ENABLED = os.getenv('SLOW_QUERY_LOG_ENABLED', '1') == '1'
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 100))
+SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', '0') == '1'
+SLOW_QUERY_MAX_ENTRIES = 200
+
+# Журнал изменений для внешних зеркал (reviews/changes.py, эндпоинт
+# /api/v1/changes/). CHANGE_FEED_RETENTION_DAYS - срок хранения отметок
+# об удалении при сжатии командой compact_changes; курсор старше этого
+# срока недействителен.
+CHANGE_FEED_ENABLED = os.getenv('CHANGE_FEED_ENABLED', '1') == '1'
+CHANGE_FEED_RETENTION_DAYS = int(os.getenv('CHANGE_FEED_RETENTION_DAYS', 30))
+CHANGE_FEED_PAGE_SIZE = 500
+
+# Массовая модерация (reviews/moderation.py): строк в одной транзакции
+# удаления; задание, не сообщавшее о прогрессе столько секунд, считается
+# брошенным и подхватывается командой process_deletions.
+MODERATION_CHUNK_SIZE = 1000
+MODERATION_JOB_STALE_SECONDS = int(
+    os.getenv('MODERATION_JOB_STALE_SECONDS', 600)
+)
+
+# Автодополнение названий (reviews/autocomplete.py, эндпоинт
+# /api/v1/autocomplete/): индекс воркера перестраивается целиком раз
+# в AUTOCOMPLETE_REBUILD_SECONDS секунд и догоняет журнал изменений
+# не чаще раза в AUTOCOMPLETE_SYNC_SECONDS секунд.
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 20
+AUTOCOMPLETE_REBUILD_SECONDS = int(
+    os.getenv('AUTOCOMPLETE_REBUILD_SECONDS', 3600)
+)
+AUTOCOMPLETE_SYNC_SECONDS = float(os.getenv('AUTOCOMPLETE_SYNC_SECONDS', 1))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.memory': {'handlers': ['console'], 'level': 'INFO'},
+        'api.slow_queries': {'handlers': ['console'], 'level': 'WARNING'},
+        'reviews.moderation': {'handlers': ['console'], 'level': 'INFO'},
+    },
 }
 
+# Количество похожих произведений, сохраняемых для каждого произведения.
+SIMILAR_TITLES_TOP_K = 10
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'AUTH_HEADER_TYPES': ('Bearer',),
@@ -0,0 +1,42 @@
+"""
+Настройки воркеров, которые обслуживают только API (/api/v1/).
+
+API аутентифицирует запросы только по JWT и отдает только JSON, поэтому
+профиль убирает приложения и middleware сессий, CSRF, сообщений
+и админки, браузерный рендерер DRF и подключает URLconf без админки.
+Админка и /redoc/ остаются на воркерах с полными настройками
+api_yamdb.settings. Профиль выбирается переменной
+DJANGO_SETTINGS_MODULE=api_yamdb.settings_api.
+"""
+from api_yamdb.settings import *  # noqa: F401,F403
+from api_yamdb.settings import INSTALLED_APPS, MIDDLEWARE, REST_FRAMEWORK
+
+API_EXCLUDED_APPS = (
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+)
+API_EXCLUDED_MIDDLEWARE = (
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+)
+
+INSTALLED_APPS = [
+    app for app in INSTALLED_APPS if app not in API_EXCLUDED_APPS
+]
+
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE
+    if middleware not in API_EXCLUDED_MIDDLEWARE
+]
+
+ROOT_URLCONF = 'api_yamdb.urls_api'
+
+REST_FRAMEWORK = dict(
+    REST_FRAMEWORK,
+    DEFAULT_RENDERER_CLASSES=['rest_framework.renderers.JSONRenderer'],
+)
@@ -0,0 +1,6 @@
+"""URLconf воркеров API (api_yamdb.settings_api): без админки и /redoc/."""
+from django.urls import include, path
+
+urlpatterns = [
+    path('api/', include('api.urls', namespace='api')),
+]
@@ -1,6 +1,9 @@
 from django.contrib import admin
 from reviews.models import Category, Comment, Genre, Review, Title
 
+from api_yamdb.admin import DeferredDeletionAdmin
+from api_yamdb.paginators import EstimatedCountPaginator
+
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -25,16 +28,19 @@ class GenreAdmin(admin.ModelAdmin):
 
 
 @admin.register(Title)
-class TitleAdmin(admin.ModelAdmin):
+class TitleAdmin(DeferredDeletionAdmin):
     list_display = (
         'name',
         'year',
         'category',
         'description',
     )
-    search_fields = ('name',)
-    list_filter = ('name',)
+    list_select_related = ('category',)
+    search_fields = ('name__startswith',)
+    list_filter = ('category',)
     empty_value_display = '-пусто-'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Comment)
@@ -45,9 +51,13 @@ class CommentAdmin(admin.ModelAdmin):
         'author',
         'pub_date',
     )
-    search_fields = ('review',)
-    list_filter = ('review',)
+    list_select_related = ('review', 'author')
+    search_fields = ('author__username__startswith',)
+    list_filter = ('pub_date',)
+    autocomplete_fields = ('review', 'author')
     empty_value_display = '-пусто-'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Review)
@@ -58,6 +68,10 @@ class ReviewAdmin(admin.ModelAdmin):
         'author',
         'score',
     )
-    search_fields = ('pub_date',)
+    list_select_related = ('title', 'author')
+    search_fields = ('author__username__startswith',)
     list_filter = ('pub_date',)
+    autocomplete_fields = ('title', 'author')
     empty_value_display = '-пусто-'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,269 @@
+"""
+Автодополнение названий произведений, жанров и категорий по префиксу.
+
+Индекс хранится в памяти воркера (PrefixIndex): отсортированный список
+строк 'ключ\\0ссылка', где ключ - нормализованное название, начиная
+с каждого слова (первые MAX_WORDS слов), а ссылка - тип и id объекта
+('t12', 'g3', 'c1'). Поиск префикса - два bisect по списку, лучшие
+по популярности выбираются из найденного диапазона. Для коротких
+префиксов диапазон велик, поэтому результат префиксов, диапазон которых
+длиннее HEAVY_RANGE строк, запоминается и сбрасывается при изменении
+названий под этим префиксом.
+
+Популярность произведения - количество отзывов, жанра и категории -
+количество произведений. Индекс строится целиком при первом запросе
+и раз в AUTOCOMPLETE_REBUILD_SECONDS секунд (тогда же обновляется
+популярность), а между перестроениями не чаще раза
+в AUTOCOMPLETE_SYNC_SECONDS секунд догоняет журнал изменений
+(reviews.changes): записи, которые сигналы пишут при сохранении
+и удалении объектов, применяются к индексу по одной. Без журнала
+(CHANGE_FEED_ENABLED = False) новые названия появляются только после
+перестроения.
+"""
+import bisect
+import heapq
+import re
+import sys
+import time
+import unicodedata
+from threading import Lock
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.db.models import Count
+from reviews.changes import feed, head
+from reviews.models import Category, Change, Genre, Title
+
+SEPARATOR = '\x00'
+# Верхняя граница для диапазона строк с заданным префиксом.
+LAST_CHAR = '\U0010ffff'
+MAX_WORDS = 6
+HEAVY_RANGE = 64
+
+KINDS = {'title': 't', 'genre': 'g', 'category': 'c'}
+KIND_NAMES = {code: kind for kind, code in KINDS.items()}
+MODELS = {'title': Title, 'genre': Genre, 'category': Category}
+
+
+def normalize(text: str) -> str:
+    """Название без регистра, знаков препинания и лишних пробелов."""
+    text = unicodedata.normalize('NFKC', text).casefold().replace('ё', 'е')
+    return re.sub(r'[\W_]+', ' ', text).strip()
+
+
+def name_keys(name: str) -> List[str]:
+    """Ключи названия: нормализованное название с каждого слова."""
+    words = normalize(name).split()
+    return list(dict.fromkeys(
+        ' '.join(words[start:]) for start in range(min(len(words),
+                                                       MAX_WORDS))
+    ))
+
+
+class PrefixIndex:
+    """
+    Индекс названий по префиксу. Не потокобезопасен: вызовы
+    синхронизирует Autocomplete.
+    """
+
+    def __init__(self, max_limit: int):
+        self.max_limit = max_limit
+        self.entries = []
+        # Ссылка -> (название, slug, популярность).
+        self.items = {}
+        # (префикс, тип) -> лучшие ссылки для длинных диапазонов.
+        self.heavy = {}
+
+    @classmethod
+    def build(cls, items: Iterable[tuple], max_limit: int):
+        """Индекс из строк (ссылка, название, slug, популярность)."""
+        index = cls(max_limit)
+        for ref, name, slug, popularity in items:
+            index.items[ref] = (name, slug, popularity)
+            index.entries.extend(
+                key + SEPARATOR + ref for key in name_keys(name)
+            )
+        index.entries.sort()
+        return index
+
+    def add(self, ref: str, name: str, slug: Optional[str] = None,
+            popularity: Optional[int] = None) -> None:
+        """Добавление или замена объекта; без popularity - прежняя."""
+        old = self.items.get(ref)
+        if popularity is None:
+            popularity = old[2] if old else 0
+        self.remove(ref)
+        self.items[ref] = (name, slug, popularity)
+        for key in name_keys(name):
+            bisect.insort(self.entries, key + SEPARATOR + ref)
+            self.forget(key)
+
+    def remove(self, ref: str) -> None:
+        item = self.items.pop(ref, None)
+        if item is None:
+            return
+        for key in name_keys(item[0]):
+            entry = key + SEPARATOR + ref
+            position = bisect.bisect_left(self.entries, entry)
+            if (position < len(self.entries)
+                    and self.entries[position] == entry):
+                del self.entries[position]
+            self.forget(key)
+
+    def forget(self, key: str) -> None:
+        """Сброс запомненных результатов префиксов ключа."""
+        for cached in [cached for cached in self.heavy
+                       if key.startswith(cached[0])]:
+            del self.heavy[cached]
+
+    def best(self, start: int, stop: int, code: Optional[str]) -> List[str]:
+        refs = set()
+        for entry in self.entries[start:stop]:
+            ref = entry[entry.rindex(SEPARATOR) + 1:]
+            if code is None or ref[0] == code:
+                refs.add(ref)
+        return heapq.nsmallest(
+            self.max_limit, refs,
+            key=lambda ref: (-self.items[ref][2], self.items[ref][0], ref)
+        )
+
+    def lookup(self, query: str, kind: Optional[str] = None,
+               limit: int = 10) -> List[dict]:
+        """
+        Самые популярные объекты, в названии которых есть слово,
+        начинающееся с query.
+        """
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        code = KINDS[kind] if kind else None
+        refs = self.heavy.get((prefix, code))
+        if refs is None:
+            start = bisect.bisect_left(self.entries, prefix)
+            stop = bisect.bisect_left(self.entries, prefix + LAST_CHAR,
+                                      start)
+            refs = self.best(start, stop, code)
+            if stop - start > HEAVY_RANGE:
+                self.heavy[prefix, code] = refs
+        return [self.result(ref) for ref in refs[:limit]]
+
+    def result(self, ref: str) -> dict:
+        name, slug, popularity = self.items[ref]
+        return {'type': KIND_NAMES[ref[0]], 'id': int(ref[1:]),
+                'name': name, 'slug': slug, 'popularity': popularity}
+
+    def footprint(self) -> int:
+        """Примерный объем памяти индекса в байтах."""
+        size = sys.getsizeof(self.entries) + sum(
+            sys.getsizeof(entry) for entry in self.entries
+        )
+        size += sys.getsizeof(self.items) + sum(
+            sys.getsizeof(ref) + sys.getsizeof(item)
+            + sum(sys.getsizeof(value) for value in item)
+            for ref, item in self.items.items()
+        )
+        return size + sys.getsizeof(self.heavy) + sum(
+            sys.getsizeof(refs) for refs in self.heavy.values()
+        )
+
+
+def load_items():
+    """Все объекты индекса с популярностью из базы."""
+    for pk, name, popularity in Title.objects.annotate(
+        popularity=Count('reviews')
+    ).values_list('pk', 'name', 'popularity').iterator():
+        yield f't{pk}', name, None, popularity
+    for kind in ('genre', 'category'):
+        for pk, name, slug, popularity in MODELS[kind].objects.annotate(
+            popularity=Count('titles')
+        ).values_list('pk', 'name', 'slug', 'popularity').iterator():
+            yield f'{KINDS[kind]}{pk}', name, slug, popularity
+
+
+class Autocomplete:
+    """
+    Индекс воркера: строится при первом запросе, перестраивается
+    и догоняет журнал изменений по расписанию.
+    """
+
+    def __init__(self):
+        # lock защищает индекс, update_lock - перестроение и чтение
+        # журнала, чтобы запросы не ждали базу.
+        self.lock = Lock()
+        self.update_lock = Lock()
+        self.index = None
+        self.position = None
+        self.built = 0.0
+        self.synced = 0.0
+
+    def rebuild(self) -> None:
+        last = head()
+        index = PrefixIndex.build(load_items(),
+                                  settings.AUTOCOMPLETE_MAX_LIMIT)
+        with self.lock:
+            self.index = index
+            self.position = (last.txid, last.pk) if last else None
+            self.built = self.synced = time.monotonic()
+
+    def apply(self, changes: List[Change]) -> None:
+        with self.lock:
+            for change in changes:
+                ref = f'{KINDS[change.model]}{change.object_id}'
+                if change.action == Change.DELETE:
+                    self.index.remove(ref)
+                else:
+                    self.index.add(ref, change.data['name'],
+                                   change.data.get('slug'))
+            if changes:
+                self.position = (changes[-1].txid, changes[-1].pk)
+
+    def sync(self) -> None:
+        """Применение новых записей журнала изменений."""
+        while True:
+            changes = feed(self.position, settings.CHANGE_FEED_PAGE_SIZE,
+                           models=tuple(KINDS))
+            self.apply(changes)
+            if len(changes) < settings.CHANGE_FEED_PAGE_SIZE:
+                break
+        self.synced = time.monotonic()
+
+    def refresh(self) -> None:
+        now = time.monotonic()
+        rebuild = (self.index is None or now - self.built
+                   >= settings.AUTOCOMPLETE_REBUILD_SECONDS)
+        sync = (settings.CHANGE_FEED_ENABLED and now - self.synced
+                >= settings.AUTOCOMPLETE_SYNC_SECONDS)
+        if not (rebuild or sync):
+            return
+        with self.update_lock:
+            # Пока поток ждал блокировку, индекс мог обновить другой.
+            if self.index is None or (rebuild and self.built < now):
+                self.rebuild()
+            elif sync and self.synced < now:
+                self.sync()
+
+    def lookup(self, query: str, kind: Optional[str] = None,
+               limit: int = 10) -> List[dict]:
+        self.refresh()
+        with self.lock:
+            return self.index.lookup(query, kind, limit)
+
+    def stats(self) -> dict:
+        """Размер индекса и занимаемая им память."""
+        self.refresh()
+        with self.lock:
+            return {
+                'objects': len(self.index.items),
+                'entries': len(self.index.entries),
+                'cached_prefixes': len(self.index.heavy),
+                'memory_bytes': self.index.footprint(),
+                'age_seconds': round(time.monotonic() - self.built, 1),
+            }
+
+    def reset(self) -> None:
+        """Перестроение при следующем запросе (тесты)."""
+        with self.lock:
+            self.index = None
+
+
+autocomplete = Autocomplete()
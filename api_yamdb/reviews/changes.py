@@ -0,0 +1,163 @@
+"""
+Журнал изменений для внешних зеркал (поиск, рекомендации).
+
+Сигналы reviews.signals в той же транзакции, что и изменение, пишут
+в таблицу Change запись с публичными полями объекта (upsert) или
+отметку об удалении (delete). Скрытие произведения или пользователя
+до удаления (pending_deletion) записывается как удаление. Удаления
+порциями (reviews.deletion) идут мимо сигналов и пишут отметки сами.
+
+Позиция записи - пара (txid, id). id выдается последовательностью
+до фиксации транзакции, поэтому в PostgreSQL запись с меньшим id
+может стать видимой позже записи с большим, и курсор по id пропустил
+бы ее. Записи упорядочиваются по номеру транзакции и отдаются только
+для транзакций старше xmin текущего снимка: все такие транзакции уже
+завершены, и новые записи перед курсором не появятся. Долгая
+транзакция задерживает ленту, но не теряет записи. В SQLite записи
+идут по одной и txid всегда 0.
+
+Сжатие (команда compact_changes): записи, после которых есть запись
+о том же объекте, удаляются сразу - зеркало получит более позднюю.
+Отметки об удалении хранятся CHANGE_FEED_RETENTION_DAYS дней; курсор
+старше этого срока недействителен, нужна полная синхронизация.
+"""
+from datetime import timedelta
+from typing import Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Exists, OuterRef, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from reviews.genres import CHUNK_SIZE
+from reviews.models import Category, Change, Comment, Genre, Review, Title
+from users.models import User
+
+# Публичные поля, которые попадают в журнал. Внешние ключи - id.
+CHANGE_FIELDS = {
+    Category: ('name', 'slug'),
+    Genre: ('name', 'slug'),
+    Title: ('name', 'year', 'description', 'category', 'genres'),
+    Review: ('title', 'author', 'text', 'score', 'pub_date'),
+    Comment: ('review', 'author', 'text', 'pub_date'),
+    User: ('username', 'first_name', 'last_name', 'bio'),
+}
+
+
+def current_txid(connection):
+    """Номер текущей транзакции, вычисляемый при INSERT."""
+    if connection.vendor == 'postgresql':
+        return RawSQL('txid_current()', ())
+    return Value(0)
+
+
+def visible_horizon(connection) -> Optional[int]:
+    """
+    Номер самой старой незавершенной транзакции (PostgreSQL):
+    все записи с меньшим txid уже видны. None в остальных СУБД.
+    """
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT txid_snapshot_xmin(txid_current_snapshot())')
+        return cursor.fetchone()[0]
+
+
+def change_for(instance, deleted: bool = False) -> Change:
+    model = type(instance)._meta.concrete_model
+    if deleted or getattr(instance, 'pending_deletion', False):
+        return Change(model=model._meta.model_name, object_id=instance.pk,
+                      action=Change.DELETE)
+    data = {
+        name: model._meta.get_field(name).value_from_object(instance)
+        for name in CHANGE_FIELDS[model]
+    }
+    return Change(model=model._meta.model_name, object_id=instance.pk,
+                  action=Change.UPSERT, data=data)
+
+
+def save_changes(changes: List[Change], using: str) -> None:
+    if not changes or not settings.CHANGE_FEED_ENABLED:
+        return
+    txid = current_txid(connections[using])
+    for change in changes:
+        change.txid = txid
+    Change.objects.using(using).bulk_create(changes)
+
+
+def record(instance, deleted: bool = False) -> None:
+    """Запись об изменении или удалении instance."""
+    save_changes([change_for(instance, deleted)], instance._state.db)
+
+
+def record_deleted(model, ids: Iterable[int], using: str) -> None:
+    """Отметки об удалении строк model, удаленных без сигналов."""
+    save_changes([
+        Change(model=model._meta.model_name, object_id=pk,
+               action=Change.DELETE)
+        for pk in ids
+    ], using)
+
+
+def record_titles(title_ids: Iterable[int], using: str = 'default') -> None:
+    """
+    Записи о произведениях title_ids, измененных без сигналов
+    (жанры, категория).
+    """
+    title_ids = sorted(set(title_ids))
+    for start in range(0, len(title_ids), CHUNK_SIZE):
+        save_changes([
+            change_for(title) for title in Title.all_objects.using(
+                using
+            ).filter(pk__in=title_ids[start:start + CHUNK_SIZE])
+        ], using)
+
+
+def feed(after: Optional[Tuple[int, int]], limit: int,
+         using: str = 'default',
+         models: Optional[Iterable[str]] = None) -> List[Change]:
+    """
+    Видимые записи после позиции after = (txid, id), только о моделях
+    models, если они заданы.
+    """
+    queryset = Change.objects.using(using).order_by('txid', 'id')
+    if models is not None:
+        queryset = queryset.filter(model__in=models)
+    if after is not None:
+        txid, pk = after
+        queryset = queryset.filter(
+            Q(txid__gt=txid) | Q(txid=txid, id__gt=pk)
+        )
+    horizon = visible_horizon(connections[using])
+    if horizon is not None:
+        queryset = queryset.filter(txid__lt=horizon)
+    return list(queryset[:limit])
+
+
+def head(using: str = 'default') -> Optional[Change]:
+    """
+    Последняя видимая запись. Зеркало запоминает ее перед полным обходом
+    API и после обхода читает ленту с нее.
+    """
+    queryset = Change.objects.using(using).order_by('-txid', '-id')
+    horizon = visible_horizon(connections[using])
+    if horizon is not None:
+        queryset = queryset.filter(txid__lt=horizon)
+    return queryset.first()
+
+
+def superseded():
+    """Записи, после которых есть запись о том же объекте."""
+    newer = Change.objects.filter(
+        Q(txid__gt=OuterRef('txid'))
+        | Q(txid=OuterRef('txid'), id__gt=OuterRef('id')),
+        model=OuterRef('model'), object_id=OuterRef('object_id'),
+    )
+    return Change.objects.filter(Exists(newer))
+
+
+def expired(retention: timedelta):
+    """Отметки об удалении старше retention."""
+    return Change.objects.filter(
+        action=Change.DELETE, created__lt=timezone.now() - retention
+    )
@@ -0,0 +1,104 @@
+from django.db.models import (BigIntegerField, Count, F, FloatField,
+                              IntegerField, OuterRef, Q, Subquery, Sum, Value)
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+
+def count_by(model, field):
+    """Подзапрос с количеством объектов модели с field = OuterRef('pk')."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by().values(field)
+            .annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+def count_by_author(model):
+    """Подзапрос с количеством объектов модели у автора OuterRef('pk')."""
+    return count_by(model, 'author')
+
+
+def recount_author_counters(user_model, review_model, comment_model):
+    """
+    Пересчет счетчиков reviews_count и comments_count пользователей
+    одним UPDATE. Нужен после массовой загрузки в обход сигналов.
+    Обновляются только расходящиеся строки, возвращается их количество.
+    """
+    counters = {
+        'reviews_count': count_by_author(review_model),
+        'comments_count': count_by_author(comment_model),
+    }
+    return user_model.objects.exclude(Q(**counters)).update(**counters)
+
+
+def recount_review_comments(review_model, comment_model):
+    """
+    Пересчет счетчика comments_count отзывов одним UPDATE.
+    Обновляются только расходящиеся строки, возвращается их количество.
+    """
+    counters = {'comments_count': count_by(comment_model, 'review')}
+    return review_model.objects.exclude(Q(**counters)).update(**counters)
+
+
+def title_score_sum(review_model):
+    """Подзапрос с суммой оценок произведения OuterRef('pk')."""
+    return Coalesce(
+        Subquery(
+            review_model.objects.filter(title=OuterRef('pk'))
+            .order_by().values('title')
+            .annotate(total=Sum('score')).values('total'),
+            output_field=BigIntegerField()
+        ),
+        0
+    )
+
+
+def average(total, count):
+    """
+    Средняя оценка по сумме и количеству оценок, NULL без оценок.
+    Одно выражение для сигналов и пересчета: значения совпадают точно.
+    """
+    return Cast(total, FloatField()) / NullIf(count, Value(0))
+
+
+def change_title_rating(title_model, title_id, total, count):
+    """
+    Добавление к сумме и количеству оценок произведения total и count
+    одним UPDATE ... F() с пересчетом rating из новых значений.
+    """
+    rating_sum = F('rating_sum') + total
+    rating_count = F('rating_count') + count
+    title_model._base_manager.filter(pk=title_id).update(
+        rating_sum=rating_sum,
+        rating_count=rating_count,
+        rating=average(rating_sum, rating_count),
+    )
+
+
+def recount_title_ratings(title_model, review_model, title_ids=None):
+    """
+    Пересчет суммы и количества оценок и рейтинга произведений
+    title_ids (по умолчанию всех) одним UPDATE. Обновляются только
+    расходящиеся строки, возвращается их количество.
+    """
+    counters = {
+        'rating_sum': title_score_sum(review_model),
+        'rating_count': count_by(review_model, 'title'),
+    }
+    queryset = title_model._base_manager.annotate(
+        rating_actual=average(F('rating_sum'), F('rating_count'))
+    ).exclude(
+        Q(**counters) & (
+            Q(rating=F('rating_actual'))
+            | Q(rating__isnull=True, rating_count=0)
+        )
+    )
+    if title_ids is not None:
+        queryset = queryset.filter(pk__in=title_ids)
+    return queryset.update(
+        rating=average(counters['rating_sum'], counters['rating_count']),
+        **counters
+    )
@@ -0,0 +1,157 @@
+"""
+Удаление произведений и пользователей порциями.
+
+Каскад Django при delete() загружает в память все зависимые отзывы
+и комментарии, отправляет сигналы для каждой строки и держит блокировки
+до конца транзакции. Вместо этого запрос на удаление только скрывает
+строку (pending_deletion), а команда process_deletions удаляет зависимые
+строки порциями по id в отдельных транзакциях. Счетчики авторов
+уменьшаются одним UPDATE на автора в порции, суммы и количества оценок
+произведений - одним UPDATE на произведение в порции, счетчики
+комментариев отзывов - одним UPDATE на порцию, индекс
+поиска обновляется триггерами/генерируемым столбцом самой СУБД.
+
+ON DELETE CASCADE на уровне БД не используется: он обошел бы сигналы,
+которые поддерживают счетчики авторов и пересчет похожих произведений.
+"""
+from django.db import connections, transaction
+from django.db.models import Count, Exists, F, OuterRef, Subquery, Sum
+from reviews.changes import record_deleted
+from reviews.counters import change_title_rating
+from reviews.models import Comment, Review, StaleSimilarity, Title
+from users.models import User
+
+
+def id_chunks(queryset, chunk_size):
+    """
+    Порции id строк queryset. Следующая порция выбирается после того,
+    как вызывающий код удалил предыдущую.
+    """
+    queryset = queryset.order_by('pk').values_list('pk', flat=True)
+    while True:
+        ids = list(queryset[:chunk_size])
+        if not ids:
+            return
+        yield ids
+
+
+def raw_delete(queryset):
+    """
+    DELETE FROM <таблица> WHERE id IN (<queryset>) одним запросом.
+    В отличие от QuerySet.delete() не запускает сборщик каскада Django
+    и сигналы и не загружает строки: зависимые строки, счетчики
+    и журнал изменений обновляет вызывающий код. Вместо приватного
+    QuerySet._raw_delete, который делает то же самое.
+    """
+    connection = connections[queryset.db]
+    qn = connection.ops.quote_name
+    meta = queryset.model._meta
+    subquery, params = queryset.order_by().values('pk').query.get_compiler(
+        queryset.db
+    ).as_sql()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {qn(meta.db_table)} '
+            f'WHERE {qn(meta.pk.column)} IN ({subquery})',
+            params
+        )
+        return cursor.rowcount
+
+
+def delete_rows(queryset, counter):
+    """
+    DELETE строк queryset без загрузки объектов и сигналов
+    с уменьшением счетчика counter у их авторов и отметками об удалении
+    в журнале изменений.
+    """
+    authors = queryset.order_by().values_list('author').annotate(
+        count=Count('pk')
+    )
+    for author_id, count in authors:
+        User.objects.filter(pk=author_id).update(
+            **{counter: F(counter) - count}
+        )
+    record_deleted(
+        queryset.model, queryset.values_list('pk', flat=True), queryset.db
+    )
+    return raw_delete(queryset)
+
+
+def decrement_review_comments(queryset):
+    """Уменьшение comments_count отзывов на число комментариев queryset."""
+    counts = queryset.filter(review=OuterRef('pk')).order_by().values(
+        'review'
+    ).annotate(total=Count('pk')).values('total')
+    Review.objects.filter(pk__in=queryset.values('review')).update(
+        comments_count=F('comments_count') - Subquery(counts)
+    )
+
+
+def delete_comments(queryset, chunk_size, update_reviews=True):
+    """
+    Удаление комментариев. update_reviews=False - когда их отзывы
+    удаляются следом и счетчик отзыва обновлять не нужно.
+    """
+    deleted = 0
+    for ids in id_chunks(queryset, chunk_size):
+        chunk = Comment.objects.filter(pk__in=ids)
+        with transaction.atomic():
+            if update_reviews:
+                decrement_review_comments(chunk)
+            deleted += delete_rows(chunk, 'comments_count')
+    return deleted
+
+
+def delete_orphan_comments(chunk_size):
+    """
+    Удаление комментариев к несуществующим отзывам. Они появляются только
+    без внешнего ключа на отзывы (секционированные таблицы,
+    reviews.partitioning): комментарий, добавленный во время удаления
+    отзыва порциями, не попадает в удаляемую порцию.
+    """
+    return delete_comments(
+        Comment.objects.filter(
+            ~Exists(Review.objects.filter(pk=OuterRef('review_id')))
+        ),
+        chunk_size, update_reviews=False
+    )
+
+
+def delete_reviews(queryset, chunk_size):
+    """Удаление отзывов вместе с комментариями к ним."""
+    reviews = comments = 0
+    for ids in id_chunks(queryset, chunk_size):
+        comments += delete_comments(
+            Comment.objects.filter(review__in=ids), chunk_size,
+            update_reviews=False
+        )
+        chunk = Review.objects.filter(pk__in=ids)
+        with transaction.atomic():
+            ratings = list(
+                chunk.filter(title__isnull=False).order_by()
+                .values_list('title').annotate(Sum('score'), Count('pk'))
+            )
+            StaleSimilarity.objects.bulk_create(
+                StaleSimilarity(title=title_id) for title_id, *_ in ratings
+            )
+            # Комментарии, добавленные после удаления порции выше.
+            comments += delete_rows(
+                Comment.objects.filter(review__in=ids), 'comments_count'
+            )
+            reviews += delete_rows(chunk, 'reviews_count')
+            for title_id, total, count in ratings:
+                change_title_rating(Title, title_id, -total, -count)
+    return reviews, comments
+
+
+def delete_title(title, chunk_size):
+    reviews, comments = delete_reviews(title.reviews.all(), chunk_size)
+    Title.all_objects.filter(pk=title.pk).delete()
+    return reviews, comments
+
+
+def delete_user(user, chunk_size):
+    comments = delete_comments(user.comments.all(), chunk_size)
+    reviews, review_comments = delete_reviews(user.reviews.all(), chunk_size)
+    User.objects.filter(pk=user.pk).delete()
+    return reviews, comments + review_comments
@@ -0,0 +1,45 @@
+"""
+Денормализованный список жанров произведения (Title.genres).
+
+Поле хранит [{"name": ..., "slug": ...}] в порядке id жанров
+и отдается API без запроса к таблице жанров. Сигналы reviews.signals
+пересчитывают его при изменении связи genre и при изменении
+или удалении жанра.
+"""
+from collections import defaultdict
+from typing import Iterable
+
+from reviews.models import Title
+
+CHUNK_SIZE = 1000
+
+
+def genres_by_title(title_ids: Iterable[int]) -> dict:
+    through = Title.genre.through
+    result = defaultdict(list)
+    rows = through.objects.filter(title_id__in=title_ids).order_by(
+        'genre_id'
+    ).values_list('title_id', 'genre__name', 'genre__slug')
+    for title_id, name, slug in rows:
+        result[title_id].append({'name': name, 'slug': slug})
+    return result
+
+
+def refresh_title_genres(title_ids: Iterable[int]) -> None:
+    """Пересчет Title.genres для произведений title_ids."""
+    title_ids = sorted(set(title_ids))
+    for start in range(0, len(title_ids), CHUNK_SIZE):
+        chunk = title_ids[start:start + CHUNK_SIZE]
+        genres = genres_by_title(chunk)
+        Title.all_objects.bulk_update(
+            [Title(pk=pk, genres=genres.get(pk, [])) for pk in chunk],
+            ('genres',)
+        )
+
+
+def titles_with_genre(genre) -> list:
+    return list(
+        Title.genre.through.objects.filter(genre=genre).values_list(
+            'title_id', flat=True
+        )
+    )
@@ -0,0 +1,121 @@
+import multiprocessing
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+from reviews.models import Review
+
+
+def run_clients(urls, threads, rounds, barrier, results):
+    """
+    Клиенты одного процесса. В каждом раунде все клиенты всех процессов
+    одновременно запрашивают один и тот же URL.
+    """
+    queries = [0] * threads
+    failures = [0] * threads
+
+    def client(number):
+        def count(execute, sql, params, many, context):
+            queries[number] += 1
+            return execute(sql, params, many, context)
+
+        http = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        with connection.execute_wrapper(count):
+            for round_number in range(rounds):
+                barrier.wait()
+                response = http.get(urls[round_number % len(urls)])
+                failures[number] += response.status_code != 200
+        connection.close()
+
+    workers = [
+        threading.Thread(target=client, args=(number,))
+        for number in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    results.put((sum(queries), sum(failures)))
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает число запросов к базе и время ответа на одновременные '
+        'одинаковые запросы карточки произведения и первой страницы '
+        'отзывов без объединения запросов и с ним'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-p',
+            '--processes',
+            type=int,
+            default=2,
+            help='Количество процессов (как воркеров gunicorn)'
+        )
+        parser.add_argument(
+            '-t',
+            '--threads',
+            type=int,
+            default=16,
+            help='Количество одновременных клиентов в процессе'
+        )
+        parser.add_argument(
+            '-r',
+            '--rounds',
+            type=int,
+            default=20,
+            help='Количество раундов одновременных запросов'
+        )
+
+    def run(self, urls, options):
+        context = multiprocessing.get_context('fork')
+        barrier = context.Barrier(options['processes'] * options['threads'])
+        results = context.Queue()
+        connections.close_all()
+        processes = [
+            context.Process(target=run_clients, args=(
+                urls, options['threads'], options['rounds'], barrier, results
+            ))
+            for _ in range(options['processes'])
+        ]
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        totals = [results.get() for _ in processes]
+        elapsed = time.perf_counter() - started
+        for process in processes:
+            process.join()
+        return (
+            sum(queries for queries, _ in totals),
+            sum(failures for _, failures in totals),
+            elapsed,
+        )
+
+    def handle(self, *args, **options):
+        title = Review.objects.values('title').annotate(
+            total=Count('pk')
+        ).order_by('-total').first()
+        if title is None:
+            raise CommandError('В базе нет отзывов.')
+        urls = (
+            reverse('api:titles-detail', args=(title['title'],)),
+            reverse('api:reviews-list', args=(title['title'],)),
+        )
+        requests = (
+            options['processes'] * options['threads'] * options['rounds']
+        )
+        for enabled, label in ((False, 'без объединения'),
+                               (True, 'с объединением')):
+            with override_settings(SINGLE_FLIGHT_ENABLED=enabled):
+                queries, failures, elapsed = self.run(urls, options)
+            self.stdout.write(
+                f'{label}: {requests} запросов, к базе {queries} '
+                f'({queries / requests:.2f} на запрос), '
+                f'{elapsed:.2f} с, ошибок {failures}'
+            )
@@ -0,0 +1,121 @@
+import os
+import socket
+import subprocess
+import time
+from urllib.error import URLError
+from urllib.request import urlopen
+
+from api.memory import memory_usage
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def child_pids(pid):
+    """Дочерние процессы pid по /proc."""
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as file:
+                stat = file.read()
+        except OSError:
+            continue
+        if int(stat.rsplit(')', 1)[1].split()[1]) == pid:
+            children.append(int(entry))
+    return children
+
+
+def wait_ready(process, url, workers, timeout):
+    """Ожидание ответа сервера и запуска всех воркеров."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise CommandError('gunicorn завершился при запуске')
+        if len(child_pids(process.pid)) >= workers:
+            try:
+                urlopen(url, timeout=1).close()
+            except (URLError, OSError):
+                pass
+            else:
+                return
+        time.sleep(0.05)
+    raise CommandError('gunicorn не запустился за отведенное время')
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает gunicorn с настройками api_yamdb.gunicorn_conf '
+        'и измеряет время запуска и память воркеров'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('-w', '--workers', type=int, default=2)
+        parser.add_argument('-t', '--threads', type=int, default=1)
+        parser.add_argument(
+            '--no-preload',
+            action='store_true',
+            help='Загружать приложение в каждом воркере отдельно'
+        )
+        parser.add_argument(
+            '-n',
+            '--requests',
+            type=int,
+            default=200,
+            help='Количество запросов перед замером памяти'
+        )
+        parser.add_argument('--timeout', type=float, default=60)
+
+    def handle(self, *args, **options):
+        port = free_port()
+        url = f'http://127.0.0.1:{port}/api/v1/categories/'
+        env = dict(
+            os.environ,
+            GUNICORN_BIND=f'127.0.0.1:{port}',
+            GUNICORN_WORKERS=str(options['workers']),
+            GUNICORN_THREADS=str(options['threads']),
+            GUNICORN_PRELOAD='0' if options['no_preload'] else '1',
+            GUNICORN_MAX_REQUESTS='0',
+        )
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            ('gunicorn', '-c', 'python:api_yamdb.gunicorn_conf',
+             'api_yamdb.wsgi:application'),
+            cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_ready(process, url, options['workers'], options['timeout'])
+            booted = time.perf_counter() - started
+            for _ in range(options['requests']):
+                urlopen(url).close()
+            master = memory_usage(process.pid)
+            workers = [memory_usage(pid) for pid in child_pids(process.pid)]
+        finally:
+            process.terminate()
+            process.wait()
+        self.stdout.write(f'Запуск: {booted:.2f} с')
+        self.stdout.write(
+            'Мастер: RSS {Rss} КБ, PSS {Pss} КБ'.format(**master)
+        )
+        for number, usage in enumerate(workers, 1):
+            self.stdout.write(
+                f'Воркер {number}: '
+                'RSS {Rss} КБ, PSS {Pss} КБ, приватная {Private} КБ'.format(
+                    **usage
+                )
+            )
+        if workers:
+            self.stdout.write(self.style.SUCCESS(
+                'В среднем на воркер: PSS {:.0f} КБ, приватная {:.0f} КБ'
+                .format(
+                    sum(usage['Pss'] for usage in workers) / len(workers),
+                    sum(usage['Private'] for usage in workers) / len(workers)
+                )
+            ))
@@ -0,0 +1,138 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from reviews import partitioning
+from reviews.management.commands.generate_load import percentile
+from reviews.models import Review
+
+SUFFIXES = ('bench_plain', 'bench_part')
+
+
+def listing_sql(table: str, title_id: int):
+    """
+    Запрос первой страницы отзывов произведения, как в ReviewViewSet,
+    к таблице table вместо таблицы отзывов.
+    """
+    queryset = Review.objects.filter(
+        title_id=title_id, author__pending_deletion=False
+    ).select_related('author')[:settings.REST_FRAMEWORK['PAGE_SIZE']]
+    sql, params = queryset.query.get_compiler(connection=connection).as_sql()
+    qn = connection.ops.quote_name
+    return sql.replace(qn(Review._meta.db_table), qn(table)), params
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает задержку списка отзывов произведения на копиях таблицы '
+        'отзывов без секций и с секционированием по хешу title_id '
+        '(только PostgreSQL)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--partitions',
+            type=int,
+            default=16,
+            help='Количество секций в копии с секциями'
+        )
+        parser.add_argument(
+            '--titles',
+            type=int,
+            default=100,
+            help='Количество случайных произведений с отзывами'
+        )
+        parser.add_argument(
+            '-r',
+            '--repeat',
+            type=int,
+            default=5,
+            help='Количество проходов по произведениям'
+        )
+
+    def create_copy(self, table, partitions):
+        source = Review._meta.db_table
+        partitioning.create_table(
+            connection, source, table, 'title_id', partitions
+        )
+        partitioning.copy_rows(connection, source, table)
+        with connection.cursor() as cursor:
+            for number, definition in enumerate(
+                partitioning.index_definitions(connection, source)
+            ):
+                cursor.execute(partitioning.index_sql(
+                    definition, table, f'{table}_{number}_idx'
+                ))
+            cursor.execute(f'ANALYZE {table}')
+
+    def drop_copies(self, source):
+        with connection.cursor() as cursor:
+            for suffix in SUFFIXES:
+                cursor.execute(f'DROP TABLE IF EXISTS {source}_{suffix}')
+
+    def run(self, table, title_ids):
+        """Задержки запросов по одному проходу по произведениям, мс."""
+        timings = []
+        with connection.cursor() as cursor:
+            for title_id in title_ids:
+                sql, params = listing_sql(table, title_id)
+                started = time.perf_counter()
+                cursor.execute(sql, params)
+                cursor.fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    def measure(self, table, title_ids, repeat):
+        # Прогрев: первый проход читает страницы таблицы с диска.
+        self.run(table, title_ids)
+        timings = []
+        for _ in range(repeat):
+            timings += self.run(table, title_ids)
+        return sorted(timings)
+
+    def explain(self, table, title_id):
+        sql, params = listing_sql(table, title_id)
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN ' + sql, params)
+            return '\n'.join(row[0] for row in cursor.fetchall())
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError(
+                'Секционирование поддерживается только в PostgreSQL.'
+            )
+        if options['partitions'] < 2:
+            raise CommandError('Нужно не меньше двух секций.')
+        title_ids = list(
+            Review.objects.filter(title__isnull=False).order_by()
+            .values_list('title_id', flat=True).distinct()
+        )
+        if not title_ids:
+            raise CommandError('В базе нет отзывов.')
+        title_ids = random.sample(
+            title_ids, min(options['titles'], len(title_ids))
+        )
+        source = Review._meta.db_table
+        self.drop_copies(source)
+        try:
+            for suffix, label, partitions in (
+                ('bench_plain', 'без секций', 0),
+                ('bench_part', 'с секциями', options['partitions']),
+            ):
+                table = f'{source}_{suffix}'
+                self.create_copy(table, partitions)
+                timings = self.measure(table, title_ids, options['repeat'])
+                self.stdout.write(
+                    f'{label}: {len(timings)} запросов, '
+                    f'p50 {percentile(timings, 50):.2f} мс, '
+                    f'p95 {percentile(timings, 95):.2f} мс, '
+                    f'среднее {sum(timings) / len(timings):.2f} мс'
+                )
+            self.stdout.write(
+                'План с секциями (читается одна секция):\n'
+                + self.explain(f'{source}_bench_part', title_ids[0])
+            )
+        finally:
+            self.drop_copies(source)
@@ -0,0 +1,131 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from api.memory import process_memory
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from reviews.management.commands.generate_load import WsgiTarget, percentile
+
+from api_yamdb.gunicorn_conf import import_urlconf
+
+PROFILES = ('api_yamdb.settings', 'api_yamdb.settings_api')
+WARM_UP_REQUESTS = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает полный профиль настроек и профиль воркеров API: '
+        'время запуска, память процесса и время обработки запроса'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default='/categories/',
+            help='Адрес запросов относительно /api/v1'
+        )
+        parser.add_argument(
+            '-n',
+            '--requests',
+            type=int,
+            default=1000,
+            help='Количество замеряемых запросов'
+        )
+        parser.add_argument(
+            '--child',
+            action='store_true',
+            help='Замер в текущем процессе (запускается командой)'
+        )
+
+    def measure(self, path, count):
+        """
+        Загрузка приложения как в воркере gunicorn и запросы к нему
+        через WSGI-обработчик без сети. Результат - JSON в stdout.
+        """
+        target = WsgiTarget()
+        import_urlconf()
+        ready = time.time()
+        memory = process_memory()
+        statuses = Counter()
+        timings = []
+        for number in range(WARM_UP_REQUESTS + count):
+            started = time.perf_counter()
+            status, _ = target.request('GET', path, None, {}, '127.0.0.1')
+            if number >= WARM_UP_REQUESTS:
+                timings.append((time.perf_counter() - started) * 1000)
+                statuses[status] += 1
+        self.stdout.write(json.dumps({
+            'ready': ready,
+            'memory': memory,
+            'memory_after': process_memory(),
+            'modules': len(sys.modules),
+            'middleware': len(settings.MIDDLEWARE),
+            'apps': len(settings.INSTALLED_APPS),
+            'statuses': statuses,
+            'timings': sorted(timings),
+        }))
+
+    def run_profile(self, profile, path, count):
+        started = time.time()
+        process = subprocess.run(
+            (sys.executable, 'manage.py', 'benchmark_profiles', '--child',
+             '--path', path, '--requests', str(count),
+             '--settings', profile),
+            cwd=settings.BASE_DIR, env=os.environ.copy(),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        if process.returncode:
+            raise CommandError(
+                f'Замер профиля {profile} завершился с ошибкой:\n'
+                + process.stderr[-2000:]
+            )
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        result['startup'] = result['ready'] - started
+        return result
+
+    def report(self, profile, result):
+        timings = result['timings']
+        rss = result['memory'].get('Rss', result['memory'].get('MaxRss'))
+        rss_after = result['memory_after'].get(
+            'Rss', result['memory_after'].get('MaxRss')
+        )
+        self.stdout.write(self.style.SUCCESS(profile))
+        self.stdout.write(
+            f'  Приложений: {result["apps"]}, middleware: '
+            f'{result["middleware"]}, модулей: {result["modules"]}'
+        )
+        self.stdout.write(f'  Запуск: {result["startup"]:.2f} с')
+        self.stdout.write(
+            f'  RSS после запуска: {rss} КБ, после запросов: {rss_after} КБ'
+        )
+        self.stdout.write(
+            f'  Запрос: p50 {percentile(timings, 50):.3f} мс, '
+            f'p99 {percentile(timings, 99):.3f} мс, '
+            f'среднее {sum(timings) / len(timings):.3f} мс, '
+            f'ответы {dict(result["statuses"])}'
+        )
+
+    def handle(self, *args, **options):
+        if options['child']:
+            self.measure(options['path'], options['requests'])
+            return
+        if options['requests'] < 1:
+            raise CommandError('Нужен хотя бы один запрос.')
+        results = {
+            profile: self.run_profile(
+                profile, options['path'], options['requests']
+            )
+            for profile in PROFILES
+        }
+        for profile, result in results.items():
+            self.report(profile, result)
+        full, lean = (results[profile]['timings'] for profile in PROFILES)
+        self.stdout.write(
+            'Разница p50 на запрос: '
+            f'{percentile(full, 50) - percentile(lean, 50):.3f} мс'
+        )
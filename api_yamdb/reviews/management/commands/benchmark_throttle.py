@@ -0,0 +1,78 @@
+import time
+
+from api.models import ThrottleBucket
+from api.throttling import take_tokens
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from reviews.management.commands.generate_load import percentile
+
+KEY_PREFIX = 'benchmark:'
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет стоимость проверки ограничения частоты запросов '
+        '(api.throttling.take_tokens) на базе по умолчанию: время '
+        'и количество SQL-запросов на одну проверку'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-c',
+            '--clients',
+            type=int,
+            default=50,
+            help='Количество различных клиентов'
+        )
+        parser.add_argument(
+            '-k',
+            '--keys',
+            type=int,
+            default=3,
+            help='Ключей на проверку (у регистрации - IP, username, email)'
+        )
+        parser.add_argument(
+            '-n',
+            '--requests',
+            type=int,
+            default=2000,
+            help='Количество замеряемых проверок'
+        )
+
+    def handle(self, *args, **options):
+        clients, count = options['clients'], options['requests']
+        if min(clients, options['keys'], count) < 1:
+            raise CommandError('Нужны хотя бы один клиент, ключ и проверка.')
+        queries = [0]
+
+        def count_queries(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        timings = []
+        try:
+            with connection.execute_wrapper(count_queries):
+                for number in range(count):
+                    keys = [
+                        f'{KEY_PREFIX}{kind}:{number % clients}'
+                        for kind in range(options['keys'])
+                    ]
+                    started = time.perf_counter()
+                    # Емкость корзин не ограничивает замер.
+                    take_tokens(keys, count, 60, time.time())
+                    timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            ThrottleBucket.objects.filter(
+                key__startswith=KEY_PREFIX
+            ).delete()
+        timings.sort()
+        self.stdout.write(
+            f'{connection.vendor}, клиентов: {clients}, ключей: '
+            f'{options["keys"]}, проверок: {count}'
+        )
+        self.stdout.write(
+            f'Проверка: p50 {percentile(timings, 50):.3f} мс, '
+            f'p99 {percentile(timings, 99):.3f} мс, '
+            f'среднее {sum(timings) / len(timings):.3f} мс, '
+            f'SQL-запросов {queries[0] / count:.1f}'
+        )
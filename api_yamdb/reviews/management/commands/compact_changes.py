@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from reviews.changes import expired, superseded
+from reviews.deletion import id_chunks
+from reviews.models import Change
+
+
+class Command(BaseCommand):
+    help = (
+        'Сжимает журнал изменений: удаляет записи, после которых есть '
+        'запись о том же объекте, и отметки об удалении старше срока '
+        'хранения, порциями в отдельных транзакциях'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-d',
+            '--days',
+            type=int,
+            default=settings.CHANGE_FEED_RETENTION_DAYS,
+            help='Срок хранения отметок об удалении, дней'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Количество записей, удаляемых в одной транзакции'
+        )
+
+    def delete(self, queryset, chunk_size):
+        deleted = 0
+        for ids in id_chunks(queryset, chunk_size):
+            with transaction.atomic():
+                deleted += Change.objects.filter(pk__in=ids).delete()[0]
+        return deleted
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        changes = self.delete(superseded(), chunk_size)
+        deletions = self.delete(
+            expired(timedelta(days=options['days'])), chunk_size
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено записей журнала изменений: устаревших {changes}, '
+            f'отметок об удалении {deletions}.'
+        ))
@@ -0,0 +1,180 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Avg, Count, Value, Variance
+from django.db.models.functions import Coalesce
+from reviews.models import CatalogStat, Category, Genre, Review, Title
+from reviews.streaming import stream_array
+
+# Оценки целые от 1 до 10, столбец гистограммы соответствует оценке.
+SCORES = np.arange(11)
+PERCENTILES = (25, 50, 75, 90)
+
+
+def title_histograms(chunk_size):
+    """
+    Гистограммы оценок по произведениям: массив id произведений
+    и матрица (произведение x оценка) с количеством отзывов.
+    """
+    ratings = stream_array(
+        Review.objects.filter(title__isnull=False),
+        ('title_id', 'score'),
+        chunk_size
+    )
+    title_ids, index = np.unique(ratings[:, 0], return_inverse=True)
+    hist = np.bincount(
+        index * len(SCORES) + ratings[:, 1],
+        minlength=len(title_ids) * len(SCORES)
+    ).reshape(-1, len(SCORES))
+    return title_ids, hist
+
+
+def group_histograms(hist, rows, groups, size):
+    """Суммирование гистограмм строк rows по группам groups."""
+    result = np.zeros((size, len(SCORES)), dtype=np.int64)
+    np.add.at(result, groups, hist[rows])
+    return result, np.bincount(groups, minlength=size)
+
+
+def describe(hist):
+    """Количество, среднее, дисперсия и перцентили по гистограммам групп."""
+    count = hist.sum(axis=1)
+    total = np.maximum(count, 1)
+    mean = hist.dot(SCORES) / total
+    variance = hist.dot(SCORES ** 2) / total - mean ** 2
+    cumulative = hist.cumsum(axis=1)
+    percentiles = {
+        f'p{p}': (
+            cumulative >= np.ceil(p / 100 * count)[:, None]
+        ).argmax(axis=1)
+        for p in PERCENTILES
+    }
+    return count, mean, np.maximum(variance, 0), percentiles
+
+
+def match_titles(title_ids, ids):
+    """Позиции ids в отсортированном title_ids и маска найденных."""
+    if not len(title_ids):
+        return (
+            np.zeros(len(ids), dtype=np.int64), np.zeros(len(ids), dtype=bool)
+        )
+    position = np.minimum(
+        np.searchsorted(title_ids, ids), len(title_ids) - 1
+    )
+    return position, title_ids[position] == ids
+
+
+def build_stats(dimension, keys, hist, titles_count):
+    count, mean, variance, percentiles = describe(hist)
+    for index in np.flatnonzero(count):
+        yield CatalogStat(
+            dimension=dimension,
+            key=str(keys[index]),
+            titles_count=int(titles_count[index]),
+            reviews_count=int(count[index]),
+            mean=float(mean[index]),
+            variance=float(variance[index]),
+            **{name: int(values[index])
+               for name, values in percentiles.items()}
+        )
+
+
+def compute_stats(chunk_size):
+    title_ids, hist = title_histograms(chunk_size)
+    titles = stream_array(
+        Title.objects.annotate(category_key=Coalesce('category', Value(-1))),
+        ('id', 'category_key', 'year'),
+        chunk_size
+    )
+    position, found = match_titles(title_ids, titles[:, 0])
+    rows, titles = position[found], titles[found]
+
+    # Категории и жанры, удаленные после чтения произведений, пропускаются.
+    categories = dict(Category.objects.values_list('id', 'slug'))
+    has_category = np.isin(titles[:, 1], list(categories))
+    category_ids, groups = np.unique(
+        titles[has_category, 1], return_inverse=True
+    )
+    yield from build_stats(
+        'category',
+        [categories[pk] for pk in category_ids.tolist()],
+        *group_histograms(
+            hist, rows[has_category], groups, len(category_ids)
+        )
+    )
+
+    years, groups = np.unique(titles[:, 2], return_inverse=True)
+    yield from build_stats(
+        'year', years.tolist(),
+        *group_histograms(hist, rows, groups, len(years))
+    )
+
+    genres = dict(Genre.objects.values_list('id', 'slug'))
+    pairs = stream_array(
+        Title.genre.through.objects.filter(title__pending_deletion=False),
+        ('title_id', 'genre_id'),
+        chunk_size
+    )
+    position, found = match_titles(title_ids, pairs[:, 0])
+    found &= np.isin(pairs[:, 1], list(genres))
+    genre_ids, groups = np.unique(pairs[found, 1], return_inverse=True)
+    yield from build_stats(
+        'genre',
+        [genres[pk] for pk in genre_ids.tolist()],
+        *group_histograms(hist, position[found], groups, len(genre_ids))
+    )
+
+
+def orm_aggregation():
+    """Эквивалентная агрегация средствами ORM (для сравнения)."""
+    aggregates = {'reviews_count': Count('id'), 'mean': Avg('score')}
+    if connection.vendor == 'postgresql':
+        aggregates['variance'] = Variance('score')
+    for field in ('title__category__slug', 'title__genre__slug',
+                  'title__year'):
+        list(
+            Review.objects.filter(**{f'{field}__isnull': False})
+            .order_by().values(field).annotate(**aggregates)
+        )
+
+
+class Command(BaseCommand):
+    help = (
+        'Рассчитывает статистику оценок по категориям, жанрам и годам '
+        'и сохраняет ее в таблицу статистики каталога'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10000,
+            help='Размер порции при чтении данных'
+        )
+        parser.add_argument(
+            '-b',
+            '--benchmark',
+            action='store_true',
+            help='Сравнить время расчета с агрегацией через ORM'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stats = list(compute_stats(options['chunk_size']))
+        computed = time.perf_counter()
+        with transaction.atomic():
+            CatalogStat.objects.all().delete()
+            CatalogStat.objects.bulk_create(stats, batch_size=1000)
+        self.stdout.write(self.style.SUCCESS(
+            f'Сохранено строк статистики: {len(stats)}. '
+            f'Расчет: {computed - started:.3f} с.'
+        ))
+        if options['benchmark']:
+            started = time.perf_counter()
+            orm_aggregation()
+            self.stdout.write(
+                'Агрегация через ORM (без перцентилей): '
+                f'{time.perf_counter() - started:.3f} с.'
+            )
@@ -0,0 +1,184 @@
+import resource
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from reviews.models import Review, SimilarTitle, StaleSimilarity, Title
+from reviews.streaming import stream_array
+from scipy import sparse
+
+BATCH_SIZE = 1000
+# Предел размера плотного блока сходств (элементов float32) при расчете.
+BLOCK_CELLS = 2 ** 22
+
+
+def chunked(values, size=BATCH_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def load_ratings(chunk_size):
+    """Массив (author_id, title_id, score) всех отзывов."""
+    return stream_array(
+        Review.objects.filter(title__isnull=False),
+        ('author_id', 'title_id', 'score'),
+        chunk_size
+    )
+
+
+def build_matrix(ratings, adjusted):
+    """
+    Разреженная матрица произведение x пользователь с L2-нормированными
+    строками: скалярное произведение строк равно косинусному сходству.
+    """
+    title_ids, title_idx = np.unique(ratings[:, 1], return_inverse=True)
+    _, user_idx = np.unique(ratings[:, 0], return_inverse=True)
+    values = ratings[:, 2].astype(np.float32)
+    if adjusted:
+        means = (
+            np.bincount(user_idx, weights=values) / np.bincount(user_idx)
+        )
+        values = values - means[user_idx].astype(np.float32)
+    matrix = sparse.csr_matrix(
+        (values, (title_idx, user_idx)),
+        shape=(len(title_ids), user_idx.max() + 1 if len(user_idx) else 0),
+        dtype=np.float32
+    )
+    matrix.eliminate_zeros()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return title_ids, sparse.diags(1 / norms).dot(matrix).tocsr()
+
+
+def affected_titles(matrix, title_ids, stale_ids):
+    """
+    Индексы произведений, чьи списки похожих могут измениться:
+    сами измененные, имеющие с ними общих рецензентов
+    и ссылавшиеся на них в прошлом расчете.
+    """
+    position = {
+        title_id: index for index, title_id in enumerate(title_ids.tolist())
+    }
+    stale = [position[pk] for pk in stale_ids if pk in position]
+    affected = set(stale)
+    for ids in chunked(stale_ids):
+        previous = SimilarTitle.objects.filter(
+            similar_id__in=ids
+        ).values_list('title_id', flat=True)
+        affected.update(position[pk] for pk in previous if pk in position)
+    if stale:
+        binary = (matrix != 0).astype(np.float32)
+        co_reviewed = binary[stale].dot(binary.T).tocsr()
+        affected.update(co_reviewed.indices.tolist())
+    return np.array(sorted(affected), dtype=np.int64)
+
+
+def top_similar(matrix, title_ids, targets, top_k, min_score=0.0):
+    """Top-K похожих для каждого из targets, блоками ограниченного размера."""
+    count = matrix.shape[0]
+    k = min(top_k, count - 1)
+    if k <= 0:
+        return
+    block = max(1, BLOCK_CELLS // count)
+    for start in range(0, len(targets), block):
+        rows = targets[start:start + block]
+        sims = matrix[rows].dot(matrix.T).toarray()
+        sims[np.arange(len(rows)), rows] = -np.inf
+        best = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        for position, (row, columns) in enumerate(zip(rows, best)):
+            scores = sims[position, columns]
+            order = np.argsort(-scores)
+            for column, score in zip(columns[order], scores[order]):
+                if score > min_score:
+                    yield (
+                        int(title_ids[row]), int(title_ids[column]),
+                        float(score)
+                    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Рассчитывает похожие произведения по матрице оценок '
+        'пользователь x произведение (item-item cosine similarity)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-i',
+            '--incremental',
+            action='store_true',
+            help='Пересчитать только произведения, затронутые изменениями '
+                 'отзывов после прошлого расчета'
+        )
+        parser.add_argument(
+            '--adjusted',
+            action='store_true',
+            help='Adjusted cosine: вычитать среднюю оценку пользователя'
+        )
+        parser.add_argument(
+            '-k',
+            '--top-k',
+            type=int,
+            default=settings.SIMILAR_TITLES_TOP_K,
+            help='Количество похожих произведений для каждого произведения'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10000,
+            help='Размер порции при чтении отзывов'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        # Удаляются только прочитанные здесь отметки: сделанные во время
+        # расчета остаются для следующего.
+        marks = dict(StaleSimilarity.objects.values_list('pk', 'title'))
+        stale_ids = set(marks.values())
+        if options['incremental'] and not stale_ids:
+            self.stdout.write(self.style.SUCCESS('Изменений нет.'))
+            return
+        ratings = load_ratings(options['chunk_size'])
+        loaded = time.perf_counter()
+        title_ids, matrix = build_matrix(ratings, options['adjusted'])
+        if options['incremental']:
+            targets = affected_titles(matrix, title_ids, stale_ids)
+        else:
+            targets = np.arange(len(title_ids))
+        existing = set(Title.objects.values_list('id', flat=True))
+        similar = [
+            SimilarTitle(title_id=title, similar_id=other, score=score)
+            for title, other, score in top_similar(
+                matrix, title_ids, targets, options['top_k']
+            )
+            if title in existing and other in existing
+        ]
+        computed = time.perf_counter()
+        with transaction.atomic():
+            if options['incremental']:
+                target_ids = set(title_ids[targets].tolist()) | stale_ids
+                for ids in chunked(target_ids):
+                    SimilarTitle.objects.filter(title_id__in=ids).delete()
+            else:
+                SimilarTitle.objects.all().delete()
+            SimilarTitle.objects.bulk_create(similar, batch_size=BATCH_SIZE)
+            for ids in chunked(marks):
+                StaleSimilarity.objects.filter(pk__in=ids).delete()
+        finished = time.perf_counter()
+        matrix_bytes = (
+            matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано произведений: {len(targets)} из {len(title_ids)}, '
+            f'сохранено пар: {len(similar)}.\n'
+            f'Отзывов: {len(ratings)}, матрица: {matrix_bytes / 2**20:.1f} '
+            f'МБ, пиковый RSS: '
+            f'{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f}'
+            ' МБ.\n'
+            f'Время: чтение {loaded - started:.2f} с, '
+            f'расчет {computed - loaded:.2f} с, '
+            f'запись {finished - computed:.2f} с.'
+        ))
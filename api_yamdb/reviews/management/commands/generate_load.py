@@ -0,0 +1,529 @@
+import http.client
+import json
+import math
+import multiprocessing
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.http.request import validate_host
+from django.test import RequestFactory, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from reviews.deletion import delete_user
+from users.models import User
+
+API_PREFIX = '/api/v1'
+USER_PREFIX = 'loadtest'
+PERCENTILES = (50, 90, 95, 99)
+
+# Доли сценариев в смеси по умолчанию, переопределяются --mix.
+MIX = {
+    'titles_list': 30,
+    'titles_filter': 20,
+    'title_detail': 15,
+    'reviews_list': 15,
+    'comments_list': 8,
+    'review_post': 5,
+    'signup': 4,
+    'token': 3,
+}
+# Сценарии от имени заранее созданных пользователей: нужна общая
+# с целью база данных и SECRET_KEY.
+USER_SCENARIOS = ('review_post', 'token')
+EXPECTED_STATUS = {'review_post': 201}
+
+
+def wsgi_host() -> str:
+    """
+    Хост запросов к приложению в процессе: localhost, если он разрешен
+    ALLOWED_HOSTS, иначе первое разрешенное имя ('.example.com'
+    разрешает example.com, '*' - любое имя).
+    """
+    for host in ('localhost', *settings.ALLOWED_HOSTS):
+        host = host.lstrip('.')
+        if host != '*' and validate_host(host, settings.ALLOWED_HOSTS):
+            return host
+    return 'localhost'
+
+
+class WsgiTarget:
+    """Приложение в этом же процессе, без сети и сервера."""
+
+    def __init__(self):
+        self.handler = WSGIHandler()
+        self.factory = RequestFactory(HTTP_HOST=wsgi_host())
+
+    def request(self, method, path, body, headers, client_ip):
+        request = self.factory.generic(
+            method, API_PREFIX + path,
+            data=json.dumps(body) if body is not None else '',
+            content_type='application/json', REMOTE_ADDR=client_ip,
+            **{
+                'HTTP_' + name.upper().replace('-', '_'): value
+                for name, value in headers.items()
+            }
+        )
+        response = self.handler(request.environ, lambda *args: None)
+        try:
+            content = b''.join(response)
+        finally:
+            response.close()
+        return response.status_code, content
+
+
+class HttpTarget:
+    """Сервер по HTTP, постоянное соединение на клиента."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.connection_class = (
+            http.client.HTTPSConnection if parts.scheme == 'https'
+            else http.client.HTTPConnection
+        )
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/') + API_PREFIX
+        self.connection = None
+
+    def request(self, method, path, body, headers, client_ip):
+        headers = dict(headers, **{
+            'Content-Type': 'application/json',
+            'X-Forwarded-For': client_ip,
+        })
+        data = json.dumps(body).encode() if body is not None else None
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = self.connection_class(
+                    self.netloc, timeout=30
+                )
+            try:
+                self.connection.request(
+                    method, self.prefix + path, body=data, headers=headers
+                )
+                response = self.connection.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, OSError):
+                # Сервер мог закрыть простаивающее соединение.
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+        return None
+
+
+def make_target(url):
+    return HttpTarget(url) if url else WsgiTarget()
+
+
+def discover(target):
+    """Произведения, slug, годы и отзывы цели для сценариев."""
+    status, content = target.request(
+        'GET', '/titles/?limit=200', None, {}, '127.0.0.1'
+    )
+    if status != 200:
+        raise CommandError(f'Список произведений недоступен: {status}')
+    data = json.loads(content)
+    titles = data['results']
+    if not titles:
+        raise CommandError('В базе нет произведений.')
+    catalog = {
+        'titles_count': data['count'],
+        'titles': [title['id'] for title in titles],
+        'years': [title['year'] for title in titles],
+        'genres': sorted({
+            genre['slug'] for title in titles for genre in title['genre']
+        }),
+        'categories': sorted({
+            title['category']['slug'] for title in titles
+            if title['category']
+        }),
+        'reviews': [],
+    }
+    for title_id in catalog['titles'][:20]:
+        status, content = target.request(
+            'GET', f'/titles/{title_id}/reviews/?limit=20', None, {},
+            '127.0.0.1'
+        )
+        if status == 200:
+            catalog['reviews'].extend(
+                (title_id, review['id'])
+                for review in json.loads(content)['results']
+            )
+    return catalog
+
+
+class VirtualClient:
+    """Клиент со своим адресом, пользователем и генератором сценариев."""
+
+    def __init__(self, number, catalog, user, seed, run_id):
+        self.number = number
+        self.catalog = catalog
+        self.user = user
+        self.rng = random.Random(seed)
+        self.run_id = run_id
+        self.ip = '10.{}.{}.{}'.format(
+            number // 65536 % 256, number // 256 % 256, number % 256
+        )
+        self.signups = 0
+        self.reviewed = set()
+
+    def page_offset(self, count):
+        """Чаще первые страницы, реже дальние."""
+        return min(5 * int(self.rng.expovariate(0.3)), max(count - 1, 0))
+
+    def titles_list(self):
+        return 'GET', '/titles/', {
+            'offset': self.page_offset(self.catalog['titles_count'])
+        }, None
+
+    def titles_filter(self):
+        catalog = self.catalog
+        params = self.rng.choice([
+            {'genre': self.rng.choice(catalog['genres'] or [''])},
+            {'category': self.rng.choice(catalog['categories'] or [''])},
+            {'year__gte': self.rng.choice(catalog['years'])},
+            {'ordering': self.rng.choice(('-rating', '-year', 'name'))},
+        ])
+        return 'GET', '/titles/', params, None
+
+    def title_detail(self):
+        title_id = self.rng.choice(self.catalog['titles'])
+        return 'GET', f'/titles/{title_id}/', {}, None
+
+    def reviews_list(self):
+        title_id = self.rng.choice(self.catalog['titles'])
+        return 'GET', f'/titles/{title_id}/reviews/', {
+            'offset': self.page_offset(20)
+        }, None
+
+    def comments_list(self):
+        if not self.catalog['reviews']:
+            return self.reviews_list()
+        title_id, review_id = self.rng.choice(self.catalog['reviews'])
+        return (
+            'GET', f'/titles/{title_id}/reviews/{review_id}/comments/',
+            {}, None
+        )
+
+    def signup(self):
+        self.signups += 1
+        username = (
+            f'{USER_PREFIX}_{self.run_id}_{self.number}_s{self.signups}'
+        )
+        return 'POST', '/auth/signup/', {}, {
+            'username': username, 'email': f'{username}@example.com'
+        }
+
+    def token(self):
+        return 'POST', '/auth/token/', {}, {
+            'username': self.user['username'],
+            'confirmation_code': self.user['confirmation_code'],
+        }
+
+    def review_post(self):
+        titles = [
+            title_id for title_id in self.catalog['titles']
+            if title_id not in self.reviewed
+        ] or self.catalog['titles']
+        title_id = self.rng.choice(titles)
+        self.reviewed.add(title_id)
+        return 'POST', f'/titles/{title_id}/reviews/', {}, {
+            'text': 'Отзыв нагрузочного теста',
+            'score': self.rng.randint(1, 10),
+        }
+
+    def headers(self, scenario):
+        if scenario == 'review_post':
+            return {'Authorization': f'Bearer {self.user["access"]}'}
+        return {}
+
+
+def run_client(url, client, mix, deadline, requests):
+    """Сценарии одного клиента до deadline или requests запросов."""
+    target = make_target(url)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    results = {name: {'latencies': [], 'statuses': Counter()}
+               for name in names}
+    sent = 0
+    while time.monotonic() < deadline and (not requests or sent < requests):
+        name = client.rng.choices(names, weights)[0]
+        method, path, params, body = getattr(client, name)()
+        if params:
+            path = f'{path}?{urlencode(params)}'
+        started = time.perf_counter()
+        try:
+            status = target.request(
+                method, path, body, client.headers(name), client.ip
+            )[0]
+        except (http.client.HTTPException, OSError) as error:
+            status = type(error).__name__
+        results[name]['latencies'].append(time.perf_counter() - started)
+        results[name]['statuses'][status] += 1
+        sent += 1
+    connections.close_all()
+    return results
+
+
+def run_process(url, clients, mix, deadline, requests, queue=None):
+    """Клиенты процесса в потоках, результаты в queue или возвратом."""
+    results = [None] * len(clients)
+
+    def worker(index):
+        results[index] = run_client(
+            url, clients[index], mix, deadline, requests
+        )
+
+    threads = [
+        threading.Thread(target=worker, args=(index,))
+        for index in range(len(clients))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if queue is None:
+        return results
+    queue.put(results)
+    return None
+
+
+def percentile(values, q):
+    """Перцентиль по ближайшему рангу, values отсортированы."""
+    return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+
+def summarize(results, elapsed):
+    """Пропускная способность, задержки и ошибки по сценариям и всего."""
+    merged = {}
+    for client_results in results:
+        for name, result in client_results.items():
+            total = merged.setdefault(
+                name, {'latencies': [], 'statuses': Counter()}
+            )
+            total['latencies'].extend(result['latencies'])
+            total['statuses'].update(result['statuses'])
+    report = {
+        name: describe(
+            result, statuses_ok=result['statuses'][
+                EXPECTED_STATUS.get(name, 200)
+            ], elapsed=elapsed
+        )
+        for name, result in merged.items() if result['latencies']
+    }
+    report['total'] = describe(
+        {
+            'latencies': [
+                latency for result in merged.values()
+                for latency in result['latencies']
+            ],
+            'statuses': sum(
+                (result['statuses'] for result in merged.values()),
+                Counter()
+            ),
+        },
+        statuses_ok=sum(
+            report[name]['requests'] - report[name]['errors']
+            - report[name]['throttled'] for name in report
+        ),
+        elapsed=elapsed
+    )
+    return report
+
+
+def describe(result, statuses_ok, elapsed):
+    latencies = sorted(result['latencies'])
+    statuses = result['statuses']
+    count = len(latencies)
+    throttled = statuses[429]
+    errors = count - statuses_ok - throttled
+    return {
+        'requests': count,
+        'throughput_rps': round(count / elapsed, 1),
+        'errors': errors,
+        'error_rate': round(errors / count, 4),
+        'throttled': throttled,
+        'statuses': {
+            str(status): number for status, number in statuses.items()
+        },
+        'latency_ms': dict(
+            mean=round(sum(latencies) / count * 1000, 2),
+            **{
+                f'p{q}': round(percentile(latencies, q) * 1000, 2)
+                for q in PERCENTILES
+            },
+            max=round(latencies[-1] * 1000, 2),
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест: смесь запросов к произведениям, отзывам, '
+        'комментариям, регистрации и получению токена от нескольких '
+        'клиентов в потоках и процессах. Цель - приложение в этом же '
+        'процессе (по умолчанию) или сервер по --url. Результат - JSON '
+        'с пропускной способностью, перцентилями задержек и долей '
+        'ошибок по сценариям'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            help='Адрес сервера, например http://localhost '
+                 '(стек docker-compose); без него - приложение в процессе'
+        )
+        parser.add_argument(
+            '-p',
+            '--processes',
+            type=int,
+            default=1,
+            help='Количество процессов'
+        )
+        parser.add_argument(
+            '-t',
+            '--threads',
+            type=int,
+            default=4,
+            help='Количество клиентов-потоков в каждом процессе'
+        )
+        parser.add_argument(
+            '-d',
+            '--duration',
+            type=float,
+            default=10,
+            help='Длительность теста, секунды'
+        )
+        parser.add_argument(
+            '-n',
+            '--requests',
+            type=int,
+            default=0,
+            help='Количество запросов каждого клиента (0 - без ограничения)'
+        )
+        parser.add_argument(
+            '--mix',
+            default='',
+            help='Доли сценариев через запятую, например '
+                 'titles_list=50,review_post=0; сценарии: '
+                 + ', '.join(MIX)
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--keep-data',
+            action='store_true',
+            help='Не удалять созданных тестом пользователей и их отзывы'
+        )
+        parser.add_argument('-o', '--output', help='Файл для JSON')
+
+    def parse_mix(self, value):
+        mix = dict(MIX)
+        for item in filter(None, value.split(',')):
+            name, _, weight = item.partition('=')
+            if name not in MIX:
+                raise CommandError(f'Неизвестный сценарий: {name}')
+            try:
+                mix[name] = float(weight)
+            except ValueError:
+                raise CommandError(f'Неверная доля сценария: {item}')
+        mix = {name: weight for name, weight in mix.items() if weight > 0}
+        if not mix:
+            raise CommandError('В смеси нет сценариев.')
+        return mix
+
+    def make_users(self, run_id, count):
+        """Пользователи сценариев записи: JWT и код подтверждения."""
+        users = []
+        for number in range(count):
+            user = User.objects.create(
+                username=f'{USER_PREFIX}_{run_id}_{number}',
+                email=f'{USER_PREFIX}_{run_id}_{number}@example.com'
+            )
+            users.append({
+                'username': user.username,
+                'access': str(AccessToken.for_user(user)),
+                'confirmation_code': default_token_generator.make_token(
+                    user
+                ),
+            })
+        return users
+
+    def run(self, url, clients, mix, options):
+        started = time.perf_counter()
+        deadline = time.monotonic() + options['duration']
+        processes = options['processes']
+        if processes == 1:
+            results = run_process(
+                url, clients, mix, deadline, options['requests']
+            )
+            return results, time.perf_counter() - started
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+        connections.close_all()
+        threads = options['threads']
+        workers = [
+            context.Process(target=run_process, args=(
+                url, clients[number * threads:(number + 1) * threads], mix,
+                deadline, options['requests'], queue
+            ))
+            for number in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        results = [result for _ in workers for result in queue.get()]
+        elapsed = time.perf_counter() - started
+        for worker in workers:
+            worker.join()
+        return results, elapsed
+
+    def handle(self, *args, **options):
+        url = options['url']
+        mix = self.parse_mix(options['mix'])
+        count = options['processes'] * options['threads']
+        run_id = uuid.uuid4().hex[:8]
+        # Письма регистрации приложения в процессе не отправляются.
+        with override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.dummy.EmailBackend'
+        ):
+            catalog = discover(make_target(url))
+            users = (
+                self.make_users(run_id, count)
+                if set(mix) & set(USER_SCENARIOS) else [None] * count
+            )
+            clients = [
+                VirtualClient(number, catalog, users[number],
+                              options['seed'] + number, run_id)
+                for number in range(count)
+            ]
+            try:
+                results, elapsed = self.run(url, clients, mix, options)
+            finally:
+                if not options['keep_data']:
+                    self.cleanup(run_id)
+        report = {
+            'target': url or 'wsgi',
+            'processes': options['processes'],
+            'threads': options['threads'],
+            'duration_s': round(elapsed, 2),
+            'mix': mix,
+            'endpoints': summarize(results, elapsed),
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+    def cleanup(self, run_id):
+        for user in User.objects.filter(
+            username__startswith=f'{USER_PREFIX}_{run_id}_'
+        ):
+            delete_user(user, 1000)
@@ -4,6 +4,8 @@ import os
 import django.db.utils
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.management.base import BaseCommand
+from reviews.counters import (recount_author_counters, recount_review_comments,
+                              recount_title_ratings)
 from reviews.models import Category, Comment, Genre, Review, Title
 from users.models import User
 
@@ -104,6 +106,9 @@ class Command(BaseCommand):
                 for model, name_file in DATA.items():
                     load_data(model, name_file)
                 load_genre_title()
+                recount_author_counters(User, Review, Comment)
+                recount_review_comments(Review, Comment)
+                recount_title_ratings(Title, Review)
                 self.stdout.write(
                     self.style.SUCCESS('Таблицы загружены в базу данных.'))
             elif options['clear']:
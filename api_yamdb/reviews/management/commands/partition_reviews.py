@@ -0,0 +1,38 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from reviews import partitioning
+
+
+class Command(BaseCommand):
+    help = (
+        'Секционирует таблицы отзывов и комментариев PostgreSQL по хешу '
+        'title_id и review_id или возвращает обычные таблицы '
+        '(--partitions 0)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--partitions',
+            type=int,
+            required=True,
+            help='Количество секций, 0 - обычные таблицы'
+        )
+
+    def handle(self, *args, **options):
+        partitions = options['partitions']
+        if connection.vendor != 'postgresql':
+            raise CommandError('Секционирование есть только в PostgreSQL.')
+        if partitions < 0:
+            raise CommandError('Количество секций не может быть меньше 0.')
+        # Все таблицы пересоздаются в одной транзакции редактора схемы.
+        with connection.schema_editor() as schema_editor:
+            partitioning.partition_tables(
+                schema_editor, lambda name: apps.get_model('reviews', name),
+                partitions
+            )
+        if partitions:
+            message = f'Таблицы отзывов и комментариев: {partitions} секций.'
+        else:
+            message = 'Таблицы отзывов и комментариев без секций.'
+        self.stdout.write(self.style.SUCCESS(message))
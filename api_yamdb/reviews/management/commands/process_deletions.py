@@ -0,0 +1,76 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from reviews import moderation, partitioning
+from reviews.deletion import delete_orphan_comments, delete_title, delete_user
+from reviews.models import ModerationJob, Review, Title
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет помеченные на удаление произведения и пользователей '
+        'вместе с отзывами и комментариями и выполняет брошенные задания '
+        'массовой модерации, порциями в отдельных транзакциях'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Количество строк, удаляемых в одной транзакции'
+        )
+        parser.add_argument(
+            '--orphans',
+            action='store_true',
+            help='Искать комментарии без отзыва и при обычных таблицах '
+                 '(по умолчанию - только при секционированных)'
+        )
+
+    def check_orphans(self, options):
+        """
+        Без внешнего ключа комментариев на отзывы (секционированные
+        таблицы) удаление отзывов в обход каскада может оставить
+        комментарии без отзыва.
+        """
+        if not (options['orphans'] or (
+            connection.vendor == 'postgresql'
+            and partitioning.is_partitioned(
+                connection, Review._meta.db_table
+            )
+        )):
+            return
+        orphans = delete_orphan_comments(options['chunk_size'])
+        self.stdout.write(f'Удалено комментариев без отзыва: {orphans}.')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        jobs = [
+            (delete_title, title)
+            for title in Title.all_objects.filter(pending_deletion=True)
+        ] + [
+            (delete_user, user)
+            for user in User.objects.filter(pending_deletion=True)
+        ]
+        for delete, obj in jobs:
+            started = time.perf_counter()
+            reviews, comments = delete(obj, chunk_size)
+            self.stdout.write(
+                f'Удалено: {obj._meta.verbose_name} "{obj}", '
+                f'отзывов {reviews}, комментариев {comments}, '
+                f'{time.perf_counter() - started:.2f} с.'
+            )
+        for job_id in moderation.pending_jobs():
+            if moderation.run(job_id, chunk_size):
+                job = ModerationJob.objects.get(pk=job_id)
+                self.stdout.write(
+                    f'Задание модерации {job_id}: {job.get_status_display()}'
+                    f', отзывов {job.reviews_deleted}, '
+                    f'комментариев {job.comments_deleted}.'
+                )
+        self.check_orphans(options)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано объектов: {len(jobs)}.'
+        ))
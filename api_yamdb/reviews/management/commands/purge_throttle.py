@@ -0,0 +1,29 @@
+import time
+
+from api.models import ThrottleBucket
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет корзины ограничения частоты запросов, к которым не '
+        'обращались дольше заданного времени: такие корзины уже полные, '
+        'и их удаление не сбрасывает действующих ограничений'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--age',
+            type=int,
+            default=24 * 60 * 60,
+            help='Время без обращений в секундах, не меньше периода '
+                 'самого длинного ограничения'
+        )
+
+    def handle(self, *args, **options):
+        deleted, _ = ThrottleBucket.objects.filter(
+            updated__lt=time.time() - options['age']
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено корзин ограничения запросов: {deleted}.'
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from reviews.counters import (recount_author_counters, recount_review_comments,
+                              recount_title_ratings)
+from reviews.models import Comment, Review, Title
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет денормализованные счетчики (отзывы и комментарии '
+        'пользователей, комментарии отзывов, рейтинги произведений) '
+        'с фактическими данными и исправляет расхождения'
+    )
+
+    def handle(self, *args, **options):
+        users = recount_author_counters(User, Review, Comment)
+        reviews = recount_review_comments(Review, Comment)
+        titles = recount_title_ratings(Title, Review)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счетчиков: пользователей {users}, '
+            f'отзывов {reviews}, рейтингов произведений {titles}.'
+        ))
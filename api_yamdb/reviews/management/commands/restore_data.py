@@ -0,0 +1,68 @@
+import os
+import tempfile
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from reviews.management.commands.load_data import del_data
+from reviews.snapshots import APP_LABELS, restore_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        'Заменяет данные таблиц YaMDb данными из снимка, '
+        'созданного командой snapshot_data'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу снимка')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '-b',
+            '--benchmark',
+            action='store_true',
+            help='Сравнить время с очисткой load_data --clear '
+                 'и загрузкой фикстуры через loaddata'
+        )
+
+    def restore(self, options):
+        started = time.perf_counter()
+        manifest = restore_snapshot(
+            connections[options['database']], options['path']
+        )
+        return manifest, time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        manifest, elapsed = self.restore(options)
+        rows = sum(table['rows'] for table in manifest['tables'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Снимок {options["path"]} восстановлен: строк {rows}, '
+            f'{elapsed:.2f} с.'
+        ))
+        if options['benchmark']:
+            self.benchmark(options)
+
+    def benchmark(self, options):
+        database = options['database']
+        fd, fixture = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        try:
+            call_command(
+                'dumpdata', *APP_LABELS, database=database, output=fixture
+            )
+            started = time.perf_counter()
+            del_data()
+            cleared = time.perf_counter()
+            call_command(
+                'loaddata', fixture, database=database, verbosity=0
+            )
+            loaded = time.perf_counter()
+        finally:
+            os.remove(fixture)
+        _, elapsed = self.restore(options)
+        self.stdout.write(
+            f'load_data --clear: {cleared - started:.2f} с, '
+            f'loaddata: {loaded - cleared:.2f} с, '
+            f'restore_data: {elapsed:.2f} с.'
+        )
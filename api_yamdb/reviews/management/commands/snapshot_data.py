@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from reviews.snapshots import create_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        'Сохраняет данные таблиц YaMDb в файл снимка '
+        '(формат COPY в zip-архиве) для быстрого восстановления'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу снимка')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        manifest = create_snapshot(
+            connections[options['database']], options['path']
+        )
+        rows = sum(table['rows'] for table in manifest['tables'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Снимок {options["path"]} сохранен: таблиц '
+            f'{len(manifest["tables"])}, строк {rows}, '
+            f'{time.perf_counter() - started:.2f} с.'
+        ))
@@ -0,0 +1,21 @@
+from django.db import migrations
+from reviews import search
+
+
+def install(apps, schema_editor):
+    search.install(schema_editor.connection)
+
+
+def uninstall(apps, schema_editor):
+    search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_auto_20261019_1002'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
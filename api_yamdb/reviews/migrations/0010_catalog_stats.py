@@ -0,0 +1,39 @@
+# Generated by Django 3.2 on 2026-10-19 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_similar_titles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('category', 'Категория'), ('genre', 'Жанр'), ('year', 'Год')], max_length=10, verbose_name='Разрез')),
+                ('key', models.CharField(max_length=50, verbose_name='Slug категории или жанра, год')),
+                ('titles_count', models.PositiveIntegerField(verbose_name='Количество произведений с отзывами')),
+                ('reviews_count', models.PositiveIntegerField(verbose_name='Количество отзывов')),
+                ('mean', models.FloatField(verbose_name='Средняя оценка')),
+                ('variance', models.FloatField(verbose_name='Дисперсия оценок')),
+                ('p25', models.PositiveSmallIntegerField(verbose_name='25-й перцентиль')),
+                ('p50', models.PositiveSmallIntegerField(verbose_name='Медиана')),
+                ('p75', models.PositiveSmallIntegerField(verbose_name='75-й перцентиль')),
+                ('p90', models.PositiveSmallIntegerField(verbose_name='90-й перцентиль')),
+                ('computed_at', models.DateTimeField(auto_now=True, verbose_name='Время расчета')),
+            ],
+            options={
+                'verbose_name': 'Статистика каталога',
+                'verbose_name_plural': 'Статистика каталога',
+                'ordering': ('dimension', 'key'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='catalogstat',
+            constraint=models.UniqueConstraint(fields=('dimension', 'key'), name='unique_catalog_stat'),
+        ),
+    ]
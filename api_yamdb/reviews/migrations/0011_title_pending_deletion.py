@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-19 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0010_catalog_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='pending_deletion',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Ожидает удаления'),
+        ),
+    ]
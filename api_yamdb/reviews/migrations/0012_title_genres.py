@@ -0,0 +1,52 @@
+# Generated by Django 3.2 on 2026-10-19 10:28
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+GIN_INDEX = 'reviews_title_genres_gin_idx'
+
+
+def fill_genres(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    genres = defaultdict(list)
+    rows = Title.genre.through.objects.order_by('genre_id').values_list(
+        'title_id', 'genre__name', 'genre__slug'
+    )
+    for title_id, name, slug in rows.iterator():
+        genres[title_id].append({'name': name, 'slug': slug})
+    Title.objects.bulk_update(
+        [Title(pk=pk, genres=value) for pk, value in genres.items()],
+        ('genres',),
+        batch_size=1000
+    )
+
+
+def create_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {GIN_INDEX} '
+            'ON reviews_title USING GIN (genres jsonb_path_ops)'
+        )
+
+
+def drop_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {GIN_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0011_title_pending_deletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='genres',
+            field=models.JSONField(default=list, editable=False, help_text='Копия связи genre, обновляется сигналами.', verbose_name='Жанры произведения (name и slug)'),
+        ),
+        migrations.RunPython(fill_genres, migrations.RunPython.noop),
+        migrations.RunPython(create_gin_index, drop_gin_index),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2 on 2026-10-19 10:32
+
+from django.db import migrations, models
+from reviews.counters import recount_review_comments
+
+
+def fill_counters(apps, schema_editor):
+    recount_review_comments(
+        apps.get_model('reviews', 'Review'),
+        apps.get_model('reviews', 'Comment'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0012_title_genres'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
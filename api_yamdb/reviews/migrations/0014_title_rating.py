@@ -0,0 +1,80 @@
+# Generated by Django 3.2 on 2026-10-19 10:37
+
+from django.db import migrations, models
+from django.db.models import Avg, OuterRef, Subquery
+
+RATING_INDEXES = {
+    'title_rating_idx': 'rating NULLS FIRST, id',
+    'title_category_rating_idx': 'category_id, rating NULLS FIRST, id',
+}
+
+
+def fill_ratings(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+    Title.objects.update(rating=Subquery(
+        Review.objects.filter(title=OuterRef('pk'))
+        .order_by().values('title')
+        .annotate(average=Avg('score')).values('average'),
+        output_field=models.FloatField()
+    ))
+
+
+def rating_nulls_first(apps, schema_editor):
+    # Сортировка по рейтингу ставит произведения без отзывов первыми
+    # по возрастанию и последними по убыванию. В PostgreSQL NULL
+    # по умолчанию больше любых значений, поэтому индексы пересоздаются
+    # с NULLS FIRST, чтобы оба направления читались из них.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, columns in RATING_INDEXES.items():
+        schema_editor.execute(f'DROP INDEX {name}')
+        schema_editor.execute(
+            f'CREATE INDEX {name} ON reviews_title ({columns})'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0013_review_comments_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='rating',
+            field=models.FloatField(editable=False, help_text='Пересчитывается сигналами при изменении отзывов.', null=True, verbose_name='Рейтинг (средняя оценка)'),
+        ),
+        migrations.RunPython(fill_ratings, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='title',
+            name='name',
+            field=models.CharField(max_length=200, verbose_name='Имя произведения'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['rating', 'id'], name='title_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['year', 'id'], name='title_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['name', 'id'], name='title_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', 'rating', 'id'], name='title_category_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', 'year', 'id'], name='title_category_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', 'name', 'id'], name='title_category_name_idx'),
+        ),
+        migrations.RunPython(rating_nulls_first, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+from reviews import partitioning
+
+
+def unpartition(apps, schema_editor):
+    """
+    Обычные таблицы отзывов и комментариев при откате, если их
+    секционировала команда partition_reviews.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    partitioning.partition_tables(
+        schema_editor, lambda name: apps.get_model('reviews', name), 0
+    )
+
+
+class Migration(migrations.Migration):
+    # Секционирование выполняет команда partition_reviews, миграция
+    # ничего не меняет при применении и только возвращает обычные
+    # таблицы при откате до 0014.
+
+    dependencies = [
+        ('reviews', '0014_title_rating'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, unpartition),
+    ]
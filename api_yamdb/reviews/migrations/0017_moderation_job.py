@@ -0,0 +1,42 @@
+# Generated by Django 3.2 on 2026-10-19 11:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reviews', '0016_change_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModerationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(blank=True, choices=[('review', 'Отзывы'), ('comment', 'Комментарии')], help_text='Пусто - отзывы и комментарии.', max_length=7, verbose_name='Что удалять')),
+                ('pub_date_after', models.DateTimeField(blank=True, null=True, verbose_name='Опубликовано не раньше')),
+                ('pub_date_before', models.DateTimeField(blank=True, null=True, verbose_name='Опубликовано не позже')),
+                ('text_pattern', models.CharField(blank=True, max_length=200, verbose_name='Регулярное выражение по тексту')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает'), ('running', 'Выполняется'), ('done', 'Выполнено'), ('failed', 'Ошибка')], default='pending', max_length=7, verbose_name='Состояние')),
+                ('reviews_matched', models.PositiveIntegerField(default=0, verbose_name='Найдено отзывов')),
+                ('comments_matched', models.PositiveIntegerField(default=0, help_text='Без комментариев к найденным отзывам.', verbose_name='Найдено комментариев')),
+                ('reviews_deleted', models.PositiveIntegerField(default=0, verbose_name='Удалено отзывов')),
+                ('comments_deleted', models.PositiveIntegerField(default=0, help_text='Включая комментарии к удаленным отзывам.', verbose_name='Удалено комментариев')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Последний прогресс')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+                ('author', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='moderation_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Модератор')),
+            ],
+            options={
+                'verbose_name': 'Задание модерации',
+                'verbose_name_plural': 'Задания модерации',
+                'ordering': ('-id',),
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+from django.db import migrations, models
+
+
+def copy_marks(apps, schema_editor):
+    StaleSimilarity = apps.get_model('reviews', 'StaleSimilarity')
+    SimilarityMark = apps.get_model('reviews', 'SimilarityMark')
+    SimilarityMark.objects.bulk_create(
+        SimilarityMark(title=title) for title
+        in StaleSimilarity.objects.values_list('title', flat=True)
+    )
+
+
+def copy_titles(apps, schema_editor):
+    StaleSimilarity = apps.get_model('reviews', 'StaleSimilarity')
+    SimilarityMark = apps.get_model('reviews', 'SimilarityMark')
+    StaleSimilarity.objects.bulk_create(
+        (StaleSimilarity(title=title) for title in set(
+            SimilarityMark.objects.values_list('title', flat=True)
+        )),
+        ignore_conflicts=True
+    )
+
+
+class Migration(migrations.Migration):
+    """
+    StaleSimilarity: отметки с собственным id вместо первичного ключа
+    по произведению. Отметки переносятся через временную таблицу.
+    """
+
+    dependencies = [
+        ('reviews', '0017_moderation_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarityMark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.BigIntegerField(db_index=True, verbose_name='id произведения')),
+            ],
+        ),
+        migrations.RunPython(copy_marks, copy_titles),
+        migrations.DeleteModel(
+            name='StaleSimilarity',
+        ),
+        migrations.RenameModel(
+            old_name='SimilarityMark',
+            new_name='StaleSimilarity',
+        ),
+        migrations.AlterModelOptions(
+            name='stalesimilarity',
+            options={'verbose_name': 'Произведение для пересчета похожих', 'verbose_name_plural': 'Произведения для пересчета похожих'},
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2 on 2026-10-19 12:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0018_stale_similarity_marks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='moderationjob',
+            name='max_comment_id',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='Последний id комментария'),
+        ),
+        migrations.AddField(
+            model_name='moderationjob',
+            name='max_review_id',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='Последний id отзыва'),
+        ),
+        migrations.AlterField(
+            model_name='moderationjob',
+            name='comments_matched',
+            field=models.PositiveIntegerField(default=0, help_text='Включая комментарии к найденным отзывам.', verbose_name='Найдено комментариев'),
+        ),
+    ]
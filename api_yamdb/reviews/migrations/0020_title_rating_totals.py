@@ -0,0 +1,32 @@
+# Generated by Django 3.2 on 2026-10-19 12:30
+
+from django.db import migrations, models
+from reviews.counters import recount_title_ratings
+
+
+def fill_totals(apps, schema_editor):
+    recount_title_ratings(
+        apps.get_model('reviews', 'Title'),
+        apps.get_model('reviews', 'Review'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0019_moderation_job_bounds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Обновляется сигналами при изменении отзывов.', verbose_name='Количество оценок'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='rating_sum',
+            field=models.BigIntegerField(default=0, editable=False, help_text='Обновляется сигналами при изменении отзывов.', verbose_name='Сумма оценок'),
+        ),
+        migrations.RunPython(fill_totals, migrations.RunPython.noop),
+    ]
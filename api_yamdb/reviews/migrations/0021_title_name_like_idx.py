@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-19 12:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0020_title_rating_totals'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['name'], name='title_name_like_idx', opclasses=('varchar_pattern_ops',)),
+        ),
+    ]
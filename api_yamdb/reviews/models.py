@@ -1,5 +1,8 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import NotSupportedError, connections, models, transaction
+from django.db.models.signals import post_save
+from django.utils import timezone
 from reviews.validators import validate_year
 from users.models import User
 
@@ -42,11 +45,17 @@ class Genre(models.Model):
         return f'{self.name} {self.name}'
 
 
+class TitleManager(models.Manager):
+    """Произведения без помеченных на удаление."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(pending_deletion=False)
+
+
 class Title(models.Model):
     name = models.CharField(
         verbose_name='Имя произведения',
-        max_length=200,
-        db_index=True
+        max_length=200
     )
     year = models.IntegerField(
         verbose_name='Год произведения',
@@ -71,14 +80,176 @@ class Title(models.Model):
         related_name='titles',
         verbose_name='Жанр произведения'
     )
+    genres = models.JSONField(
+        verbose_name='Жанры произведения (name и slug)',
+        help_text='Копия связи genre, обновляется сигналами.',
+        default=list,
+        editable=False
+    )
+    rating = models.FloatField(
+        verbose_name='Рейтинг (средняя оценка)',
+        help_text='Пересчитывается сигналами при изменении отзывов.',
+        null=True,
+        editable=False
+    )
+    rating_sum = models.BigIntegerField(
+        verbose_name='Сумма оценок',
+        help_text='Обновляется сигналами при изменении отзывов.',
+        default=0,
+        editable=False
+    )
+    rating_count = models.PositiveIntegerField(
+        verbose_name='Количество оценок',
+        help_text='Обновляется сигналами при изменении отзывов.',
+        default=0,
+        editable=False
+    )
+    pending_deletion = models.BooleanField(
+        verbose_name='Ожидает удаления',
+        default=False,
+        editable=False
+    )
+
+    objects = TitleManager()
+    all_objects = models.Manager()
 
     class Meta:
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
+        indexes = (
+            # Индексы под сортировки ?ordering= в API, в том числе
+            # вместе с фильтром по категории; id - для стабильного
+            # порядка при равных значениях.
+            models.Index(fields=('rating', 'id'), name='title_rating_idx'),
+            models.Index(fields=('year', 'id'), name='title_year_idx'),
+            models.Index(fields=('name', 'id'), name='title_name_idx'),
+            models.Index(
+                fields=('category', 'rating', 'id'),
+                name='title_category_rating_idx'
+            ),
+            models.Index(
+                fields=('category', 'year', 'id'),
+                name='title_category_year_idx'
+            ),
+            models.Index(
+                fields=('category', 'name', 'id'),
+                name='title_category_name_idx'
+            ),
+            # Поиск в админке по началу названия (LIKE 'x%'): обычный
+            # индекс PostgreSQL с правилами сортировки, отличными от C,
+            # его не обслуживает. В других СУБД opclasses игнорируется.
+            models.Index(
+                fields=('name',), name='title_name_like_idx',
+                opclasses=('varchar_pattern_ops',)
+            ),
+        )
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """
+        Рейтинг и genres пересчитывают только UPDATE из сигналов, поэтому
+        сохранение существующего произведения не перезаписывает их
+        значениями, прочитанными раньше.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in ('rating', 'rating_sum',
+                                       'rating_count', 'genres')
+            ]
+        super().save(*args, **kwargs)
+
+    def request_deletion(self):
+        """
+        Скрытие произведения. Отзывы и комментарии удаляются порциями
+        командой process_deletions, затем удаляется само произведение.
+        """
+        self.pending_deletion = True
+        self.save(update_fields=('pending_deletion',))
+
+
+class ReviewManager(models.Manager):
+
+    def upsert(self, author, title_id, text, score):
+        """
+        Создание или обновление отзыва автора на произведение одним
+        запросом INSERT ... ON CONFLICT по ограничению only_one_review.
+        Возвращает пару (отзыв, создан ли он).
+        Сигнал post_save отправляется так же, как при save().
+
+        Прежние произведение и оценка отзыва читаются до вставки
+        с блокировкой строки, как в Review.save(): сигнал переносит
+        в рейтинг только разницу. На PostgreSQL вставку отличает
+        xmax = 0 новой версии строки. На SQLite транзакция начинается
+        с пустого UPDATE отзыва: он берет блокировку записи базы
+        до чтения, поэтому чтение и вставка атомарны, конкурирующие
+        upsert ждут ее (busy timeout), а не получают "database is
+        locked" при повышении блокировки чтения.
+        """
+        connection = connections[self.db]
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            raise NotSupportedError(
+                f'Review upsert is not supported on {connection.vendor}.'
+            )
+        meta = self.model._meta
+        pub_date = meta.get_field('pub_date')
+        now = timezone.now()
+        qn = connection.ops.quote_name
+        sql = (
+            f'INSERT INTO {qn(meta.db_table)} '
+            f'({qn("author_id")}, {qn("title_id")}, {qn("text")}, '
+            f'{qn("score")}, {qn("pub_date")}, {qn("comments_count")}) '
+            'VALUES (%s, %s, %s, %s, %s, 0) '
+            f'ON CONFLICT ({qn("author_id")}, {qn("title_id")}) '
+            f'DO UPDATE SET {qn("text")} = EXCLUDED.{qn("text")}, '
+            f'{qn("score")} = EXCLUDED.{qn("score")} '
+            f'RETURNING {qn("id")}, {qn("pub_date")}, '
+            f'{qn("comments_count")}'
+        )
+        postgresql = connection.vendor == 'postgresql'
+        if postgresql:
+            sql += ', (xmax = 0)'
+        params = (
+            author.pk, title_id, text, score,
+            pub_date.get_db_prep_value(now, connection),
+        )
+        col = pub_date.get_col(meta.db_table)
+        with transaction.atomic(using=self.db):
+            if not postgresql:
+                self.filter(author=author, title_id=title_id).update(
+                    score=models.F('score')
+                )
+            previous = self.select_for_update().filter(
+                author=author, title_id=title_id
+            ).values_list('title_id', 'score').first()
+            created = previous is None
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                row = cursor.fetchone()
+            pk, value, comments_count = row[:3]
+            if postgresql:
+                created = row[3]
+            for converter in connection.ops.get_db_converters(col):
+                value = converter(value, col, connection)
+            review = self.model(
+                id=pk, author=author, title_id=title_id,
+                text=text, score=score, pub_date=value,
+                comments_count=comments_count,
+            )
+            review._state.adding = False
+            review._state.db = self.db
+            # На PostgreSQL отзыв мог вставить конкурент после чтения:
+            # тогда прежняя оценка неизвестна (None).
+            review._previous_rating = previous
+            post_save.send(
+                sender=self.model, instance=review, created=created,
+                update_fields=None, raw=False, using=self.db,
+            )
+        return review, created
+
 
 class Review(models.Model):
     author = models.ForeignKey(
@@ -114,6 +285,13 @@ class Review(models.Model):
         ),
         help_text='Введите оценку'
     )
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Количество комментариев',
+        default=0,
+        editable=False
+    )
+
+    objects = ReviewManager()
 
     class Meta:
         ordering = ('-pub_date',)
@@ -123,6 +301,15 @@ class Review(models.Model):
                 name='only_one_review'
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'), name='review_pub_date_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='review_author_pub_date_idx'
+            ),
+        )
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
         default_related_name = 'reviews'
@@ -130,6 +317,33 @@ class Review(models.Model):
     def __str__(self):
         return self.text
 
+    def save(self, *args, **kwargs):
+        """
+        comments_count меняют только UPDATE ... F() из сигналов, поэтому
+        сохранение существующего отзыва не перезаписывает его значением,
+        прочитанным раньше.
+
+        Прежние произведение и оценка читаются с блокировкой строки
+        отзыва в транзакции сохранения: сигнал переносит в рейтинг
+        произведения только разницу.
+        """
+        if self._state.adding:
+            super().save(*args, **kwargs)
+            return
+        if kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'comments_count'
+            ]
+        using = kwargs.get('using') or self._state.db
+        with transaction.atomic(using=using):
+            self._previous_rating = type(self)._base_manager.using(
+                using
+            ).select_for_update().filter(pk=self.pk).values_list(
+                'title_id', 'score'
+            ).first()
+            super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     author = models.ForeignKey(
@@ -160,8 +374,297 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'), name='comment_pub_date_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='comment_author_pub_date_idx'
+            ),
+        )
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
     def __str__(self):
         return self.text
+
+
+class SimilarTitle(models.Model):
+    """Похожие произведения, рассчитанные командой compute_similar_titles."""
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='similar_titles',
+        verbose_name='Произведение'
+    )
+    similar = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='similar_for',
+        verbose_name='Похожее произведение'
+    )
+    score = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        ordering = ('-score',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=('title', 'similar'),
+                name='unique_similar_title'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('title', '-score'), name='similar_title_score_idx'
+            ),
+        )
+        verbose_name = 'Похожее произведение'
+        verbose_name_plural = 'Похожие произведения'
+
+    def __str__(self):
+        return f'{self.title_id} -> {self.similar_id}'
+
+
+class StaleSimilarity(models.Model):
+    """
+    Отметки о произведениях, отзывы на которые изменились после последнего
+    расчета похожих произведений. Произведение может быть отмечено
+    несколько раз: расчет удаляет только прочитанные им отметки (по id),
+    и отметка, сделанная во время расчета, остается до следующего.
+    title - не внешний ключ: отметка может появиться при каскадном
+    удалении самого произведения.
+    """
+    title = models.BigIntegerField(
+        verbose_name='id произведения',
+        db_index=True
+    )
+
+    class Meta:
+        verbose_name = 'Произведение для пересчета похожих'
+        verbose_name_plural = 'Произведения для пересчета похожих'
+
+    def __str__(self):
+        return str(self.title)
+
+
+class CatalogStat(models.Model):
+    """
+    Статистика оценок по категории, жанру или году выпуска,
+    рассчитанная командой compute_catalog_stats.
+    """
+    DIMENSIONS = (
+        ('category', 'Категория'),
+        ('genre', 'Жанр'),
+        ('year', 'Год'),
+    )
+    dimension = models.CharField(
+        verbose_name='Разрез',
+        max_length=10,
+        choices=DIMENSIONS
+    )
+    key = models.CharField(
+        verbose_name='Slug категории или жанра, год',
+        max_length=50
+    )
+    titles_count = models.PositiveIntegerField(
+        verbose_name='Количество произведений с отзывами'
+    )
+    reviews_count = models.PositiveIntegerField(
+        verbose_name='Количество отзывов'
+    )
+    mean = models.FloatField(verbose_name='Средняя оценка')
+    variance = models.FloatField(verbose_name='Дисперсия оценок')
+    p25 = models.PositiveSmallIntegerField(verbose_name='25-й перцентиль')
+    p50 = models.PositiveSmallIntegerField(verbose_name='Медиана')
+    p75 = models.PositiveSmallIntegerField(verbose_name='75-й перцентиль')
+    p90 = models.PositiveSmallIntegerField(verbose_name='90-й перцентиль')
+    computed_at = models.DateTimeField(
+        verbose_name='Время расчета',
+        auto_now=True
+    )
+
+    class Meta:
+        ordering = ('dimension', 'key')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('dimension', 'key'),
+                name='unique_catalog_stat'
+            ),
+        )
+        verbose_name = 'Статистика каталога'
+        verbose_name_plural = 'Статистика каталога'
+
+    def __str__(self):
+        return f'{self.dimension} {self.key}'
+
+
+class Change(models.Model):
+    """
+    Запись журнала изменений (reviews.changes): создание, изменение
+    или удаление объекта каталога, отзыва, комментария или пользователя.
+    Порядок записей - (txid, id).
+    """
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    ACTIONS = (
+        (UPSERT, 'Создание или изменение'),
+        (DELETE, 'Удаление'),
+    )
+    txid = models.BigIntegerField(
+        verbose_name='Транзакция',
+        help_text='txid_current() в PostgreSQL, 0 в остальных СУБД.',
+        default=0
+    )
+    model = models.CharField(verbose_name='Модель', max_length=20)
+    object_id = models.BigIntegerField(verbose_name='id объекта')
+    action = models.CharField(
+        verbose_name='Действие',
+        max_length=6,
+        choices=ACTIONS
+    )
+    data = models.JSONField(
+        verbose_name='Публичные поля объекта',
+        encoder=DjangoJSONEncoder,
+        null=True
+    )
+    created = models.DateTimeField(
+        verbose_name='Время записи',
+        auto_now_add=True
+    )
+
+    class Meta:
+        ordering = ('txid', 'id')
+        indexes = (
+            models.Index(fields=('txid', 'id'), name='change_position_idx'),
+            models.Index(
+                fields=('model', 'object_id', 'txid', 'id'),
+                name='change_object_idx'
+            ),
+            models.Index(
+                fields=('action', 'created'), name='change_action_created_idx'
+            ),
+        )
+        verbose_name = 'Изменение'
+        verbose_name_plural = 'Журнал изменений'
+
+    def __str__(self):
+        return f'{self.action} {self.model} {self.object_id}'
+
+
+class ModerationJob(models.Model):
+    """
+    Массовое удаление отзывов и комментариев по автору, периоду
+    публикации и регулярному выражению по тексту (reviews.moderation).
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'Ожидает'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнено'),
+        (FAILED, 'Ошибка'),
+    )
+    KINDS = (
+        ('review', 'Отзывы'),
+        ('comment', 'Комментарии'),
+    )
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+',
+        verbose_name='Модератор'
+    )
+    kind = models.CharField(
+        verbose_name='Что удалять',
+        help_text='Пусто - отзывы и комментарии.',
+        max_length=7,
+        choices=KINDS,
+        blank=True
+    )
+    # CASCADE, а не SET_NULL: задание без автора удаляло бы записи
+    # всех пользователей.
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='moderation_jobs',
+        verbose_name='Автор'
+    )
+    pub_date_after = models.DateTimeField(
+        verbose_name='Опубликовано не раньше',
+        null=True,
+        blank=True
+    )
+    pub_date_before = models.DateTimeField(
+        verbose_name='Опубликовано не позже',
+        null=True,
+        blank=True
+    )
+    text_pattern = models.CharField(
+        verbose_name='Регулярное выражение по тексту',
+        max_length=200,
+        blank=True
+    )
+    status = models.CharField(
+        verbose_name='Состояние',
+        max_length=7,
+        choices=STATUSES,
+        default=PENDING
+    )
+    reviews_matched = models.PositiveIntegerField(
+        verbose_name='Найдено отзывов',
+        default=0
+    )
+    comments_matched = models.PositiveIntegerField(
+        verbose_name='Найдено комментариев',
+        help_text='Включая комментарии к найденным отзывам.',
+        default=0
+    )
+    # Строки, добавленные после создания задания, не удаляются: фильтр
+    # ограничен id, последними на момент создания. NULL - без границы.
+    max_review_id = models.BigIntegerField(
+        verbose_name='Последний id отзыва',
+        null=True,
+        blank=True
+    )
+    max_comment_id = models.BigIntegerField(
+        verbose_name='Последний id комментария',
+        null=True,
+        blank=True
+    )
+    reviews_deleted = models.PositiveIntegerField(
+        verbose_name='Удалено отзывов',
+        default=0
+    )
+    comments_deleted = models.PositiveIntegerField(
+        verbose_name='Удалено комментариев',
+        help_text='Включая комментарии к удаленным отзывам.',
+        default=0
+    )
+    error = models.TextField(verbose_name='Ошибка', blank=True)
+    created = models.DateTimeField(
+        verbose_name='Создано',
+        auto_now_add=True
+    )
+    updated = models.DateTimeField(
+        verbose_name='Последний прогресс',
+        auto_now=True
+    )
+    finished = models.DateTimeField(
+        verbose_name='Завершено',
+        null=True,
+        blank=True
+    )
+
+    class Meta:
+        ordering = ('-id',)
+        verbose_name = 'Задание модерации'
+        verbose_name_plural = 'Задания модерации'
+
+    def __str__(self):
+        return f'{self.pk} {self.status}'
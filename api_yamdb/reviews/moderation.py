@@ -0,0 +1,171 @@
+"""
+Массовая модерация: удаление отзывов и комментариев по автору, периоду
+публикации и регулярному выражению по тексту одним заданием.
+
+Задание (ModerationJob) создается запросом к API и выполняется в фоновом
+потоке воркера сразу после фиксации транзакции. Удаление идет порциями
+по id в отдельных транзакциях через reviews.deletion: счетчики авторов,
+счетчики комментариев отзывов, рейтинги произведений, пересчет похожих
+и журнал изменений обновляются так же, как при удалении пользователя.
+После каждой порции задание сохраняет прогресс (количество удаленных
+строк и время updated), его видно в API.
+
+Задание захватывается одним UPDATE из состояния pending, поэтому
+выполняется одним потоком. Если воркер остановился посреди задания,
+команда process_deletions подхватывает задания, не обновлявшиеся
+MODERATION_JOB_STALE_SECONDS секунд: фильтр задания выбирает только
+оставшиеся строки, и повторный запуск продолжает удаление. Фильтр
+ограничен последними id отзывов и комментариев на момент создания
+задания, поэтому ни продолжение, ни долгое задание не удаляют строки,
+добавленные позже.
+"""
+import logging
+import threading
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+from typing import List
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Max, Q
+from django.utils import timezone
+from reviews.deletion import delete_comments, delete_reviews, id_chunks
+from reviews.models import Comment, ModerationJob, Review
+
+logger = logging.getLogger(__name__)
+
+# Поля задания с последним id строк модели на момент создания.
+BOUNDS = {Review: 'max_review_id', Comment: 'max_comment_id'}
+
+
+def job_filter(job: ModerationJob) -> Q:
+    conditions = Q()
+    if job.author_id is not None:
+        conditions &= Q(author_id=job.author_id)
+    if job.pub_date_after is not None:
+        conditions &= Q(pub_date__gte=job.pub_date_after)
+    if job.pub_date_before is not None:
+        conditions &= Q(pub_date__lte=job.pub_date_before)
+    if job.text_pattern:
+        conditions &= Q(text__iregex=job.text_pattern)
+    return conditions
+
+
+def matching(job: ModerationJob) -> dict:
+    """Querysets строк задания по моделям, комментарии первыми."""
+    querysets = {}
+    for model in (Comment, Review):
+        if job.kind not in ('', model._meta.model_name):
+            continue
+        queryset = model.objects.filter(job_filter(job))
+        bound = getattr(job, BOUNDS[model])
+        if bound is not None:
+            queryset = queryset.filter(pk__lte=bound)
+        querysets[model] = queryset
+    return querysets
+
+
+def count_matches(job: ModerationJob) -> None:
+    """
+    Границы id строк задания и количество найденных строк. Комментарии
+    к найденным отзывам удаляются вместе с ними и тоже считаются.
+    """
+    for model, field in BOUNDS.items():
+        setattr(job, field, model.objects.aggregate(
+            last=Max('pk')
+        )['last'] or 0)
+    querysets = matching(job)
+    comments = []
+    if Comment in querysets:
+        comments.append(Q(pk__in=querysets[Comment].values('pk')))
+    if Review in querysets:
+        comments.append(Q(review__in=querysets[Review].values('pk')))
+    ModerationJob.objects.filter(pk=job.pk).update(
+        reviews_matched=(
+            querysets[Review].count() if Review in querysets else 0
+        ),
+        comments_matched=Comment.objects.filter(reduce(or_, comments)).count(),
+        **{field: getattr(job, field) for field in BOUNDS.values()}
+    )
+
+
+def claimable() -> Q:
+    """Ожидающие задания и брошенные остановленным воркером."""
+    stale = timezone.now() - timedelta(
+        seconds=settings.MODERATION_JOB_STALE_SECONDS
+    )
+    return (
+        Q(status=ModerationJob.PENDING)
+        | Q(status=ModerationJob.RUNNING, updated__lt=stale)
+    )
+
+
+def claim(job_id: int) -> bool:
+    return bool(ModerationJob.objects.filter(claimable(), pk=job_id).update(
+        status=ModerationJob.RUNNING, updated=timezone.now()
+    ))
+
+
+def report(job: ModerationJob, reviews: int, comments: int) -> None:
+    ModerationJob.objects.filter(pk=job.pk).update(
+        reviews_deleted=F('reviews_deleted') + reviews,
+        comments_deleted=F('comments_deleted') + comments,
+        updated=timezone.now(),
+    )
+
+
+def execute(job: ModerationJob, chunk_size: int) -> None:
+    for model, queryset in matching(job).items():
+        for ids in id_chunks(queryset, chunk_size):
+            if model is Comment:
+                comments = delete_comments(
+                    Comment.objects.filter(pk__in=ids), chunk_size
+                )
+                report(job, 0, comments)
+            else:
+                report(job, *delete_reviews(
+                    Review.objects.filter(pk__in=ids), chunk_size
+                ))
+
+
+def run(job_id: int, chunk_size: int) -> bool:
+    """Выполнение задания, если его удалось захватить."""
+    if not claim(job_id):
+        return False
+    job = ModerationJob.objects.get(pk=job_id)
+    try:
+        execute(job, chunk_size)
+    except Exception as error:
+        logger.exception('Moderation job %s failed', job_id)
+        ModerationJob.objects.filter(pk=job_id).update(
+            status=ModerationJob.FAILED, error=str(error),
+            finished=timezone.now(),
+        )
+    else:
+        ModerationJob.objects.filter(pk=job_id).update(
+            status=ModerationJob.DONE, finished=timezone.now()
+        )
+    return True
+
+
+def run_in_background(job_id: int) -> None:
+    try:
+        run(job_id, settings.MODERATION_CHUNK_SIZE)
+    finally:
+        # Соединения потока не закрываются обработчиком запроса.
+        connections.close_all()
+
+
+def start(job: ModerationJob) -> None:
+    """Запуск задания в фоновом потоке после фиксации транзакции."""
+    transaction.on_commit(lambda: threading.Thread(
+        target=run_in_background, args=(job.pk,), daemon=True
+    ).start())
+
+
+def pending_jobs() -> List[int]:
+    """Задания для process_deletions."""
+    return list(ModerationJob.objects.filter(claimable()).order_by(
+        'pk'
+    ).values_list('pk', flat=True))
@@ -0,0 +1,249 @@
+"""
+Секционирование таблиц отзывов и комментариев в PostgreSQL.
+
+Таблицы пересоздаются как секционированные по хешу ключа: отзывы - по
+title_id, комментарии - по review_id, поэтому отзывы произведения
+и комментарии отзыва лежат в одной секции и запрос списка читает
+только ее. Модели и запросы ORM не меняются: секционированная таблица
+называется так же, столбцы, индексы и ограничения переносятся.
+
+Ограничения PostgreSQL, которые приходится учитывать:
+- уникальные ограничения секционированной таблицы обязаны включать
+  ключ секционирования. only_one_review (author_id, title_id) его
+  включает, а первичный ключ заменяется на UNIQUE (id, ключ): столбцы
+  ключа допускают NULL и не могут входить в PRIMARY KEY. Уникальность
+  id обеспечивает последовательность;
+- поэтому на id отзывов нельзя сослаться внешним ключом, и ограничение
+  reviews_comment.review_id в базе удаляется. Каскадное удаление
+  комментариев по-прежнему выполняет Django (on_delete=CASCADE).
+Без этого внешнего ключа комментарий, добавленный одновременно
+с удалением отзыва в обход каскада Django (process_deletions, массовая
+модерация), остается без отзыва; такие комментарии удаляет
+process_deletions (reviews.deletion.delete_orphan_comments).
+Секционирование по диапазонам pub_date не используется: ключ pub_date
+пришлось бы добавить в only_one_review, и один автор смог бы оставить
+несколько отзывов на произведение.
+
+Таблицы пересоздает команда partition_reviews, а не миграция: число
+секций выбирается явно при запуске, а не настройкой на момент migrate.
+"""
+import re
+from typing import Callable, List, Optional, Tuple
+
+# Модели приложения reviews и ключи секционирования, в порядке
+# пересоздания.
+PARTITIONED = (
+    ('Review', 'title_id'),
+    ('Comment', 'review_id'),
+)
+INDEX_DEF = re.compile(
+    r'^CREATE (?P<unique>UNIQUE )?INDEX (?P<name>\S+) '
+    r'ON (?:ONLY )?(?P<table>\S+) (?P<rest>USING .+)$'
+)
+
+
+def is_partitioned(connection, table: str) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT relkind FROM pg_class WHERE oid = %s::regclass', (table,)
+        )
+        return cursor.fetchone()[0] == 'p'
+
+
+def stored_columns(connection, table: str) -> List[str]:
+    """Столбцы таблицы без генерируемых (search_vector)."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT attname FROM pg_attribute '
+            'WHERE attrelid = %s::regclass AND attnum > 0 '
+            "AND NOT attisdropped AND attgenerated = '' ORDER BY attnum",
+            (table,)
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def index_definitions(connection, table: str) -> List[str]:
+    """CREATE INDEX индексов таблицы, кроме индексов ограничений."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i '
+            'WHERE i.indrelid = %s::regclass AND NOT EXISTS ('
+            'SELECT 1 FROM pg_constraint c '
+            'WHERE c.conrelid = i.indrelid AND c.conindid = i.indexrelid) '
+            'ORDER BY i.indexrelid',
+            (table,)
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def constraint_definitions(connection,
+                           table: str) -> List[Tuple[str, str]]:
+    """Первичный ключ, уникальные и внешние ключи таблицы."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint '
+            "WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'f') "
+            'ORDER BY contype DESC, conname',
+            (table,)
+        )
+        return cursor.fetchall()
+
+
+def referencing_foreign_keys(connection,
+                             table: str) -> List[Tuple[str, str]]:
+    """Внешние ключи других таблиц, ссылающиеся на table."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT conrelid::regclass::text, conname FROM pg_constraint '
+            "WHERE confrelid = %s::regclass AND contype = 'f' "
+            'AND conrelid <> confrelid',
+            (table,)
+        )
+        return cursor.fetchall()
+
+
+def index_sql(definition: str, table: str,
+              name: Optional[str] = None) -> str:
+    """
+    CREATE INDEX из pg_get_indexdef для другой таблицы и, если задано
+    name, под другим именем. ON ONLY (индекс секционированной таблицы
+    без секций) убирается: индекс создается на всех секциях.
+    """
+    match = INDEX_DEF.match(definition)
+    if match is None:
+        raise ValueError(f'Unexpected index definition: {definition}')
+    return (
+        f'CREATE {match["unique"] or ""}INDEX {name or match["name"]} '
+        f'ON {table} {match["rest"]}'
+    )
+
+
+def create_table(connection, source: str, table: str, key: str,
+                 partitions: int) -> None:
+    """
+    Пустая таблица со столбцами, значениями по умолчанию, CHECK
+    и генерируемыми столбцами source. При partitions > 0 -
+    секционированная по хешу key с секциями {table}_p0,
+    {table}_p1 и т.д.
+    """
+    qn = connection.ops.quote_name
+    sql = (
+        f'CREATE TABLE {qn(table)} (LIKE {qn(source)} INCLUDING DEFAULTS '
+        'INCLUDING CONSTRAINTS INCLUDING GENERATED INCLUDING STORAGE)'
+    )
+    if partitions:
+        sql += f' PARTITION BY HASH ({qn(key)})'
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+        for remainder in range(partitions):
+            cursor.execute(
+                f'CREATE TABLE {qn(f"{table}_p{remainder}")} '
+                f'PARTITION OF {qn(table)} FOR VALUES WITH '
+                f'(MODULUS {partitions}, REMAINDER {remainder})'
+            )
+
+
+def copy_rows(connection, source: str, table: str) -> None:
+    qn = connection.ops.quote_name
+    columns = ', '.join(map(qn, stored_columns(connection, source)))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {qn(table)} ({columns}) '
+            f'SELECT {columns} FROM {qn(source)}'
+        )
+
+
+def key_constraint(key: str, partitions: int) -> str:
+    """
+    Ограничение {table}_pkey: первичный ключ обычной таблицы или
+    UNIQUE (id, key) секционированной.
+    """
+    if partitions:
+        return f'UNIQUE (id, {key})'
+    return 'PRIMARY KEY (id)'
+
+
+def rebuild(connection, table: str, key: str, partitions: int) -> None:
+    """
+    Пересоздание table секционированной на partitions секций по хешу
+    key (partitions = 0 - обычной таблицей) с переносом строк, индексов,
+    ограничений и последовательности id. Внешние ключи других таблиц
+    на table удаляются: на секционированную таблицу ссылаться не на что,
+    после обратного пересоздания их восстанавливает restore_foreign_keys.
+    Выполняется в транзакции вызывающего кода.
+    """
+    qn = connection.ops.quote_name
+    old = f'{table}_old'
+    indexes = index_definitions(connection, table)
+    constraints = constraint_definitions(connection, table)
+    with connection.cursor() as cursor:
+        for referencing, name in referencing_foreign_keys(connection, table):
+            cursor.execute(
+                f'ALTER TABLE {referencing} DROP CONSTRAINT {qn(name)}'
+            )
+        cursor.execute(f'ALTER TABLE {qn(table)} RENAME TO {qn(old)}')
+        create_table(connection, old, table, key, partitions)
+        copy_rows(connection, old, table)
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", (old,))
+        sequence = cursor.fetchone()[0]
+        cursor.execute(
+            f'ALTER SEQUENCE {sequence} OWNED BY {qn(table)}.{qn("id")}'
+        )
+        # Имена индексов и ограничений освобождаются вместе со старой
+        # таблицей.
+        cursor.execute(f'DROP TABLE {qn(old)}')
+        for name, definition in constraints:
+            if name == f'{table}_pkey':
+                definition = key_constraint(key, partitions)
+            cursor.execute(
+                f'ALTER TABLE {qn(table)} '
+                f'ADD CONSTRAINT {qn(name)} {definition}'
+            )
+        for definition in indexes:
+            cursor.execute(index_sql(definition, qn(table)))
+        cursor.execute(f'ANALYZE {qn(table)}')
+
+
+def restore_foreign_keys(schema_editor, fields) -> None:
+    """Внешние ключи полей fields, которых нет в базе."""
+    connection = schema_editor.connection
+    for field in fields:
+        model = field.model
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT 1 FROM pg_constraint WHERE conrelid = %s::regclass '
+                "AND contype = 'f' AND conkey = ARRAY[("
+                'SELECT attnum FROM pg_attribute '
+                'WHERE attrelid = %s::regclass AND attname = %s)]',
+                (model._meta.db_table, model._meta.db_table, field.column)
+            )
+            if cursor.fetchone():
+                continue
+        schema_editor.execute(schema_editor._create_fk_sql(
+            model, field, '_fk_%(to_table)s_%(to_column)s'
+        ))
+
+
+def partition_tables(schema_editor, get_model: Callable,
+                     partitions: int) -> None:
+    """
+    Пересоздание таблиц PARTITIONED секционированными на partitions
+    секций, при partitions = 0 - обычными с восстановлением внешнего
+    ключа комментариев на отзывы. Секционированные таблицы сначала
+    становятся обычными: имена секций новой и старой таблицы совпадают.
+    get_model(name) - модель приложения reviews (в миграции -
+    историческая).
+    """
+    connection = schema_editor.connection
+    for model_name, key in reversed(PARTITIONED):
+        table = get_model(model_name)._meta.db_table
+        if is_partitioned(connection, table):
+            rebuild(connection, table, key, 0)
+    if not partitions:
+        restore_foreign_keys(schema_editor, (
+            get_model('Comment')._meta.get_field('review'),
+        ))
+        return
+    for model_name, key in PARTITIONED:
+        rebuild(connection, get_model(model_name)._meta.db_table, key,
+                partitions)
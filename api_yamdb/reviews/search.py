@@ -0,0 +1,254 @@
+"""
+Полнотекстовый поиск по текстам отзывов и комментариев.
+
+В PostgreSQL у таблиц отзывов и комментариев есть генерируемый столбец
+search_vector (tsvector по русской и английской конфигурациям) с индексом
+GIN. В SQLite используется внешняя таблица FTS5, которую синхронизируют
+триггеры. В обоих случаях индекс обновляется самой СУБД при любой записи,
+включая bulk_create и update().
+"""
+from typing import List, Optional
+
+from django.db import NotSupportedError, connections
+from reviews.models import Comment, Review, Title
+from users.models import User
+
+SEARCH_MODELS = (Review, Comment)
+
+PG_DOCUMENT = (
+    "to_tsvector('russian', coalesce({column}, '')) || "
+    "to_tsvector('english', coalesce({column}, ''))"
+)
+PG_QUERY = (
+    "(plainto_tsquery('russian', %s) || plainto_tsquery('english', %s))"
+)
+
+
+def fts_table(model) -> str:
+    return f'{model._meta.db_table}_fts'
+
+
+def install_postgresql(connection) -> None:
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for model in SEARCH_MODELS:
+            table = model._meta.db_table
+            cursor.execute(
+                f'ALTER TABLE {qn(table)} ADD COLUMN IF NOT EXISTS '
+                'search_vector tsvector GENERATED ALWAYS AS '
+                f'({PG_DOCUMENT.format(column=qn("text"))}) STORED'
+            )
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS '
+                f'{qn(table + "_search_idx")} ON {qn(table)} '
+                'USING GIN (search_vector)'
+            )
+
+
+def install_sqlite(connection) -> None:
+    with connection.cursor() as cursor:
+        for model in SEARCH_MODELS:
+            table, fts = model._meta.db_table, fts_table(model)
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master "
+                "WHERE type = 'trigger' AND tbl_name = %s "
+                "AND name LIKE %s",
+                (table, f'{fts}_%')
+            )
+            if cursor.fetchone()[0] == 3:
+                continue
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5('
+                f"text, content='{table}', content_rowid='id', "
+                "tokenize='porter unicode61 remove_diacritics 2')"
+            )
+            cursor.execute(
+                f'CREATE TRIGGER IF NOT EXISTS {fts}_ai '
+                f'AFTER INSERT ON {table} BEGIN '
+                f'INSERT INTO {fts}(rowid, text) VALUES (new.id, new.text); '
+                'END'
+            )
+            cursor.execute(
+                f'CREATE TRIGGER IF NOT EXISTS {fts}_ad '
+                f'AFTER DELETE ON {table} BEGIN '
+                f"INSERT INTO {fts}({fts}, rowid, text) "
+                "VALUES ('delete', old.id, old.text); "
+                'END'
+            )
+            cursor.execute(
+                f'CREATE TRIGGER IF NOT EXISTS {fts}_au '
+                f'AFTER UPDATE OF text ON {table} BEGIN '
+                f"INSERT INTO {fts}({fts}, rowid, text) "
+                "VALUES ('delete', old.id, old.text); "
+                f'INSERT INTO {fts}(rowid, text) VALUES (new.id, new.text); '
+                'END'
+            )
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def uninstall(connection) -> None:
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for model in SEARCH_MODELS:
+            table, fts = model._meta.db_table, fts_table(model)
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    f'ALTER TABLE {qn(table)} '
+                    'DROP COLUMN IF EXISTS search_vector'
+                )
+            elif connection.vendor == 'sqlite':
+                for suffix in ('ai', 'ad', 'au'):
+                    cursor.execute(f'DROP TRIGGER IF EXISTS {fts}_{suffix}')
+                cursor.execute(f'DROP TABLE IF EXISTS {fts}')
+
+
+def install(connection) -> None:
+    """Создание поискового индекса. Повторный вызов ничего не меняет."""
+    if connection.vendor == 'postgresql':
+        install_postgresql(connection)
+    elif connection.vendor == 'sqlite':
+        install_sqlite(connection)
+
+
+def sqlite_match_query(query: str) -> str:
+    """Запрос FTS5: каждое слово в кавычках, слова объединяются по И."""
+    return ' '.join(
+        '"%s"' % word.replace('"', '""') for word in query.split()
+    )
+
+
+def build_source(connection, model, query: str) -> dict:
+    """Части запроса поиска по одной модели для текущей СУБД."""
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    if connection.vendor == 'postgresql':
+        part = {
+            'source': f'{table} AS obj',
+            # float4 ts_rank приводится к float8: ключ курсора из JSON
+            # сравнивается с тем же значением, что вернул запрос.
+            'rank': f'ts_rank(obj.search_vector, {PG_QUERY})::float8',
+            'match': f'obj.search_vector @@ {PG_QUERY}',
+            'rank_params': [query, query],
+            'match_params': [query, query],
+        }
+    else:
+        fts = fts_table(model)
+        part = {
+            'source': f'{fts} JOIN {table} AS obj ON obj.id = {fts}.rowid',
+            'rank': f'-bm25({fts})',
+            'match': f'{fts} MATCH %s',
+            'rank_params': [],
+            'match_params': [sqlite_match_query(query)],
+        }
+    if model is Review:
+        part['title'] = 'obj.title_id'
+        part['review'] = 'CAST(NULL AS bigint)'
+        part['authors'] = ['obj.author_id']
+    else:
+        part['source'] += (
+            f' JOIN {qn(Review._meta.db_table)} AS review '
+            'ON review.id = obj.review_id'
+        )
+        part['title'] = 'review.title_id'
+        part['review'] = 'obj.review_id'
+        # Комментарии к отзывам удаляемых авторов скрыты, как и отзывы.
+        part['authors'] = ['obj.author_id', 'review.author_id']
+    return part
+
+
+def build_filters(connection, part: dict, title_id, author,
+                  pub_date_after, pub_date_before) -> tuple:
+    titles = connection.ops.quote_name(Title._meta.db_table)
+    users = connection.ops.quote_name(User._meta.db_table)
+    # Скрытие строк, ожидающих удаления (reviews.deletion).
+    where = [
+        part['match'],
+        f'NOT EXISTS (SELECT 1 FROM {titles} AS pending '
+        f'WHERE pending.id = {part["title"]} '
+        'AND pending.pending_deletion = %s)',
+    ]
+    params = list(part['match_params']) + [True]
+    for column in part['authors']:
+        where.append(
+            f'NOT EXISTS (SELECT 1 FROM {users} AS pending '
+            f'WHERE pending.id = {column} AND pending.pending_deletion = %s)'
+        )
+        params.append(True)
+    if title_id is not None:
+        where.append(f'{part["title"]} = %s')
+        params.append(title_id)
+    if author is not None:
+        where.append('author.username = %s')
+        params.append(author)
+    if pub_date_after is not None:
+        where.append('obj.pub_date >= %s')
+        params.append(connection.ops.adapt_datetimefield_value(
+            pub_date_after
+        ))
+    if pub_date_before is not None:
+        where.append('obj.pub_date <= %s')
+        params.append(connection.ops.adapt_datetimefield_value(
+            pub_date_before
+        ))
+    return ' AND '.join(where), params
+
+
+def search(query: str,
+           kind: Optional[str] = None,
+           title_id: Optional[int] = None,
+           author: Optional[str] = None,
+           pub_date_after=None,
+           pub_date_before=None,
+           after: Optional[tuple] = None,
+           limit: int = 10,
+           using: str = 'default') -> List[dict]:
+    """
+    Поиск по отзывам и комментариям, отсортированный по релевантности.
+    after - ключ (rank, kind, id) последнего результата предыдущей
+    страницы для keyset-пагинации.
+    """
+    connection = connections[using]
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        raise NotSupportedError(
+            f'Full-text search is not supported on {connection.vendor}.'
+        )
+    users = connection.ops.quote_name(User._meta.db_table)
+    parts, params = [], []
+    for model in SEARCH_MODELS:
+        name = model._meta.model_name
+        if kind and kind != name:
+            continue
+        part = build_source(connection, model, query)
+        where, where_params = build_filters(
+            connection, part, title_id, author,
+            pub_date_after, pub_date_before
+        )
+        parts.append(
+            f"SELECT '{name}' AS kind, obj.id AS id, "
+            f'{part["title"]} AS title, {part["review"]} AS review, '
+            'author.username AS author, obj.text AS text, '
+            f'obj.pub_date AS pub_date, {part["rank"]} AS rank '
+            f'FROM {part["source"]} JOIN {users} AS author '
+            f'ON author.id = obj.author_id WHERE {where}'
+        )
+        params += part['rank_params'] + where_params
+    sql = f'SELECT * FROM ({" UNION ALL ".join(parts)}) results'
+    if after is not None:
+        sql += ' WHERE (rank, kind, id) < (%s, %s, %s)'
+        params += list(after)
+    sql += ' ORDER BY rank DESC, kind DESC, id DESC LIMIT %s'
+    params.append(limit)
+    pub_date = Review._meta.get_field('pub_date').get_col(
+        Review._meta.db_table
+    )
+    converters = connection.ops.get_db_converters(pub_date)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    for row in rows:
+        for converter in converters:
+            row['pub_date'] = converter(
+                row['pub_date'], pub_date, connection
+            )
+    return rows
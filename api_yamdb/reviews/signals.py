@@ -0,0 +1,197 @@
+from django.db import connections, transaction
+from django.db.models import F
+from django.db.models.signals import (m2m_changed, post_delete, post_migrate,
+                                      post_save, pre_delete)
+from django.dispatch import receiver
+from reviews import changes, search
+from reviews.counters import change_title_rating, recount_title_ratings
+from reviews.genres import refresh_title_genres, titles_with_genre
+from reviews.models import (Category, Comment, Genre, Review, StaleSimilarity,
+                            Title)
+from reviews.slugs import category_slugs, genre_slugs
+from users.models import User
+
+AUTHOR_COUNTERS = {
+    Review: 'reviews_count',
+    Comment: 'comments_count',
+}
+
+
+@receiver((post_save, post_delete), sender=Category)
+def invalidate_category_slugs(sender, **kwargs):
+    transaction.on_commit(category_slugs.invalidate)
+
+
+@receiver((post_save, post_delete), sender=Genre)
+def invalidate_genre_slugs(sender, **kwargs):
+    transaction.on_commit(genre_slugs.invalidate)
+
+
+def refresh_titles(title_ids):
+    """Пересчет Title.genres и запись произведений в журнал изменений."""
+    title_ids = list(title_ids)
+    refresh_title_genres(title_ids)
+    changes.record_titles(title_ids)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def sync_title_genres(sender, instance, action, pk_set, **kwargs):
+    if not kwargs['reverse']:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            refresh_titles((instance.pk,))
+    elif action == 'pre_clear':
+        instance._cleared_titles = titles_with_genre(instance)
+    elif action == 'post_clear':
+        refresh_titles(instance.__dict__.pop('_cleared_titles', ()))
+    elif action in ('post_add', 'post_remove'):
+        refresh_titles(pk_set)
+
+
+@receiver(post_save, sender=Genre)
+def update_genre_in_titles(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        refresh_titles(titles_with_genre(instance))
+
+
+@receiver(pre_delete, sender=Genre)
+def remember_genre_titles(sender, instance, **kwargs):
+    instance._deleted_titles = titles_with_genre(instance)
+
+
+@receiver(post_delete, sender=Genre)
+def remove_genre_from_titles(sender, instance, **kwargs):
+    refresh_titles(instance.__dict__.pop('_deleted_titles', ()))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Title)
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=User)
+def record_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        changes.record(instance)
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Title)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=User)
+def record_deletion(sender, instance, **kwargs):
+    changes.record(instance, deleted=True)
+
+
+@receiver(pre_delete, sender=Category)
+def remember_category_titles(sender, instance, **kwargs):
+    # Удаление категории обнуляет category_id произведений одним UPDATE
+    # без сигналов (SET_NULL).
+    instance._deleted_titles = list(
+        instance.titles.values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Category)
+def record_category_titles(sender, instance, **kwargs):
+    changes.record_titles(instance.__dict__.pop('_deleted_titles', ()))
+
+
+def update_author_counter(sender, author_id, delta):
+    counter = AUTHOR_COUNTERS[sender]
+    User.objects.filter(pk=author_id).update(
+        **{counter: F(counter) + delta}
+    )
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Comment)
+def increment_author_counter(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        update_author_counter(sender, instance.author_id, 1)
+
+
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Comment)
+def decrement_author_counter(sender, instance, **kwargs):
+    update_author_counter(sender, instance.author_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def increment_review_comments(sender, instance, created, raw=False,
+                              **kwargs):
+    if created and not raw:
+        Review.objects.filter(pk=instance.review_id).update(
+            comments_count=F('comments_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_review_comments(sender, instance, **kwargs):
+    # При каскадном удалении отзыва комментарии удаляются раньше него,
+    # UPDATE строки отзыва в той же транзакции безопасен.
+    Review.objects.filter(pk=instance.review_id).update(
+        comments_count=F('comments_count') - 1
+    )
+
+
+@receiver(post_save, sender=Review)
+def update_title_rating(sender, instance, created, raw=False,
+                        update_fields=None, **kwargs):
+    """
+    Перенос оценки в сумму и количество оценок произведения одним
+    UPDATE ... F() без чтения остальных отзывов. Прежние произведение
+    и оценку сохраненного отзыва запоминают Review.save() и upsert().
+    """
+    if raw:
+        return
+    previous = instance.__dict__.pop('_previous_rating', None)
+    if created:
+        if instance.title_id is not None:
+            change_title_rating(Title, instance.title_id, instance.score, 1)
+        return
+    if previous is None:
+        # Прежняя оценка неизвестна: пересчет по отзывам произведения.
+        if instance.title_id is not None:
+            recount_title_ratings(Title, Review, (instance.title_id,))
+        return
+    saved = set(update_fields or ('title', 'score'))
+    title_id = instance.title_id if saved & {'title', 'title_id'} else (
+        previous[0]
+    )
+    score = instance.score if 'score' in saved else previous[1]
+    if title_id == previous[0]:
+        if title_id is not None and score != previous[1]:
+            change_title_rating(Title, title_id, score - previous[1], 0)
+        return
+    if previous[0] is not None:
+        change_title_rating(Title, previous[0], -previous[1], -1)
+    if title_id is not None:
+        change_title_rating(Title, title_id, score, 1)
+
+
+@receiver(post_delete, sender=Review)
+def subtract_title_rating(sender, instance, **kwargs):
+    if instance.title_id is not None:
+        change_title_rating(Title, instance.title_id, -instance.score, -1)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def mark_similarity_stale(sender, instance, raw=False, **kwargs):
+    if instance.title_id is not None and not raw:
+        StaleSimilarity.objects.create(title=instance.title_id)
+
+
+@receiver(post_migrate)
+def install_search_index(sender, using, **kwargs):
+    """
+    Восстановление поискового индекса после миграций: в SQLite изменение
+    таблицы пересоздает ее и удаляет триггеры синхронизации.
+    """
+    connection = connections[using]
+    if (sender.name == 'reviews'
+            and Review._meta.db_table
+            in connection.introspection.table_names()):
+        search.install(connection)
@@ -0,0 +1,112 @@
+import uuid
+from functools import lru_cache
+from threading import Lock
+from time import monotonic
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from reviews.models import Category, Genre
+
+
+class LocalChannel:
+    """Канал инвалидации в пределах одного процесса (тесты, runserver)."""
+
+    def __init__(self):
+        self.versions = {}
+
+    def get_version(self, key: str) -> Optional[str]:
+        return self.versions.get(key)
+
+    def publish(self, key: str) -> None:
+        self.versions[key] = uuid.uuid4().hex
+
+
+class SharedCacheChannel:
+    """
+    Канал инвалидации через общий кэш.
+    Версия справочника хранится в кэше 'shared', поэтому ее изменение
+    видят все воркеры и узлы, подключенные к этому кэшу.
+    """
+    key_format = 'slug_map_version_%s'
+
+    def __init__(self, alias: str = 'shared'):
+        self.cache = caches[alias]
+
+    def get_version(self, key: str) -> Optional[str]:
+        return self.cache.get(self.key_format % key)
+
+    def publish(self, key: str) -> None:
+        self.cache.set(self.key_format % key, uuid.uuid4().hex, None)
+
+
+@lru_cache(maxsize=None)
+def get_channel():
+    """Канал инвалидации, заданный в settings.SLUG_CACHE_CHANNEL."""
+    return import_string(settings.SLUG_CACHE_CHANNEL)()
+
+
+class SlugMap:
+    """
+    Словарь slug -> pk небольшого справочника, загружаемый один раз
+    на процесс и перезагружаемый при смене версии в канале инвалидации.
+
+    Версия в канале проверяется не чаще раза в SLUG_CACHE_CHECK_SECONDS
+    секунд. Неизвестный slug сначала сверяет версию (справочник мог
+    измениться в другом воркере), а перезагружает словарь без смены
+    версии тоже не чаще раза в этот интервал, поэтому поток запросов
+    с несуществующими slug не читает таблицу на каждый запрос.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.key = model._meta.label_lower
+        self.lock = Lock()
+        self.version = None
+        self.pks = None
+        self.checked = 0.0
+        self.loaded = 0.0
+
+    def __deepcopy__(self, memo):
+        # Экземпляр общий для процесса, поля сериализаторов не копируют его.
+        return self
+
+    def get_map(self, check: bool = False,
+                reload: bool = False) -> Dict[str, int]:
+        now = monotonic()
+        if (self.pks is not None and not (check or reload)
+                and now - self.checked < settings.SLUG_CACHE_CHECK_SECONDS):
+            return self.pks
+        version = get_channel().get_version(self.key)
+        self.checked = now
+        if reload or self.pks is None or version != self.version:
+            with self.lock:
+                self.pks = dict(
+                    self.model.objects.values_list('slug', 'pk')
+                )
+                self.version = version
+                self.loaded = now
+        return self.pks
+
+    def resolve(self, slugs: Iterable[str]) -> Dict[str, int]:
+        """Разрешение набора slug за одно обращение к словарю."""
+        slugs = list(slugs)
+        pks = self.get_map()
+        if any(slug not in pks for slug in slugs):
+            pks = self.get_map(check=True)
+        if any(slug not in pks for slug in slugs) and (
+            monotonic() - self.loaded >= settings.SLUG_CACHE_CHECK_SECONDS
+        ):
+            # Объект мог быть создан в обход сигналов.
+            pks = self.get_map(reload=True)
+        return {slug: pks[slug] for slug in slugs if slug in pks}
+
+    def invalidate(self) -> None:
+        get_channel().publish(self.key)
+        # Этот воркер сверит версию при следующем обращении.
+        self.checked = 0.0
+
+
+category_slugs = SlugMap(Category)
+genre_slugs = SlugMap(Genre)
@@ -0,0 +1,243 @@
+"""
+Снимки данных YaMDb для быстрого сброса dev- и staging-баз.
+
+Снимок - zip-архив с manifest.json и файлом в текстовом формате COPY
+PostgreSQL (строки через табуляцию, NULL как \\N) для каждой таблицы
+приложений reviews и users и каждой таблицы, которая на них ссылается
+(например, журнал действий админки). В PostgreSQL таблицы выгружаются
+и загружаются командой COPY, в SQLite тот же формат пишется и читается
+построчно. Перед загрузкой таблицы снимка очищаются одним TRUNCATE без
+CASCADE (в SQLite - DELETE по каждой таблице) со сбросом
+последовательностей: другие таблицы очистка не затрагивает.
+Поисковый индекс на время загрузки удаляется и строится заново.
+"""
+import io
+import json
+import re
+import zipfile
+from typing import Iterable, List
+
+from django.apps import apps
+from django.core.management.color import no_style
+from django.db import NotSupportedError, transaction
+from django.utils import timezone
+from reviews import search
+
+APP_LABELS = ('users', 'reviews')
+MANIFEST = 'manifest.json'
+FETCH_SIZE = 10000
+UNESCAPE = {
+    '\\': '\\', 't': '\t', 'n': '\n', 'r': '\r',
+    'b': '\b', 'f': '\f', 'v': '\v',
+}
+ESCAPE = str.maketrans({
+    '\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r',
+})
+
+
+def references(model) -> set:
+    """Модели, на которые ссылаются внешние ключи model."""
+    return {
+        field.related_model for field in model._meta.concrete_fields
+        if field.is_relation
+    }
+
+
+def snapshot_models() -> List:
+    """
+    Модели приложений (включая промежуточные таблицы many-to-many)
+    и все модели, ссылающиеся на них, в порядке, при котором таблица
+    загружается после всех таблиц, на которые она ссылается.
+    """
+    models = [
+        model for label in APP_LABELS
+        for model in apps.get_app_config(label).get_models(
+            include_auto_created=True
+        )
+    ]
+    others = [
+        model for model in apps.get_models(include_auto_created=True)
+        if model not in models
+    ]
+    while True:
+        referencing = [
+            model for model in others if references(model) & set(models)
+        ]
+        if not referencing:
+            break
+        models += referencing
+        others = [model for model in others if model not in referencing]
+    ordered = []
+    while models:
+        for model in models:
+            if not references(model) & (set(models) - {model}):
+                ordered.append(model)
+                models.remove(model)
+                break
+        else:
+            raise ValueError('Circular foreign keys between snapshot models.')
+    return ordered
+
+
+def columns(connection, model) -> List[str]:
+    return [
+        connection.ops.quote_name(field.column)
+        for field in model._meta.concrete_fields
+    ]
+
+
+def check_vendor(connection) -> None:
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        raise NotSupportedError(
+            f'Snapshots are not supported on {connection.vendor}.'
+        )
+
+
+def truncate(connection, models: Iterable) -> None:
+    """
+    Очистка таблиц со сбросом последовательностей. Без CASCADE: все
+    ссылающиеся таблицы входят в models, а ссылка из другой таблицы
+    - ошибка, а не молчаливая очистка.
+    """
+    sql = connection.ops.sql_flush(
+        no_style(),
+        [model._meta.db_table for model in models],
+        reset_sequences=True,
+    )
+    connection.ops.execute_sql_flush(sql)
+
+
+class LineCounter:
+    """Файл-обертка, считающая записанные строки COPY."""
+
+    def __init__(self, file):
+        self.file = file
+        self.lines = 0
+
+    def write(self, data):
+        self.lines += data.count(b'\n')
+        return self.file.write(data)
+
+
+def escape(value) -> str:
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return str(int(value))
+    return str(value).translate(ESCAPE)
+
+
+def unescape(field: str):
+    if field == '\\N':
+        return None
+    if '\\' not in field:
+        return field
+    return re.sub(
+        r'\\(.)', lambda match: UNESCAPE.get(match[1], match[1]), field
+    )
+
+
+def dump_table(connection, model, entry) -> int:
+    table = connection.ops.quote_name(model._meta.db_table)
+    select = ', '.join(columns(connection, model))
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            counter = LineCounter(entry)
+            # COPY из секционированной таблицы (reviews.partitioning)
+            # возможен только через запрос.
+            cursor.copy_expert(
+                f'COPY (SELECT {select} FROM {table}) TO STDOUT', counter
+            )
+            return counter.lines
+        cursor.execute(f'SELECT {select} FROM {table}')
+        text = io.TextIOWrapper(entry, encoding='utf-8', newline='\n')
+        count = 0
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            text.writelines(
+                '\t'.join(escape(value) for value in row) + '\n'
+                for row in rows
+            )
+            count += len(rows)
+        text.flush()
+        text.detach()
+        return count
+
+
+def load_table(connection, model, entry) -> None:
+    table = connection.ops.quote_name(model._meta.db_table)
+    names = columns(connection, model)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.copy_expert(
+                f'COPY {table} ({", ".join(names)}) FROM STDIN', entry
+            )
+            return
+        cursor.executemany(
+            f'INSERT INTO {table} ({", ".join(names)}) '
+            f'VALUES ({", ".join(["%s"] * len(names))})',
+            (
+                [unescape(field) for field in line.rstrip('\n').split('\t')]
+                for line in io.TextIOWrapper(
+                    entry, encoding='utf-8', newline='\n'
+                )
+            )
+        )
+
+
+def create_snapshot(connection, path: str) -> dict:
+    """Запись снимка в файл path. Возвращает manifest."""
+    check_vendor(connection)
+    manifest = {
+        'vendor': connection.vendor,
+        'created': timezone.now().isoformat(),
+        'tables': [],
+    }
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        with transaction.atomic(using=connection.alias):
+            if connection.vendor == 'postgresql':
+                # Все таблицы выгружаются из одного согласованного снимка.
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ'
+                    )
+            for model in snapshot_models():
+                table = model._meta.db_table
+                with archive.open(f'{table}.copy', 'w') as entry:
+                    rows = dump_table(connection, model, entry)
+                manifest['tables'].append({'table': table, 'rows': rows})
+        archive.writestr(MANIFEST, json.dumps(manifest, indent=2))
+    return manifest
+
+
+def restore_snapshot(connection, path: str) -> dict:
+    """Замена данных всех таблиц снимка данными из файла path."""
+    check_vendor(connection)
+    models = snapshot_models()
+    by_table = {model._meta.db_table: model for model in models}
+    with zipfile.ZipFile(path) as archive:
+        manifest = json.loads(archive.read(MANIFEST))
+        if manifest['vendor'] != connection.vendor:
+            raise NotSupportedError(
+                f'Snapshot was created on {manifest["vendor"]}, '
+                f'cannot restore it on {connection.vendor}.'
+            )
+        with transaction.atomic(using=connection.alias):
+            search.uninstall(connection)
+            truncate(connection, models)
+            for item in manifest['tables']:
+                with archive.open(f'{item["table"]}.copy') as entry:
+                    load_table(connection, by_table[item['table']], entry)
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(
+                    no_style(), models
+                ):
+                    cursor.execute(sql)
+                if connection.vendor == 'postgresql':
+                    # ALTER TABLE поискового индекса невозможен, пока
+                    # проверки отложенных внешних ключей не выполнены.
+                    cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+            search.install(connection)
+    return manifest
@@ -0,0 +1,22 @@
+from itertools import islice
+
+import numpy as np
+
+
+def stream_array(queryset, fields, chunk_size=10000, dtype=np.int64):
+    """
+    Потоковое чтение столбцов fields из queryset в двумерный массив NumPy
+    порциями по chunk_size строк, без загрузки моделей в память.
+    """
+    rows = queryset.order_by().values_list(*fields).iterator(
+        chunk_size=chunk_size
+    )
+    chunks = []
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        chunks.append(np.array(chunk, dtype=dtype))
+    if not chunks:
+        return np.empty((0, len(fields)), dtype=dtype)
+    return np.concatenate(chunks)
@@ -1,15 +1,20 @@
 from django.contrib import admin
 from users.models import User
 
+from api_yamdb.admin import DeferredDeletionAdmin
+from api_yamdb.paginators import EstimatedCountPaginator
+
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(DeferredDeletionAdmin):
     list_display = (
         'username',
         'email',
         'role',
         'bio',
     )
-    search_fields = ('username', 'email')
-    list_filter = ('role',)
+    search_fields = ('username__startswith', 'email__startswith')
+    list_filter = ('role', 'pending_deletion')
     empty_value_display = '-пусто-'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
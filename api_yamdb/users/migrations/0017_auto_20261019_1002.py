@@ -0,0 +1,34 @@
+# Generated by Django 3.2 on 2026-10-19 10:02
+
+from django.db import migrations, models
+from reviews.counters import recount_author_counters
+
+
+def fill_counters(apps, schema_editor):
+    recount_author_counters(
+        apps.get_model('users', 'User'),
+        apps.get_model('reviews', 'Review'),
+        apps.get_model('reviews', 'Comment'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0016_user_user_role_idx'),
+        ('reviews', '0007_auto_20261019_1002'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество отзывов'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
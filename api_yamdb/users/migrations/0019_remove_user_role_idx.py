@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-19 11:55
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0018_user_pending_deletion'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='user',
+            name='user_role_idx',
+        ),
+    ]
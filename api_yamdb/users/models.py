@@ -26,6 +26,35 @@ class User(AbstractUser):
         help_text='Обязательное поле.',
         db_index=True
     )
+    reviews_count = models.PositiveIntegerField(
+        verbose_name='Количество отзывов',
+        default=0,
+        editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Количество комментариев',
+        default=0,
+        editable=False
+    )
+    pending_deletion = models.BooleanField(
+        verbose_name='Ожидает удаления',
+        default=False,
+        editable=False
+    )
+
+    def save(self, *args, **kwargs):
+        """
+        reviews_count и comments_count меняют только UPDATE ... F()
+        из сигналов и process_deletions, поэтому сохранение существующего
+        пользователя не перезаписывает их значениями, прочитанными раньше.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in ('reviews_count', 'comments_count')
+            ]
+        super().save(*args, **kwargs)
 
     @property
     def is_admin(self):
@@ -35,6 +64,16 @@ class User(AbstractUser):
     def is_moderator(self):
         return self.role == 'moderator'
 
+    def request_deletion(self):
+        """
+        Блокировка и скрытие пользователя. Его отзывы и комментарии
+        удаляются порциями командой process_deletions, затем удаляется
+        сам пользователь.
+        """
+        self.pending_deletion = True
+        self.is_active = False
+        self.save(update_fields=('pending_deletion', 'is_active'))
+
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
@@ -1,9 +1,21 @@
 import sys
 from os.path import abspath, dirname, join
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 infra_dir_path = join(root_dir, 'infra')
 
 pytest_plugins = [
 ]
+
+
+@pytest.fixture(autouse=True)
+def slug_cache_check(settings):
+    """
+    В тестах transaction.on_commit не вызывается и версия справочников
+    не меняется, поэтому словари slug сверяются с базой при каждом
+    промахе.
+    """
+    settings.SLUG_CACHE_CHECK_SECONDS = 0
@@ -0,0 +1,61 @@
+import pytest
+from django.db import connection
+from django.urls import reverse
+from reviews.models import Comment, Review, Title
+from users.models import User
+
+ROWS = 150
+MAX_QUERIES = 10
+
+
+@pytest.fixture
+def bulk_content():
+    User.objects.bulk_create(
+        User(username=f'user{i}', email=f'user{i}@yamdb.com')
+        for i in range(ROWS)
+    )
+    Title.objects.bulk_create(
+        Title(name=f'title{i}', year=2000) for i in range(ROWS)
+    )
+    users = User.objects.filter(username__startswith='user').order_by('id')
+    titles = Title.objects.order_by('id')
+    Review.objects.bulk_create(
+        Review(author=user, title=title, text='text', score=5)
+        for user, title in zip(users, titles)
+    )
+    reviews = Review.objects.order_by('id')
+    Comment.objects.bulk_create(
+        Comment(author=user, review=review, text='text')
+        for user, review in zip(users, reviews)
+    )
+
+
+@pytest.mark.django_db
+class TestAdminChangelist:
+
+    @pytest.mark.parametrize('url_name', (
+        'admin:reviews_review_changelist',
+        'admin:reviews_comment_changelist',
+        'admin:reviews_title_changelist',
+        'admin:users_user_changelist',
+    ))
+    @pytest.mark.parametrize('params', ({}, {'q': 'user1'}, {'p': 1}))
+    def test_changelist_query_count(self, admin_client, bulk_content,
+                                    django_assert_max_num_queries,
+                                    url_name, params):
+        with django_assert_max_num_queries(MAX_QUERIES):
+            response = admin_client.get(reverse(url_name), params)
+        assert response.status_code == 200, (
+            f'Проверьте, что страница {url_name} админки доступна'
+        )
+
+    @pytest.mark.skipif(connection.vendor != 'postgresql',
+                        reason='Классы операторов индексов PostgreSQL')
+    def test_title_search_uses_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = Title.objects.filter(name__startswith='Title').explain()
+        assert 'title_name_like_idx' in plan, (
+            'Проверьте, что поиск по началу названия в админке '
+            f'использует индекс: {plan}'
+        )
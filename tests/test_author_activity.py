@@ -0,0 +1,99 @@
+import pytest
+from api.pagination import AuthorActivityPagination
+from django.urls import reverse
+from rest_framework.test import APIClient
+from reviews.models import Comment, Review, Title
+from users.models import User
+
+
+@pytest.fixture
+def author():
+    return User.objects.create(username='author', email='author@yamdb.com')
+
+
+@pytest.fixture
+def activity(author):
+    """Три отзыва автора и комментарий автора к каждому из них."""
+    titles = [Title.objects.create(name=f'Title {number}', year=2000)
+              for number in range(3)]
+    for title in titles:
+        review = Review.objects.create(author=author, title=title,
+                                       text='text', score=5)
+        Comment.objects.create(author=author, review=review, text='text')
+    return titles
+
+
+@pytest.fixture
+def client(author):
+    client = APIClient()
+    client.force_authenticate(author)
+    return client
+
+
+def collect(client, url):
+    """Все страницы списка: (count первой страницы, результаты)."""
+    response = client.get(url)
+    assert response.status_code == 200
+    count = response.json()['count']
+    results = []
+    while url:
+        data = client.get(url).json()
+        results.extend(data['results'])
+        url = data['next']
+    return count, results
+
+
+@pytest.mark.django_db
+class TestAuthorActivity:
+
+    def test_counters(self, author, activity):
+        author.refresh_from_db()
+        assert (author.reviews_count, author.comments_count) == (3, 3), (
+            'Проверьте, что сигналы обновляют счетчики автора'
+        )
+        Comment.objects.first().delete()
+        author.refresh_from_db()
+        assert author.comments_count == 2
+
+    def test_stale_save_keeps_counters(self, author, activity):
+        author.bio = 'bio'
+        author.save()
+        author.refresh_from_db()
+        assert (author.reviews_count, author.comments_count) == (3, 3), (
+            'Проверьте, что save() пользователя, прочитанного до изменения '
+            'счетчиков, не перезаписывает их'
+        )
+        assert author.bio == 'bio'
+
+    def test_listings(self, client, activity, monkeypatch):
+        monkeypatch.setattr(AuthorActivityPagination, 'page_size', 2)
+        # Пользователь запроса со счетчиками после создания записей.
+        client.force_authenticate(User.objects.get(username='author'))
+        for name in ('reviews', 'comments'):
+            url = reverse(f'api:users-{name}', args=('author',))
+            count, results = collect(client, url)
+            assert count == len(results) == 3, (
+                f'Проверьте, что курсорная пагинация /{name}/ отдает '
+                'все записи автора'
+            )
+            assert results == sorted(
+                results, key=lambda item: (item['pub_date'], item['id']),
+                reverse=True
+            ), 'Проверьте, что записи отдаются начиная с последних'
+            me_url = reverse(f'api:users-{name}', args=('me',))
+            assert collect(client, me_url) == (count, results)
+
+    def test_hidden_titles(self, client, activity):
+        activity[0].request_deletion()
+        review = Review.objects.get(title=activity[0])
+        for name in ('reviews', 'comments'):
+            count, results = collect(
+                client, reverse(f'api:users-{name}', args=('author',))
+            )
+            assert count == len(results) == 2, (
+                f'Проверьте, что /{name}/ не отдает записи к произведениям, '
+                'ожидающим удаления'
+            )
+        assert review.pk not in [item['id'] for item in collect(
+            client, reverse('api:users-reviews', args=('author',))
+        )[1]]
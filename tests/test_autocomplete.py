@@ -0,0 +1,175 @@
+import random
+import string
+import time
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from reviews.autocomplete import PrefixIndex, autocomplete
+from reviews.models import Category, Genre, Review, Title
+from users.models import User
+
+
+@pytest.fixture
+def index():
+    return PrefixIndex.build((
+        ('t1', 'Властелин колец', None, 10),
+        ('t2', 'Хоббит, или Туда и обратно', None, 30),
+        ('t3', 'Ёжик в тумане', None, 5),
+        ('t4', 'The Lord of the Rings', None, 7),
+        ('g1', 'Фэнтези', 'fantasy', 2),
+        ('c1', 'Фильм', 'movie', 1),
+    ), max_limit=20)
+
+
+def names(results):
+    return [result['name'] for result in results]
+
+
+class TestPrefixIndex:
+
+    def test_lookup(self, index):
+        assert names(index.lookup('ко')) == ['Властелин колец'], (
+            'Проверьте, что префикс ищется с начала каждого слова названия'
+        )
+        assert names(index.lookup('ЕЖ')) == ['Ёжик в тумане'], (
+            'Проверьте, что поиск не зависит от регистра и букв ё/е'
+        )
+        assert names(index.lookup('lord of')) == ['The Lord of the Rings']
+        assert names(index.lookup('ф')) == ['Фэнтези', 'Фильм']
+        assert names(index.lookup('ф', kind='category')) == ['Фильм']
+        assert index.lookup('т')[0] == {
+            'type': 'title', 'id': 2, 'name': 'Хоббит, или Туда и обратно',
+            'slug': None, 'popularity': 30
+        }, 'Проверьте, что результаты упорядочены по популярности'
+        assert index.lookup('  ,') == []
+
+    def test_changes(self, index):
+        index.add('t5', 'Колобок', popularity=50)
+        assert names(index.lookup('ко')) == ['Колобок', 'Властелин колец']
+        index.add('t5', 'Репка')
+        assert names(index.lookup('ко')) == ['Властелин колец']
+        assert index.lookup('реп')[0]['popularity'] == 50, (
+            'Проверьте, что переименование сохраняет популярность'
+        )
+        index.remove('t1')
+        assert index.lookup('ко') == []
+        assert len(index.entries) == sum(
+            len(name.split()) for name in (
+                'Хоббит или Туда и обратно', 'Ежик в тумане',
+                'The Lord of the Rings', 'Фэнтези', 'Фильм', 'Репка'
+            )
+        ), 'Проверьте, что удаление убирает все ключи объекта'
+
+    def test_cached_prefixes(self):
+        index = PrefixIndex.build((
+            (f't{number}', f'Title {number}', None, number)
+            for number in range(1000)
+        ), max_limit=20)
+        assert index.lookup('tit', limit=3)[0]['id'] == 999
+        assert ('tit', None) in index.heavy
+        index.add('t1000', 'Title new', popularity=5000)
+        assert index.lookup('tit', limit=3)[0]['id'] == 1000, (
+            'Проверьте, что запомненный результат префикса сбрасывается '
+            'при изменении названий под ним'
+        )
+
+    def test_latency(self):
+        rng = random.Random(0)
+        words = [
+            ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
+            for _ in range(5000)
+        ]
+        index = PrefixIndex.build((
+            (f't{number}', ' '.join(rng.choices(words, k=3)), None,
+             rng.randint(0, 1000))
+            for number in range(50000)
+        ), max_limit=20)
+        queries = [rng.choice(words)[:rng.randint(1, 4)]
+                   for _ in range(2000)]
+        for query in queries:
+            index.lookup(query)
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            index.lookup(query)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        p99 = timings[int(len(timings) * 0.99)]
+        assert p99 < 0.001, (
+            f'Проверьте, что p99 поиска по префиксу меньше 1 мс: {p99}'
+        )
+        assert index.footprint() > 50000 * 3 * 50
+
+
+@pytest.fixture
+def catalog():
+    autocomplete.reset()
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genre = Genre.objects.create(name='Фэнтези', slug='fantasy')
+    author = User.objects.create(username='author',
+                                 email='author@yamdb.com')
+    titles = []
+    for name, reviews in (('Властелин колец', 1), ('Колобок', 0)):
+        title = Title.objects.create(name=name, year=2000,
+                                     category=category)
+        title.genre.set([genre])
+        for _ in range(reviews):
+            Review.objects.create(title=title, author=author, text='Text',
+                                  score=5)
+        titles.append(title)
+    yield titles
+    autocomplete.reset()
+
+
+@pytest.mark.django_db
+class TestAutocompleteApi:
+
+    def test_lookup(self, client, catalog, settings):
+        settings.AUTOCOMPLETE_SYNC_SECONDS = 0
+        url = reverse('api:autocomplete')
+        response = client.get(url, {'q': 'ко'})
+        assert response.status_code == 200
+        assert [(result['name'], result['popularity'])
+                for result in response.json()['results']] == [
+            ('Властелин колец', 1), ('Колобок', 0)
+        ], 'Проверьте, что популярность произведения - число отзывов'
+        response = client.get(url, {'q': 'ф', 'type': 'genre'})
+        assert response.json()['results'] == [{
+            'type': 'genre', 'id': Genre.objects.get().pk, 'name': 'Фэнтези',
+            'slug': 'fantasy', 'popularity': 2
+        }]
+        for params in ({}, {'q': 'ко', 'limit': 100},
+                       {'q': 'ко', 'type': 'review'}):
+            assert client.get(url, params).status_code == 400
+
+    # Журнал изменений в PostgreSQL отдает только завершенные транзакции.
+    @pytest.mark.django_db(transaction=True)
+    def test_incremental_update(self, client, catalog, settings):
+        settings.AUTOCOMPLETE_SYNC_SECONDS = 0
+        url = reverse('api:autocomplete')
+        client.get(url, {'q': 'ко'})
+        Title.objects.create(name='Конёк-горбунок', year=2000)
+        catalog[1].name = 'Репка'
+        catalog[1].save()
+        catalog[0].request_deletion()
+        results = client.get(url, {'q': 'ко'}).json()['results']
+        assert [result['name'] for result in results] == [
+            'Конёк-горбунок'
+        ], (
+            'Проверьте, что индекс догоняет журнал изменений: новые, '
+            'переименованные и удаленные произведения'
+        )
+
+    def test_stats(self, client, catalog):
+        url = reverse('api:autocomplete_stats')
+        assert client.get(url).status_code == 401
+        admin = User.objects.create(username='admin', email='admin@yamdb.com',
+                                    role='admin')
+        api_client = APIClient()
+        api_client.force_authenticate(admin)
+        stats = api_client.get(url).json()
+        assert stats['objects'] == 4
+        assert stats['memory_bytes'] > 0, (
+            'Проверьте, что отчет содержит память индекса'
+        )
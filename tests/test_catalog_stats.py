@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from django.core.management import call_command
+from reviews.management.commands import compute_catalog_stats
+from reviews.management.commands.compute_catalog_stats import (PERCENTILES,
+                                                               SCORES,
+                                                               describe)
+from reviews.models import CatalogStat, Category, Genre, Review, Title
+from users.models import User
+
+
+class TestDescribe:
+
+    def test_against_numpy(self):
+        rng = np.random.default_rng(1)
+        groups = [rng.integers(1, 11, size) for size in (1, 2, 7, 500)]
+        hist = np.array([np.bincount(scores, minlength=len(SCORES))
+                         for scores in groups])
+        count, mean, variance, percentiles = describe(hist)
+        for index, scores in enumerate(groups):
+            assert count[index] == len(scores)
+            assert mean[index] == pytest.approx(scores.mean())
+            assert variance[index] == pytest.approx(scores.var()), (
+                'Проверьте, что дисперсия генеральная (ddof=0)'
+            )
+            for p in PERCENTILES:
+                assert percentiles[f'p{p}'][index] == np.percentile(
+                    scores, p, method='inverted_cdf'
+                ), f'Проверьте расчет p{p} методом ближайшего ранга'
+
+    def test_nearest_rank(self):
+        hist = np.bincount([1, 2, 3, 4], minlength=len(SCORES))[None, :]
+        _, _, _, percentiles = describe(hist)
+        assert {name: int(values[0])
+                for name, values in percentiles.items()} == {
+            'p25': 1, 'p50': 2, 'p75': 3, 'p90': 4
+        }
+
+    def test_empty_group(self):
+        count, mean, variance, _ = describe(
+            np.zeros((1, len(SCORES)), dtype=np.int64)
+        )
+        assert (count[0], mean[0], variance[0]) == (0, 0, 0)
+
+
+@pytest.fixture
+def catalog():
+    author = User.objects.create(username='author', email='author@yamdb.com')
+    movie = Category.objects.create(name='Movie', slug='movie')
+    drama = Genre.objects.create(name='Drama', slug='drama')
+    titles = []
+    for number, score in enumerate((4, 8)):
+        title = Title.objects.create(name=str(number), year=2000,
+                                     category=movie)
+        title.genre.add(drama)
+        Review.objects.create(author=author, title=title, text='text',
+                              score=score)
+        titles.append(title)
+    return titles
+
+
+def stat(dimension, key):
+    return CatalogStat.objects.get(dimension=dimension, key=key)
+
+
+@pytest.mark.django_db
+class TestCatalogStats:
+
+    def test_dimensions(self, catalog):
+        call_command('compute_catalog_stats')
+        for dimension, key in (('category', 'movie'), ('genre', 'drama'),
+                               ('year', '2000')):
+            row = stat(dimension, key)
+            assert (row.titles_count, row.reviews_count, row.mean,
+                    row.variance) == (2, 2, 6.0, 4.0)
+
+    def test_pending_deletion(self, catalog):
+        catalog[1].request_deletion()
+        call_command('compute_catalog_stats')
+        for dimension, key in (('category', 'movie'), ('genre', 'drama'),
+                               ('year', '2000')):
+            assert stat(dimension, key).reviews_count == 1, (
+                f'Проверьте, что измерение {dimension} не учитывает '
+                'произведения, ожидающие удаления'
+            )
+
+    def test_category_deleted_during_run(self, catalog, monkeypatch):
+        original = compute_catalog_stats.stream_array
+
+        def stream_array(queryset, *args, **kwargs):
+            result = original(queryset, *args, **kwargs)
+            if queryset.model is Title:
+                Category.objects.all().delete()
+            return result
+
+        monkeypatch.setattr(compute_catalog_stats, 'stream_array',
+                            stream_array)
+        call_command('compute_catalog_stats')
+        assert not CatalogStat.objects.filter(dimension='category').exists()
+        assert stat('genre', 'drama').reviews_count == 2
@@ -0,0 +1,163 @@
+import json
+from base64 import b64decode, b64encode
+
+import pytest
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import Count
+from django.urls import reverse
+from rest_framework.test import APIClient
+from reviews.models import Category, Change, Comment, Genre, Review, Title
+from users.models import User
+
+
+@pytest.fixture
+def admin_client():
+    admin = User.objects.create(username='admin', email='admin@yamdb.com',
+                                role='admin')
+    client = APIClient()
+    client.force_authenticate(admin)
+    return client
+
+
+@pytest.fixture
+def review():
+    category = Category.objects.create(name='Category', slug='category')
+    title = Title.objects.create(name='Title', year=2000, category=category)
+    title.genre.set([Genre.objects.create(name='Genre', slug='genre')])
+    author = User.objects.create(username='author', email='author@yamdb.com',
+                                 bio='Bio')
+    review = Review.objects.create(title=title, author=author, text='Text',
+                                   score=5)
+    Comment.objects.create(review=review, author=author, text='Text')
+    return review
+
+
+def read_feed(client, since=None):
+    """Все страницы ленты после since и курсор для следующего опроса."""
+    url = reverse('api:changes-list')
+    params = {'since': since} if since else {}
+    results = []
+    while True:
+        response = client.get(url, params)
+        assert response.status_code == 200
+        data = response.json()
+        results += data['results']
+        if data['next'] is None:
+            return results, data['cursor']
+        params = {'since': data['cursor']}
+
+
+def last_entries(results):
+    return {(entry['model'], entry['id']): entry for entry in results}
+
+
+@pytest.mark.django_db
+class TestChangeFeed:
+    # Лента в PostgreSQL отдает записи только завершенных транзакций,
+    # поэтому тесты ленты выполняются без транзакции теста.
+
+    @pytest.mark.django_db(transaction=True)
+    def test_public_fields(self, admin_client, review):
+        entries = last_entries(read_feed(admin_client)[0])
+        title = entries[('title', review.title_id)]
+        assert title['action'] == 'upsert'
+        assert title['data']['genres'] == [
+            {'name': 'Genre', 'slug': 'genre'}
+        ], 'Проверьте, что изменение жанров произведения попадает в журнал'
+        assert title['data']['category'] == review.title.category_id
+        assert entries[('review', review.pk)]['data']['score'] == 5
+        assert ('comment', review.comments.get().pk) in entries
+        user = entries[('user', review.author_id)]['data']
+        assert user == {'username': 'author', 'first_name': '',
+                        'last_name': '', 'bio': 'Bio'}, (
+            'Проверьте, что в журнал попадают только публичные поля '
+            'пользователя'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_deletions(self, admin_client, review):
+        _, cursor = read_feed(admin_client)
+        comment_id = review.comments.get().pk
+        review.comments.get().delete()
+        Category.objects.all().delete()
+        review.title.request_deletion()
+        call_command('process_deletions')
+        results, _ = read_feed(admin_client, cursor)
+        actions = [(entry['model'], entry['id'], entry['action'])
+                   for entry in results]
+        for key in (('comment', comment_id, 'delete'),
+                    ('title', review.title_id, 'upsert'),
+                    ('title', review.title_id, 'delete'),
+                    ('review', review.pk, 'delete')):
+            assert key in actions, (
+                f'Проверьте, что в журнал попадает {key}: удаление, '
+                'скрытие и удаление порциями'
+            )
+        category = [entry for entry in results if entry['model'] == 'title'
+                    and entry['action'] == 'upsert']
+        assert category[0]['data']['category'] is None, (
+            'Проверьте, что обнуление категории при ее удалении попадает '
+            'в журнал'
+        )
+
+    def test_rolled_back_changes(self, review):
+        count = Change.objects.count()
+        with pytest.raises(RuntimeError), transaction.atomic():
+            Genre.objects.create(name='Other', slug='other')
+            raise RuntimeError
+        assert Change.objects.count() == count, (
+            'Проверьте, что записи журнала пишутся в транзакции изменения'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_pagination(self, admin_client, review, settings):
+        settings.CHANGE_FEED_PAGE_SIZE = 2
+        results, cursor = read_feed(admin_client)
+        assert len(results) == Change.objects.count()
+        assert [entry['created'] for entry in results] == sorted(
+            entry['created'] for entry in results
+        )
+        response = admin_client.get(reverse('api:changes-list'),
+                                    {'since': 'now'})
+        assert response.json()['cursor'] == cursor, (
+            'Проверьте, что since=now возвращает курсор последней записи'
+        )
+        assert read_feed(admin_client, cursor) == ([], cursor)
+        Genre.objects.create(name='Other', slug='other')
+        results, _ = read_feed(admin_client, cursor)
+        assert [(entry['model'], entry['action']) for entry in results] == [
+            ('genre', 'upsert')
+        ]
+        url = reverse('api:changes-list')
+        assert admin_client.get(url, {'since': 'bad'}).status_code == 404
+        txid, pk, created = json.loads(b64decode(cursor))
+        expired = b64encode(json.dumps(
+            (txid, pk, created - 31 * 24 * 60 * 60)
+        ).encode()).decode()
+        assert admin_client.get(url, {'since': expired}).status_code == 410, (
+            'Проверьте, что курсор старше срока хранения отклоняется'
+        )
+        client = APIClient()
+        client.force_authenticate(review.author)
+        assert client.get(url).status_code == 403
+
+    def test_compaction(self, review):
+        review.text = 'Updated'
+        review.save()
+        review.comments.get().delete()
+        call_command('compact_changes', days=30)
+        assert not Change.objects.values('model', 'object_id').annotate(
+            total=Count('pk')
+        ).filter(total__gt=1).exists(), (
+            'Проверьте, что сжатие оставляет одну запись на объект'
+        )
+        assert Change.objects.get(
+            model='review', object_id=review.pk
+        ).data['text'] == 'Updated'
+        assert Change.objects.filter(action=Change.DELETE).exists()
+        call_command('compact_changes', days=0)
+        assert not Change.objects.filter(action=Change.DELETE).exists(), (
+            'Проверьте, что отметки об удалении старше срока хранения '
+            'удаляются'
+        )
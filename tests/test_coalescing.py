@@ -0,0 +1,128 @@
+import threading
+import time
+import uuid
+
+import pytest
+from api import mixins
+from api.coalescing import SingleFlight
+from django.core.cache import caches
+from django.test import override_settings
+from django.urls import reverse
+from reviews.models import Review, Title
+from users.models import User
+
+THREADS = 8
+
+
+@pytest.fixture
+def flight():
+    return SingleFlight(prefix=f'test_{uuid.uuid4().hex}')
+
+
+def run_concurrently(target):
+    threads = [threading.Thread(target=target) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+class TestSingleFlight:
+
+    def test_threads_share_computation(self, flight):
+        release = threading.Event()
+        calls, results = [], []
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return {'value': len(calls)}
+
+        entered = threading.Semaphore(0)
+
+        def call():
+            entered.release()
+            results.append(flight.do('key', compute))
+
+        threads = run_concurrently(call)
+        for _ in range(THREADS):
+            entered.acquire()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+        assert len(calls) == 1, (
+            'Проверьте, что одновременные вызовы с одним ключом '
+            'выполняют расчет один раз'
+        )
+        assert results == [{'value': 1}] * THREADS
+        assert flight.do('key', compute) == {'value': 2}, (
+            'Проверьте, что результат не переиспользуется после расчета'
+        )
+
+    def test_waits_for_other_worker(self, flight):
+        cache = caches['shared']
+        lock_key = f'{flight.prefix}_lock_key'
+        cache.set(lock_key, 'token')
+        timer = threading.Timer(0.05, lambda: (
+            cache.set(f'{flight.prefix}_result_token', 'shared'),
+            cache.delete(lock_key),
+        ))
+        timer.start()
+        assert flight.do('key', lambda: 'own') == 'shared', (
+            'Проверьте, что воркер ждет результат воркера с блокировкой'
+        )
+        cache.set(lock_key, 'slow')
+        with override_settings(SINGLE_FLIGHT_WAIT_TIMEOUT=0.05):
+            assert flight.do('key', lambda: 'own') == 'own', (
+                'Проверьте, что по истечении ожидания воркер считает сам'
+            )
+        cache.delete(lock_key)
+
+
+@pytest.mark.django_db
+class TestCoalescedViews:
+
+    def test_responses(self, client):
+        title = Title.objects.create(name='Title', year=2000)
+        for number in range(7):
+            author = User.objects.create(username=f'author{number}',
+                                         email=f'author{number}@yamdb.com')
+            Review.objects.create(author=author, title=title, text='text',
+                                  score=5)
+        response = client.get(reverse('api:titles-detail', args=(title.pk,)))
+        assert response.json()['rating'] == 5
+        url = reverse('api:reviews-list', args=(title.pk,))
+        first = client.get(url).json()
+        second = client.get(url, {'offset': 5}).json()
+        assert first['count'] == second['count'] == 7
+        assert len(first['results']) + len(second['results']) == 7
+        assert client.get(
+            reverse('api:titles-detail', args=(title.pk + 1,))
+        ).status_code == 404
+
+    def test_followers_get_rendered_response(self, client, monkeypatch):
+        title = Title.objects.create(name='Title', year=2000)
+        url = reverse('api:titles-detail', args=(title.pk,))
+        leader = client.get(url)
+        shared = []
+
+        class Follower:
+            """Ответ, который вычислил другой поток."""
+
+            def do(self, key, compute):
+                shared.append(key)
+                return 200, [('Content-Type', 'application/json'),
+                             ('X-Leader', '1')], b'{"id": 0}'
+
+        monkeypatch.setattr(mixins, 'single_flight', Follower())
+        response = client.get(url)
+        assert (response.status_code, response['X-Leader'],
+                response.content) == (200, '1', b'{"id": 0}'), (
+            'Проверьте, что ожидающие запросы получают статус, заголовки '
+            'и тело ответа расчета'
+        )
+        assert response['Cache-Control'] == leader['Cache-Control']
+        client.get(url, HTTP_ACCEPT='text/html')
+        assert shared[0] != shared[1], (
+            'Проверьте, что ответы в разных форматах не объединяются'
+        )
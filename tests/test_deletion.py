@@ -0,0 +1,87 @@
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+from reviews.models import Comment, Review, Title
+from users.models import User
+
+REVIEWS = 5
+
+
+@pytest.fixture
+def admin_api_client():
+    admin = User.objects.create(username='admin', email='admin@yamdb.com',
+                                role='admin')
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    return client
+
+
+@pytest.fixture
+def title_with_reviews():
+    title = Title.objects.create(name='Title', year=2000)
+    other = Title.objects.create(name='Other', year=2000)
+    commenter = User.objects.create(username='commenter',
+                                    email='commenter@yamdb.com')
+    for number in range(REVIEWS):
+        author = User.objects.create(username=f'author{number}',
+                                     email=f'author{number}@yamdb.com')
+        for target in (title, other):
+            review = Review.objects.create(author=author, title=target,
+                                           text='text', score=5)
+            Comment.objects.create(author=commenter, review=review,
+                                   text='text')
+    return title, other, commenter
+
+
+@pytest.mark.django_db
+class TestDeferredDeletion:
+
+    def test_title_deletion(self, admin_api_client, client,
+                            title_with_reviews):
+        title, other, commenter = title_with_reviews
+        response = client.get(reverse('api:titles-detail', args=(title.pk,)))
+        assert 'pending_deletion' not in response.json(), (
+            'Проверьте, что служебное поле не попадает в ответ API'
+        )
+        response = admin_api_client.delete(
+            reverse('api:titles-detail', args=(title.pk,))
+        )
+        assert response.status_code == 204
+        assert Review.objects.filter(title=title).count() == REVIEWS, (
+            'Проверьте, что запрос на удаление не удаляет отзывы сразу'
+        )
+        for url in (reverse('api:titles-detail', args=(title.pk,)),
+                    reverse('api:reviews-list', args=(title.pk,))):
+            assert client.get(url).status_code == 404, (
+                'Проверьте, что произведение, ожидающее удаления, скрыто'
+            )
+        call_command('process_deletions', chunk_size=2)
+        assert not Title.all_objects.filter(pk=title.pk).exists()
+        assert not Review.objects.filter(title=title).exists()
+        assert Comment.objects.count() == REVIEWS, (
+            'Проверьте, что удаляются только комментарии к отзывам '
+            'удаленного произведения'
+        )
+        commenter.refresh_from_db()
+        assert commenter.comments_count == REVIEWS, (
+            'Проверьте, что счетчики авторов уменьшаются при удалении'
+        )
+
+    def test_user_deletion(self, admin_api_client, client,
+                           title_with_reviews):
+        title, other, commenter = title_with_reviews
+        author = User.objects.get(username='author0')
+        admin_api_client.delete(
+            reverse('api:users-detail', args=(author.username,))
+        )
+        response = client.get(reverse('api:reviews-list', args=(title.pk,)))
+        assert response.json()['count'] == REVIEWS - 1, (
+            'Проверьте, что отзывы пользователя, ожидающего удаления, '
+            'скрыты'
+        )
+        call_command('process_deletions', chunk_size=1)
+        assert not User.objects.filter(pk=author.pk).exists()
+        assert Review.objects.count() == 2 * (REVIEWS - 1)
+        commenter.refresh_from_db()
+        assert commenter.comments_count == 2 * (REVIEWS - 1)
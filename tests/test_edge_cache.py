@@ -0,0 +1,100 @@
+import os
+import re
+
+import pytest
+from api.edge_cache import cache_file_path
+from django.urls import reverse
+from reviews.models import Category, Review, Title
+from users.models import User
+
+from .conftest import infra_dir_path
+
+
+@pytest.fixture
+def edge_cache_root(settings, tmp_path):
+    settings.EDGE_CACHE_ROOT = str(tmp_path)
+    return tmp_path
+
+
+def cache_file(uri):
+    path = cache_file_path(uri)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        file.write(uri)
+    return path
+
+
+@pytest.mark.django_db
+class TestEdgeCache:
+
+    def test_cache_headers(self, client):
+        url = reverse('api:titles-list')
+        response = client.get(url)
+        assert 'public' in response['Cache-Control'], (
+            'Проверьте, что анонимный запрос к каталогу можно кэшировать'
+        )
+        assert 'max-age=' in response['Cache-Control']
+        assert 'Authorization' in response['Vary'], (
+            'Проверьте, что ответ каталога содержит Vary: Authorization'
+        )
+        for params in ({'offset': 10}, {'genre': 'drama'},
+                       {'ordering': 'name'}):
+            response = client.get(url, params)
+            assert 'private' in response['Cache-Control'], (
+                'Проверьте, что страницы, фильтры и сортировки списка '
+                f'не кэшируются: их нельзя очистить ({params})'
+            )
+        response = client.get(url, HTTP_AUTHORIZATION='Bearer token')
+        assert 'private' in response['Cache-Control'], (
+            'Проверьте, что ответ на запрос с токеном не попадает '
+            'в общий кэш'
+        )
+
+    def test_purge_on_write(self, edge_cache_root,
+                            django_capture_on_commit_callbacks):
+        category = Category.objects.create(name='Фильм', slug='movie')
+        title = Title.objects.create(name='Title', year=2000,
+                                     category=category)
+        author = User.objects.create(username='author',
+                                     email='author@yamdb.com')
+        detail = reverse('api:titles-detail', args=(title.pk,))
+        reviews = reverse('api:reviews-list', args=(title.pk,))
+        other = reverse('api:titles-detail', args=(title.pk + 1,))
+        paths = [cache_file(uri) for uri in (detail, reviews, other)]
+        with django_capture_on_commit_callbacks(execute=True):
+            Review.objects.create(author=author, title=title,
+                                  text='text', score=5)
+        assert not os.path.exists(paths[0]), (
+            'Проверьте, что новый отзыв удаляет из кэша страницу '
+            'произведения'
+        )
+        assert not os.path.exists(paths[1]), (
+            'Проверьте, что новый отзыв удаляет из кэша список отзывов'
+        )
+        assert os.path.exists(paths[2]), (
+            'Проверьте, что очистка кэша затрагивает только измененные '
+            'объекты'
+        )
+        path = cache_file(detail)
+        with django_capture_on_commit_callbacks(execute=True):
+            category.name = 'Кино'
+            category.save()
+        assert not os.path.exists(path), (
+            'Проверьте, что изменение категории удаляет из кэша '
+            'произведения этой категории'
+        )
+
+    def test_nginx_cache_levels(self, settings):
+        with open(os.path.join(infra_dir_path, 'nginx', 'default.conf')) as f:
+            config = f.read()
+        assert 'proxy_no_cache $args;' in config, (
+            'Проверьте, что nginx не кэширует адреса со строкой запроса'
+        )
+        levels = re.search(r'levels=([\d:]+)', config)
+        assert levels, 'Проверьте, что в nginx настроен proxy_cache_path'
+        assert tuple(
+            int(level) for level in levels.group(1).split(':')
+        ) == settings.EDGE_CACHE_LEVELS, (
+            'Проверьте, что levels кэша nginx совпадает '
+            'с EDGE_CACHE_LEVELS'
+        )
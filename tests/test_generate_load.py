@@ -0,0 +1,64 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.test import override_settings
+from reviews.management.commands.generate_load import wsgi_host
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.models import User
+
+
+@pytest.fixture
+def catalog():
+    category = Category.objects.create(name='Category', slug='category')
+    genre = Genre.objects.create(name='Genre', slug='genre')
+    author = User.objects.create(username='author', email='author@yamdb.com')
+    for number in range(3):
+        title = Title.objects.create(name=f'Title {number}',
+                                     year=2000 + number, category=category)
+        title.genre.set([genre])
+        review = Review.objects.create(title=title, author=author,
+                                       text='Text', score=5)
+        Comment.objects.create(review=review, author=author, text='Text')
+
+
+@pytest.mark.django_db(transaction=True)
+class TestGenerateLoad:
+
+    def test_report(self, catalog, tmp_path, settings):
+        settings.EMAIL_BACKEND = (
+            'django.core.mail.backends.locmem.EmailBackend'
+        )
+        output = tmp_path / 'load.json'
+        call_command('generate_load', threads=1, requests=40, duration=60,
+                     seed=1, output=str(output))
+        report = json.loads(output.read_text())
+        endpoints = report['endpoints']
+        assert endpoints['total']['requests'] == 40
+        assert sum(
+            endpoint['requests'] for name, endpoint in endpoints.items()
+            if name != 'total'
+        ) == 40
+        assert endpoints['total']['errors'] == 0, (
+            'Проверьте, что все сценарии нагрузочного теста выполняются '
+            f'без ошибок: {endpoints}'
+        )
+        latency = endpoints['total']['latency_ms']
+        assert latency['p50'] <= latency['p95'] <= latency['max']
+        assert not User.objects.filter(
+            username__startswith='loadtest'
+        ).exists(), (
+            'Проверьте, что пользователи и отзывы нагрузочного теста '
+            'удаляются после прогона'
+        )
+        assert Review.objects.count() == 3
+
+    def test_wsgi_host(self):
+        for allowed, host in ((['*'], 'localhost'),
+                              (['.example.com'], 'example.com'),
+                              (['api', 'localhost'], 'localhost'),
+                              (['api'], 'api')):
+            with override_settings(ALLOWED_HOSTS=allowed):
+                assert wsgi_host() == host, (
+                    f'Проверьте хост запросов при ALLOWED_HOSTS={allowed}'
+                )
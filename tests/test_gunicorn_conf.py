@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from api_yamdb import gunicorn_conf
+from api_yamdb.gunicorn_conf import available_cpus, read_cgroup_quota
+
+
+@pytest.fixture
+def cgroup(tmp_path, monkeypatch):
+    """Файлы cgroup во временном каталоге: name -> содержимое или None."""
+    paths = {
+        'CGROUP_V2_CPU_MAX': tmp_path / 'cpu.max',
+        'CGROUP_V1_CPU_QUOTA': tmp_path / 'cpu.cfs_quota_us',
+        'CGROUP_V1_CPU_PERIOD': tmp_path / 'cpu.cfs_period_us',
+    }
+    for name, path in paths.items():
+        monkeypatch.setattr(gunicorn_conf, name, str(path))
+
+    def write(**files):
+        for name, content in files.items():
+            paths[name].write_text(content)
+    return write
+
+
+class TestCgroupQuota:
+
+    def test_v2(self, cgroup):
+        cgroup(CGROUP_V2_CPU_MAX='150000 100000\n')
+        assert read_cgroup_quota() == 1.5
+
+    def test_v2_unlimited_falls_back_to_v1(self, cgroup):
+        cgroup(CGROUP_V2_CPU_MAX='max 100000\n',
+               CGROUP_V1_CPU_QUOTA='200000\n',
+               CGROUP_V1_CPU_PERIOD='100000\n')
+        assert read_cgroup_quota() == 2
+
+    def test_no_limit(self, cgroup):
+        assert read_cgroup_quota() is None, (
+            'Проверьте, что без файлов cgroup лимит не задан'
+        )
+        cgroup(CGROUP_V2_CPU_MAX='max 100000\n',
+               CGROUP_V1_CPU_QUOTA='-1\n',
+               CGROUP_V1_CPU_PERIOD='100000\n')
+        assert read_cgroup_quota() is None
+        cgroup(CGROUP_V2_CPU_MAX='garbage\n')
+        assert read_cgroup_quota() is None
+
+
+class TestAvailableCpus:
+
+    @pytest.mark.parametrize('quota, expected', (
+        (None, 8), (1.5, 2), (0.2, 1), (16, 8),
+    ))
+    def test_quota(self, monkeypatch, quota, expected):
+        monkeypatch.setattr(os, 'sched_getaffinity', lambda pid: set(range(8)),
+                            raising=False)
+        monkeypatch.setattr(gunicorn_conf, 'read_cgroup_quota',
+                            lambda: quota)
+        assert available_cpus() == expected, (
+            'Проверьте, что число ядер ограничено квотой cgroup, '
+            'округленной вверх, и не меньше 1'
+        )
+
+    def test_without_affinity(self, monkeypatch):
+        monkeypatch.delattr(os, 'sched_getaffinity', raising=False)
+        monkeypatch.setattr(os, 'cpu_count', lambda: None)
+        monkeypatch.setattr(gunicorn_conf, 'read_cgroup_quota', lambda: None)
+        assert available_cpus() == 1
@@ -0,0 +1,172 @@
+import gc
+import tracemalloc
+
+import pytest
+from api.memory import tracker
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+from reviews.models import Category, Genre, Review, Title
+from users.models import User
+
+WARM_UP = 20
+ITERATIONS = 100
+# Допустимый прирост памяти за ITERATIONS итераций смеси запросов:
+# кэши Django и драйвера БД заполняются при прогреве, дальше память
+# расти не должна.
+MAX_GROWTH = 128 * 1024
+
+
+@pytest.fixture
+def admin():
+    return User.objects.create(username='admin', email='admin@yamdb.com',
+                               role='admin')
+
+
+@pytest.fixture
+def title():
+    title = Title.objects.create(
+        name='Title', year=2000,
+        category=Category.objects.create(name='Category', slug='category')
+    )
+    title.genre.set([Genre.objects.create(name='Genre', slug='genre')])
+    return title
+
+
+@pytest.fixture
+def tracing():
+    yield
+    tracker.stop()
+
+
+@pytest.fixture
+def handler():
+    """
+    Обработчик WSGI, как в воркере gunicorn. Тестовый клиент Django
+    на каждом запросе заново подписывает close_old_connections
+    на request_started, и каждая подписка оставляет weakref.finalize,
+    поэтому память с ним растет сама по себе. Здесь close_old_connections
+    отключается один раз: он закрыл бы соединение с транзакцией теста.
+    """
+    for signal in (request_started, request_finished):
+        signal.disconnect(close_old_connections)
+    yield WSGIHandler()
+    for signal in (request_started, request_finished):
+        signal.connect(close_old_connections)
+
+
+def call(handler, request):
+    statuses = []
+    response = handler(
+        request.environ, lambda status, headers: statuses.append(status)
+    )
+    response.close()
+    return int(statuses[0].split()[0])
+
+
+def request_mix(handler, user, title, review):
+    """Чтения и запись, которые обслуживают TitleViewSet и ReviewViewSet."""
+    factory = APIRequestFactory(
+        HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}'
+    )
+    requests = (
+        factory.get(reverse('api:titles-list')),
+        factory.get(reverse('api:titles-list'), {'ordering': '-rating'}),
+        factory.get(reverse('api:titles-detail', args=(title.pk,))),
+        factory.get(reverse('api:reviews-list', args=(title.pk,))),
+        factory.get(
+            reverse('api:reviews-list', args=(title.pk,)), {'offset': 1}
+        ),
+        factory.patch(
+            reverse('api:reviews-detail', args=(title.pk, review.pk)),
+            {'text': 'Updated', 'score': 7}, format='json'
+        ),
+    )
+    for request in requests:
+        assert call(handler, request) == 200
+
+
+def traced_growth(handler, user, title, review):
+    tracker.start()
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(ITERATIONS):
+        request_mix(handler, user, title, review)
+    gc.collect()
+    growth = tracemalloc.get_traced_memory()[0] - before
+    tracker.stop()
+    return growth
+
+
+@pytest.mark.django_db
+class TestMemory:
+
+    def test_request_mix_does_not_leak(self, handler, title, settings,
+                                       tracing):
+        users = [
+            User.objects.create(username=f'user{number}',
+                                email=f'user{number}@yamdb.com')
+            for number in range(3)
+        ]
+        review = Review.objects.create(title=title, author=users[0],
+                                       text='Text', score=5)
+        Review.objects.bulk_create(
+            Review(title=title, author=user, text='Text', score=5)
+            for user in users[1:]
+        )
+        for _ in range(WARM_UP):
+            request_mix(handler, users[0], title, review)
+        # Прирост меряется без стека (быстро), строки с приростом
+        # ищутся повторным прогоном с полным стеком.
+        settings.MEMORY_TRACEMALLOC_FRAMES = 1
+        growth = traced_growth(handler, users[0], title, review)
+        if growth < MAX_GROWTH:
+            return
+        settings.MEMORY_TRACEMALLOC_FRAMES = 25
+        tracker.start()
+        for _ in range(ITERATIONS):
+            request_mix(handler, users[0], title, review)
+        gc.collect()
+        lines = tracker.growth(5)
+        pytest.fail(
+            f'Память выросла на {growth} байт за {ITERATIONS} итераций '
+            'запросов. Строки с наибольшим приростом: '
+            + '; '.join(
+                f'{item["file"]}:{item["line"]} {item["size_diff"]:+d}'
+                for item in lines
+            )
+        )
+
+    def test_endpoint(self, admin, tracing):
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.get(reverse('api:memory-list'))
+        assert response.status_code == 200
+        data = response.json()
+        assert data['objects'] and data['memory'], (
+            'Проверьте, что эндпоинт памяти возвращает память процесса '
+            'и количество объектов по типам'
+        )
+        assert data['tracemalloc']['growth'] is None
+        response = client.post(reverse('api:memory-snapshot'))
+        assert response.json()['tracemalloc']['tracing'] is True
+        growth = client.get(
+            reverse('api:memory-list')
+        ).json()['tracemalloc']['growth']
+        assert isinstance(growth, list), (
+            'Проверьте, что после снимка эндпоинт возвращает прирост '
+            'памяти по строкам кода'
+        )
+        assert all(
+            item['file'].startswith(('api', 'reviews', 'users'))
+            for item in growth
+        )
+        response = client.delete(reverse('api:memory-snapshot'))
+        assert response.status_code == 204
+        assert not tracemalloc.is_tracing()
+        user = User.objects.create(username='user', email='user@yamdb.com')
+        client.force_authenticate(user)
+        assert client.get(reverse('api:memory-list')).status_code == 403
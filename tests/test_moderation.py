@@ -0,0 +1,168 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from reviews.counters import (recount_author_counters, recount_review_comments,
+                              recount_title_ratings)
+from reviews.models import Comment, ModerationJob, Review, Title
+from users.models import User
+
+
+@pytest.fixture
+def moderator_client():
+    moderator = User.objects.create(username='moderator',
+                                    email='moderator@yamdb.com',
+                                    role='moderator')
+    client = APIClient()
+    client.force_authenticate(moderator)
+    return client
+
+
+@pytest.fixture
+def spam():
+    """Отзывы и комментарии спамера и обычного пользователя."""
+    spammer = User.objects.create(username='spammer',
+                                  email='spammer@yamdb.com')
+    user = User.objects.create(username='user', email='user@yamdb.com')
+    for number in range(3):
+        title = Title.objects.create(name=f'Title {number}', year=2000)
+        for author, text in ((spammer, 'Buy at http://spam.example'),
+                             (user, 'Good')):
+            review = Review.objects.create(title=title, author=author,
+                                           text=text, score=number + 1)
+            for commenter in (spammer, user):
+                Comment.objects.create(
+                    review=review, author=commenter,
+                    text='SPAM link' if commenter == spammer else 'Reply'
+                )
+    return spammer, user
+
+
+def assert_counters_consistent():
+    fixed = (
+        recount_author_counters(User, Review, Comment),
+        recount_review_comments(Review, Comment),
+        recount_title_ratings(Title, Review),
+    )
+    assert fixed == (0, 0, 0), (
+        'Проверьте, что массовое удаление поддерживает счетчики авторов, '
+        f'комментариев отзывов и рейтинги произведений: {fixed}'
+    )
+
+
+@pytest.mark.django_db
+class TestModeration:
+
+    def test_author_job(self, moderator_client, spam):
+        spammer, user = spam
+        response = moderator_client.post(
+            reverse('api:moderation-list'), {'author': 'spammer'}
+        )
+        assert response.status_code == 201
+        job = response.json()
+        assert (job['status'], job['reviews_matched'],
+                job['comments_matched']) == ('pending', 3, 9), (
+            'Проверьте, что задание сразу сообщает количество найденных '
+            'отзывов и комментариев, включая комментарии к отзывам'
+        )
+        call_command('process_deletions', chunk_size=2)
+        job = moderator_client.get(
+            reverse('api:moderation-detail', args=(job['id'],))
+        ).json()
+        assert job['status'] == 'done'
+        assert job['reviews_deleted'] == 3
+        # Свои комментарии спамера и комментарии пользователя к его
+        # отзывам.
+        assert job['comments_deleted'] == 9
+        assert not Review.objects.filter(author=spammer).exists()
+        assert not Comment.objects.filter(author=spammer).exists()
+        assert Review.objects.filter(author=user).count() == 3
+        assert_counters_consistent()
+
+    def test_text_and_date_job(self, moderator_client, spam):
+        now = timezone.now()
+        response = moderator_client.post(reverse('api:moderation-list'), {
+            'type': 'comment',
+            # Выражение одинаково в re и PostgreSQL, где \b - backspace.
+            'text_pattern': '^spam ',
+            'pub_date_after': (now - timedelta(hours=1)).isoformat(),
+            'pub_date_before': (now + timedelta(hours=1)).isoformat(),
+        })
+        assert response.status_code == 201
+        assert response.json()['reviews_matched'] == 0
+        call_command('process_deletions')
+        assert ModerationJob.objects.get().comments_deleted == 6
+        assert Review.objects.count() == 6, (
+            'Проверьте, что задание с type=comment не удаляет отзывы'
+        )
+        assert not Comment.objects.filter(text='SPAM link').exists()
+        assert_counters_consistent()
+
+    def test_validation_and_permissions(self, moderator_client, spam):
+        url = reverse('api:moderation-list')
+        for data in ({}, {'type': 'review'}, {'text_pattern': '('},
+                     {'pub_date_after': '2020-01-02T00:00:00Z',
+                      'pub_date_before': '2020-01-01T00:00:00Z'}):
+            assert moderator_client.post(url, data).status_code == 400, (
+                'Проверьте, что задание без фильтров или с неверными '
+                f'фильтрами отклоняется: {data}'
+            )
+        client = APIClient()
+        client.force_authenticate(spam[1])
+        assert client.post(url, {'author': 'spammer'}).status_code == 403
+        assert not ModerationJob.objects.exists()
+
+    @pytest.mark.skipif(connection.vendor != 'postgresql',
+                        reason='Синтаксис выражений PostgreSQL')
+    def test_pattern_is_checked_by_database(self, moderator_client, spam):
+        # Именованные группы есть в модуле re, но не в PostgreSQL.
+        response = moderator_client.post(
+            reverse('api:moderation-list'), {'text_pattern': '(?P<w>spam)'}
+        )
+        assert response.status_code == 400, (
+            'Проверьте, что выражение проверяется оператором базы данных'
+        )
+
+    def test_rows_created_later_are_kept(self, moderator_client, spam):
+        spammer, user = spam
+        moderator_client.post(reverse('api:moderation-list'),
+                              {'author': 'spammer'})
+        title = Title.objects.create(name='Later', year=2000)
+        review = Review.objects.create(title=title, author=spammer,
+                                       text='Later', score=5)
+        comment = Comment.objects.create(review=Review.objects.filter(
+            author=user
+        ).first(), author=spammer, text='Later')
+        call_command('process_deletions')
+        job = ModerationJob.objects.get()
+        assert job.status == ModerationJob.DONE
+        assert (job.reviews_deleted, job.comments_deleted) == (3, 9)
+        assert Review.objects.filter(pk=review.pk).exists(), (
+            'Проверьте, что задание не удаляет отзывы, созданные после него'
+        )
+        assert Comment.objects.filter(pk=comment.pk).exists(), (
+            'Проверьте, что задание не удаляет комментарии, созданные '
+            'после него'
+        )
+        assert_counters_consistent()
+
+    def test_stale_job_is_resumed(self, spam):
+        job = ModerationJob.objects.create(
+            author=spam[0], status=ModerationJob.RUNNING
+        )
+        call_command('process_deletions')
+        job.refresh_from_db()
+        assert job.status == ModerationJob.RUNNING, (
+            'Проверьте, что выполняющееся задание не запускается повторно'
+        )
+        ModerationJob.objects.filter(pk=job.pk).update(
+            updated=timezone.now() - timedelta(hours=1)
+        )
+        call_command('process_deletions')
+        job.refresh_from_db()
+        assert job.status == ModerationJob.DONE
+        assert job.reviews_deleted == 3
@@ -0,0 +1,35 @@
+import pytest
+from reviews.models import Title
+from users.models import User
+
+from api_yamdb import paginators
+from api_yamdb.paginators import EstimatedCountPaginator
+
+
+@pytest.fixture
+def estimate(monkeypatch, settings):
+    settings.ADMIN_ESTIMATED_COUNT_THRESHOLD = 10
+    monkeypatch.setattr(paginators, 'estimate_count', lambda queryset: 1000)
+
+
+@pytest.mark.django_db
+class TestEstimatedCountPaginator:
+
+    def test_default_manager_filter(self, estimate):
+        Title.objects.create(name='Title', year=2000)
+        assert EstimatedCountPaginator(
+            Title.objects.all(), 10
+        ).count == 1000, (
+            'Проверьте, что фильтр менеджера по умолчанию не отключает '
+            'оценку числа произведений'
+        )
+        assert EstimatedCountPaginator(User.objects.all(), 10).count == 1000
+
+    def test_filtered_lists_are_counted(self, estimate):
+        Title.objects.create(name='Title', year=2000)
+        for queryset in (Title.objects.filter(year=2000),
+                         Title.all_objects.filter(pending_deletion=True),
+                         User.objects.filter(role='admin')):
+            assert EstimatedCountPaginator(queryset, 10).count == (
+                queryset.count()
+            ), 'Проверьте, что отфильтрованные списки считаются точно'
@@ -0,0 +1,179 @@
+import re
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.urls import reverse
+from reviews import partitioning
+from reviews.deletion import raw_delete
+from reviews.models import Category, Comment, Review, Title
+from reviews.snapshots import create_snapshot, restore_snapshot
+from users.models import User
+
+postgresql_only = pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='Секционирование таблиц есть только в PostgreSQL'
+)
+
+
+@pytest.fixture
+def reviews():
+    category = Category.objects.create(name='Category', slug='category')
+    authors = [
+        User.objects.create(username=f'author{number}',
+                            email=f'author{number}@yamdb.com')
+        for number in range(3)
+    ]
+    titles = [
+        Title.objects.create(name=f'Title {number}', year=2000,
+                             category=category)
+        for number in range(4)
+    ]
+    for title in titles:
+        for author in authors:
+            review = Review.objects.create(title=title, author=author,
+                                           text='Text', score=5)
+            Comment.objects.create(review=review, author=author, text='Text')
+    return titles, authors
+
+
+@pytest.fixture
+def unpartition():
+    """
+    Обычные таблицы после теста: DDL транзакционного теста
+    не откатывается.
+    """
+    yield
+    call_command('partition_reviews', partitions=0)
+
+
+class TestIndexSql:
+
+    def test_rewrites_table_and_name(self):
+        definition = (
+            'CREATE INDEX review_pub_date_idx ON ONLY public.reviews_review '
+            'USING btree (pub_date DESC, id DESC)'
+        )
+        assert partitioning.index_sql(definition, 'copy', 'copy_idx') == (
+            'CREATE INDEX copy_idx ON copy '
+            'USING btree (pub_date DESC, id DESC)'
+        ), (
+            'Проверьте, что индекс переносится на другую таблицу под новым '
+            'именем и создается на всех секциях (без ON ONLY)'
+        )
+        assert partitioning.index_sql(
+            'CREATE UNIQUE INDEX a ON public.t USING btree (x)', 't'
+        ) == 'CREATE UNIQUE INDEX a ON t USING btree (x)'
+        with pytest.raises(ValueError):
+            partitioning.index_sql('CREATE TABLE t (x int)', 't')
+
+
+@pytest.mark.django_db
+class TestPartitioning:
+
+    @pytest.mark.skipif(connection.vendor == 'postgresql',
+                        reason='Проверка отказа для других СУБД')
+    def test_commands_require_postgresql(self):
+        with pytest.raises(CommandError):
+            call_command('benchmark_partitions')
+        with pytest.raises(CommandError):
+            call_command('partition_reviews', partitions=4)
+
+    @pytest.mark.skipif(
+        connection.vendor == 'postgresql',
+        reason='Внешний ключ PostgreSQL не дает удалить отзыв в обход '
+               'каскада; без ключа сценарий проверяет '
+               'test_command_and_snapshot'
+    )
+    def test_orphan_comments(self, reviews):
+        titles, authors = reviews
+        review = Review.objects.filter(title=titles[0]).first()
+        # Отзыв удален в обход каскада: так бывает без внешнего ключа.
+        raw_delete(Review.objects.filter(pk=review.pk))
+        call_command('process_deletions', orphans=True)
+        assert not Comment.objects.filter(review_id=review.pk).exists(), (
+            'Проверьте, что process_deletions удаляет комментарии '
+            'без отзыва'
+        )
+        assert Comment.objects.count() == len(titles) * len(authors) - 1
+        assert User.objects.get(pk=review.author_id).comments_count == 3
+
+    # ALTER и DROP TABLE невозможны после вставок в той же транзакции
+    # с отложенными проверками внешних ключей.
+    @postgresql_only
+    @pytest.mark.django_db(transaction=True)
+    def test_partitioned_tables(self, client, reviews, unpartition):
+        titles, authors = reviews
+        last_id = Review.objects.latest('pk').pk
+        for table, key in (('reviews_review', 'title_id'),
+                           ('reviews_comment', 'review_id')):
+            partitioning.rebuild(connection, table, key, 4)
+            assert partitioning.is_partitioned(connection, table)
+        response = client.get(reverse('api:reviews-list',
+                                      args=(titles[0].pk,)))
+        assert response.status_code == 200
+        assert response.json()['count'] == len(authors), (
+            'Проверьте, что после секционирования список отзывов '
+            'произведения возвращает те же отзывы'
+        )
+        review = Review.objects.create(
+            title=titles[0], author=User.objects.create(
+                username='new', email='new@yamdb.com'
+            ), text='Text', score=7
+        )
+        assert review.pk > last_id, (
+            'Проверьте, что последовательность id переносится '
+            'в секционированную таблицу'
+        )
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Review.objects.create(title=titles[0], author=authors[0],
+                                  text='Text', score=1)
+        Comment.objects.create(review=review, author=authors[0], text='Text')
+        review.delete()
+        assert not Comment.objects.filter(review_id=review.pk).exists(), (
+            'Проверьте, что комментарии удаляются вместе с отзывом '
+            'без внешнего ключа в базе'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'EXPLAIN SELECT * FROM reviews_review WHERE title_id = %s',
+                (titles[0].pk,)
+            )
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+        assert len(set(re.findall(r'reviews_review_p\d+', plan))) == 1, (
+            'Проверьте, что запрос отзывов произведения читает одну секцию: '
+            + plan
+        )
+
+    @postgresql_only
+    @pytest.mark.django_db(transaction=True)
+    def test_command_and_snapshot(self, reviews, tmp_path, unpartition):
+        titles, authors = reviews
+        call_command('partition_reviews', partitions=4)
+        for table in ('reviews_review', 'reviews_comment'):
+            assert partitioning.is_partitioned(connection, table)
+        review = Review.objects.filter(title=titles[0]).first()
+        Review.objects.filter(pk=review.pk).delete()
+        path = str(tmp_path / 'snapshot.zip')
+        manifest = create_snapshot(connection, path)
+        rows = {item['table']: item['rows'] for item in manifest['tables']}
+        assert rows['reviews_review'] == Review.objects.count(), (
+            'Проверьте, что снимок выгружает секционированную таблицу'
+        )
+        Comment.objects.all().delete()
+        restore_snapshot(connection, path)
+        assert Comment.objects.count() == rows['reviews_comment']
+        comment = Comment.objects.first()
+        raw_delete(Review.objects.filter(pk=comment.review_id))
+        call_command('process_deletions')
+        assert not Comment.objects.filter(pk=comment.pk).exists(), (
+            'Проверьте, что при секционированных таблицах '
+            'process_deletions сам ищет комментарии без отзыва'
+        )
+        call_command('partition_reviews', partitions=0)
+        for table in ('reviews_review', 'reviews_comment'):
+            assert not partitioning.is_partitioned(connection, table)
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Comment.objects.create(review_id=10 ** 9, author=authors[0],
+                                   text='Text')
+            connection.check_constraints()
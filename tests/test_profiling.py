@@ -0,0 +1,91 @@
+import os
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from users.models import User
+
+
+@pytest.fixture
+def profiling(settings, tmp_path):
+    settings.PROFILING_ENABLED = True
+    settings.PROFILING_ROOT = str(tmp_path)
+    settings.PROFILING_MAX_FILES = 2
+    return tmp_path
+
+
+@pytest.fixture
+def admin():
+    return User.objects.create(username='admin', email='admin@yamdb.com',
+                               role='admin')
+
+
+def jwt_client(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}'
+    )
+    return client
+
+
+@pytest.mark.django_db
+class TestProfiling:
+
+    def test_signed_header(self, profiling, admin):
+        url = reverse('api:categories-list')
+        token = jwt_client(admin).post(
+            reverse('api:profiles-token'), {'mode': 'cprofile'}
+        ).json()['token']
+        client = APIClient()
+        response = client.get(url, HTTP_X_PROFILE=token)
+        assert response.status_code == 200
+        profile_id = response['X-Profile-Id']
+        assert os.path.exists(profiling / f'{profile_id}.prof'), (
+            'Проверьте, что профиль запроса сохраняется на диск'
+        )
+        response = client.get(url, HTTP_X_PROFILE=token + 'x')
+        assert response.status_code == 200
+        assert 'X-Profile-Id' not in response, (
+            'Проверьте, что запрос с неверной подписью не профилируется'
+        )
+
+    def test_query_flag_and_ring(self, profiling, admin):
+        url = reverse('api:categories-list')
+        user = User.objects.create(username='user', email='user@yamdb.com')
+        response = jwt_client(user).get(url, {'profile': 'sampling'})
+        assert 'X-Profile-Id' not in response, (
+            'Проверьте, что профилировать запросы может только администратор'
+        )
+        client = jwt_client(admin)
+        ids = [
+            client.get(url, {'profile': 'sampling'})['X-Profile-Id']
+            for _ in range(3)
+        ]
+        response = client.get(reverse('api:profiles-list'))
+        assert [item['id'] for item in response.json()] == ids[:0:-1], (
+            'Проверьте, что хранятся только последние PROFILING_MAX_FILES '
+            'профилей'
+        )
+        assert len(os.listdir(profiling)) == 4
+        response = client.get(reverse('api:profiles-detail', args=(ids[2],)))
+        assert response.status_code == 200
+        assert response['Content-Disposition'].startswith('attachment')
+        assert jwt_client(user).get(
+            reverse('api:profiles-list')
+        ).status_code == 403
+
+    def test_sampling_rate(self, profiling, settings, client):
+        settings.PROFILING_SAMPLE_RATE = 1
+        response = client.get(reverse('api:categories-list'))
+        assert 'X-Profile-Id' in response, (
+            'Проверьте случайную выборку запросов для профилирования'
+        )
+
+    def test_disabled(self, settings, tmp_path, admin):
+        settings.PROFILING_ROOT = str(tmp_path)
+        response = jwt_client(admin).get(
+            reverse('api:categories-list'), {'profile': 'cprofile'}
+        )
+        assert 'X-Profile-Id' not in response
+        assert not os.listdir(tmp_path)
@@ -0,0 +1,72 @@
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+from reviews.models import Comment, Review, Title
+from users.models import User
+
+
+@pytest.fixture
+def review():
+    title = Title.objects.create(name='Title', year=2000)
+    author = User.objects.create(username='author', email='author@yamdb.com')
+    return Review.objects.create(author=author, title=title, text='text',
+                                 score=5)
+
+
+@pytest.mark.django_db
+class TestReviewCommentsCount:
+
+    def test_counter_in_api(self, review):
+        commenter = User.objects.create(username='commenter',
+                                        email='commenter@yamdb.com')
+        client = APIClient()
+        client.force_authenticate(user=commenter)
+        url = reverse('api:comments-list', args=(review.title_id, review.pk))
+        for _ in range(3):
+            assert client.post(url, {'text': 'text'}).status_code == 201
+        comment = Comment.objects.first()
+        response = client.delete(
+            reverse('api:comments-detail',
+                    args=(review.title_id, review.pk, comment.pk))
+        )
+        assert response.status_code == 204
+        response = client.get(reverse('api:reviews-list',
+                                      args=(review.title_id,)))
+        assert response.json()['results'][0]['comments_count'] == 2, (
+            'Проверьте, что счетчик комментариев отзыва отдается в API'
+        )
+
+    def test_stale_save_keeps_counter(self, review):
+        stale = Review.objects.get(pk=review.pk)
+        Comment.objects.create(author=review.author, review=review,
+                               text='text')
+        stale.text = 'new text'
+        stale.save()
+        review.refresh_from_db()
+        assert (review.text, review.comments_count) == ('new text', 1), (
+            'Проверьте, что сохранение отзыва не затирает счетчик '
+            'комментариев'
+        )
+
+    def test_deferred_user_deletion(self, review):
+        commenter = User.objects.create(username='commenter',
+                                        email='commenter@yamdb.com')
+        for _ in range(3):
+            Comment.objects.create(author=commenter, review=review,
+                                   text='text')
+        commenter.request_deletion()
+        call_command('process_deletions', chunk_size=2)
+        review.refresh_from_db()
+        assert review.comments_count == 0, (
+            'Проверьте, что удаление комментариев порциями уменьшает '
+            'счетчик отзыва'
+        )
+
+    def test_reconcile(self, review):
+        Comment.objects.create(author=review.author, review=review,
+                               text='text')
+        Review.objects.update(comments_count=5)
+        call_command('reconcile_counters')
+        review.refresh_from_db()
+        assert review.comments_count == 1
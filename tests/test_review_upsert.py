@@ -0,0 +1,80 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from reviews.models import Review, Title
+from users.models import User
+
+
+@pytest.fixture
+def title():
+    return Title.objects.create(name='Title', year=2000)
+
+
+@pytest.fixture
+def client():
+    client = APIClient()
+    client.force_authenticate(
+        User.objects.create(username='author', email='author@yamdb.com')
+    )
+    return client
+
+
+def put_review(client, title_id, score):
+    return client.put(reverse('api:reviews-me', args=(title_id,)),
+                      {'text': f'score {score}', 'score': score},
+                      format='json')
+
+
+@pytest.mark.django_db
+class TestReviewUpsert:
+
+    def test_create_then_update(self, client, title):
+        response = put_review(client, title.pk, 5)
+        assert response.status_code == 201, (
+            'Проверьте, что первый PUT создает отзыв и возвращает 201'
+        )
+        pub_date = Review.objects.get().pub_date
+        response = put_review(client, title.pk, 7)
+        assert response.status_code == 200, (
+            'Проверьте, что повторный PUT обновляет отзыв и возвращает 200'
+        )
+        review = Review.objects.get()
+        assert (review.score, review.text) == (7, 'score 7')
+        assert review.pub_date == pub_date
+
+    def test_created_flag(self, title):
+        author = User.objects.create(username='other',
+                                     email='other@yamdb.com')
+        _, created = Review.objects.upsert(author, title.pk, 'text', 5)
+        assert created
+        _, created = Review.objects.upsert(author, title.pk, 'text', 6)
+        assert not created, (
+            'Проверьте, что обновление не считается созданием отзыва'
+        )
+
+    @pytest.mark.skipif(connection.vendor != 'sqlite',
+                        reason='Порядок блокировок SQLite')
+    def test_sqlite_takes_write_lock_first(self, title):
+        author = User.objects.create(username='other',
+                                     email='other@yamdb.com')
+        with CaptureQueriesContext(connection) as context:
+            Review.objects.upsert(author, title.pk, 'text', 5)
+        statements = [
+            query['sql'].split()[0].upper()
+            for query in context.captured_queries
+            if 'SAVEPOINT' not in query['sql'].upper()
+        ]
+        assert statements[:2] == ['UPDATE', 'SELECT'], (
+            'Проверьте, что upsert на SQLite берет блокировку записи '
+            f'до чтения отзыва: {statements}'
+        )
+
+    def test_missing_and_hidden_title(self, client, title):
+        assert put_review(client, title.pk + 1, 5).status_code == 404
+        title.request_deletion()
+        assert put_review(client, title.pk, 5).status_code == 404, (
+            'Проверьте, что нельзя оставить отзыв на удаляемое произведение'
+        )
+        assert not Review.objects.exists()
@@ -0,0 +1,119 @@
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from reviews.models import Comment, Review, Title
+from reviews.search import search
+from users.models import User
+
+
+@pytest.fixture
+def corpus():
+    """
+    Отзывы двух авторов на два произведения и комментарии к ним.
+    Тексты на английском: стемминг porter (SQLite) и english
+    (PostgreSQL) одинаково находят dragon по dragons.
+    """
+    alice = User.objects.create(username='alice', email='alice@yamdb.com')
+    bob = User.objects.create(username='bob', email='bob@yamdb.com')
+    first = Title.objects.create(name='First', year=2000)
+    second = Title.objects.create(name='Second', year=2000)
+    strong = Review.objects.create(
+        author=alice, title=first, score=5,
+        text='Dragons, dragons and more dragons'
+    )
+    weak = Review.objects.create(
+        author=bob, title=first, score=5,
+        text='A long story about a knight, a castle, a princess, '
+             'a forest, a river and somewhere a dragon'
+    )
+    other = Review.objects.create(author=alice, title=second, score=5,
+                                  text='The dragon is friendly here')
+    Review.objects.create(author=bob, title=second, score=5,
+                          text='Nothing to see')
+    comment = Comment.objects.create(author=bob, review=strong,
+                                     text='I like the dragon')
+    return {'alice': alice, 'bob': bob, 'first': first, 'second': second,
+            'strong': strong, 'weak': weak, 'other': other,
+            'comment': comment}
+
+
+def ids(rows):
+    return [(row['kind'], row['id']) for row in rows]
+
+
+@pytest.mark.django_db
+class TestSearch:
+
+    def test_ranking(self, corpus):
+        rows = search('dragon', kind='review')
+        assert len(rows) == 3, (
+            'Проверьте, что поиск находит формы слова и не находит '
+            'отзывы без него'
+        )
+        assert rows[0]['id'] == corpus['strong'].pk, (
+            'Проверьте, что текст с частым упоминанием слова выше'
+        )
+        assert rows[-1]['id'] == corpus['weak'].pk, (
+            'Проверьте, что длинный текст с одним упоминанием ниже'
+        )
+        assert [row['rank'] for row in rows] == sorted(
+            (row['rank'] for row in rows), reverse=True
+        )
+        assert search('dragon castle', kind='review')[0]['id'] == (
+            corpus['weak'].pk
+        ), 'Проверьте, что слова запроса объединяются по И'
+
+    def test_filters(self, corpus):
+        assert ids(search('dragon', kind='comment')) == [
+            ('comment', corpus['comment'].pk)
+        ]
+        comment = search('dragon', kind='comment')[0]
+        assert (comment['title'], comment['review']) == (
+            corpus['first'].pk, corpus['strong'].pk
+        )
+        assert {row['id'] for row in search(
+            'dragon', kind='review', title_id=corpus['second'].pk
+        )} == {corpus['other'].pk}
+        assert set(ids(search('dragon', author='bob'))) == {
+            ('review', corpus['weak'].pk), ('comment', corpus['comment'].pk)
+        }
+        now = timezone.now()
+        assert search('dragon', pub_date_after=now + timedelta(1)) == []
+        assert len(search('dragon', pub_date_before=now + timedelta(1))) == 4
+        corpus['second'].request_deletion()
+        assert corpus['other'].pk not in [
+            row['id'] for row in search('dragon', kind='review')
+        ], 'Проверьте, что отзывы скрытых произведений не находятся'
+        corpus['bob'].request_deletion()
+        assert search('dragon', author='bob') == [], (
+            'Проверьте, что записи удаляемых пользователей не находятся'
+        )
+
+    def test_comments_on_pending_authors_reviews(self, corpus):
+        corpus['alice'].request_deletion()
+        assert search('dragon', kind='comment') == [], (
+            'Проверьте, что комментарии к отзывам удаляемых пользователей '
+            'не находятся'
+        )
+
+    def test_cursor(self, corpus):
+        client = APIClient()
+        url = reverse('api:search') + '?q=dragon&limit=2'
+        pages = []
+        while url:
+            response = client.get(url)
+            assert response.status_code == 200
+            pages.append(response.json()['results'])
+            url = response.json()['next']
+        found = [(row['type'], row['id']) for page in pages for row in page]
+        assert [len(page) for page in pages] == [2, 2, 0]
+        assert found == ids(search('dragon', limit=10)), (
+            'Проверьте, что страницы по курсору идут в порядке '
+            'релевантности без пропусков и повторов'
+        )
+        assert client.get(reverse('api:search'),
+                          {'q': 'dragon', 'cursor': 'garbage'}
+                          ).status_code == 404
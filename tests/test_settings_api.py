@@ -0,0 +1,77 @@
+import subprocess
+import sys
+
+import pytest
+from django.conf import settings
+from django.test import override_settings
+from django.urls import Resolver404, resolve, reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from users.models import User
+
+from api_yamdb import settings_api
+
+
+@pytest.fixture
+def api_profile(tmp_path):
+    """Middleware, URLconf и DRF профиля воркеров API."""
+    with override_settings(
+        MIDDLEWARE=settings_api.MIDDLEWARE,
+        ROOT_URLCONF=settings_api.ROOT_URLCONF,
+        REST_FRAMEWORK=settings_api.REST_FRAMEWORK,
+        PROFILING_ENABLED=True,
+        PROFILING_ROOT=str(tmp_path),
+    ):
+        yield
+
+
+class TestApiProfile:
+
+    def test_stack(self):
+        for name in ('django.contrib.sessions', 'django.contrib.admin'):
+            assert name not in settings_api.INSTALLED_APPS
+        assert not any(
+            'csrf' in middleware or 'sessions' in middleware
+            for middleware in settings_api.MIDDLEWARE
+        ), 'Проверьте, что профиль API не подключает сессии и CSRF'
+        assert settings_api.REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] == [
+            'rest_framework.renderers.JSONRenderer'
+        ]
+        assert resolve('/api/v1/titles/', settings_api.ROOT_URLCONF)
+        with pytest.raises(Resolver404):
+            resolve('/admin/', settings_api.ROOT_URLCONF)
+
+    def test_system_checks(self):
+        process = subprocess.run(
+            (sys.executable, 'manage.py', 'check',
+             '--settings', 'api_yamdb.settings_api'),
+            cwd=settings.BASE_DIR, stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT, universal_newlines=True,
+        )
+        assert process.returncode == 0, process.stdout
+
+    @pytest.mark.django_db
+    def test_requests(self, api_profile):
+        admin = User.objects.create(username='admin', email='admin@yamdb.com',
+                                    role='admin')
+        client = APIClient(enforce_csrf_checks=True)
+        url = reverse('api:categories-list')
+        response = client.get(url, {'profile': 'cprofile'})
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/json'
+        assert 'X-Profile-Id' not in response
+        assert client.post(url, {'name': 'A', 'slug': 'a'}).status_code == 401
+        client.credentials(
+            HTTP_AUTHORIZATION=(
+                f'Bearer {RefreshToken.for_user(admin).access_token}'
+            )
+        )
+        response = client.post(url + '?profile=cprofile',
+                               {'name': 'A', 'slug': 'a'})
+        assert response.status_code == 201, (
+            'Проверьте, что запросы с JWT работают без middleware сессий'
+        )
+        assert 'X-Profile-Id' in response, (
+            'Проверьте, что профилирование администратора работает '
+            'без AuthenticationMiddleware'
+        )
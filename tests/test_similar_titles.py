@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+from django.core.management import call_command
+from reviews.management.commands import compute_similar_titles
+from reviews.management.commands.compute_similar_titles import (
+    affected_titles, build_matrix, top_similar)
+from reviews.models import Review, SimilarTitle, StaleSimilarity, Title
+from users.models import User
+
+# (author_id, title_id, score). Векторы произведений по пользователям
+# 1, 2, 3: 1 -> (5, 3, 0), 2 -> (5, 3, 0), 3 -> (0, 4, 4), 4 -> (0, 0, 2).
+RATINGS = np.array([
+    (1, 1, 5), (1, 2, 5), (2, 1, 3), (2, 2, 3), (2, 3, 4), (3, 3, 4),
+    (3, 4, 2),
+])
+
+
+def by_title(rows):
+    result = {}
+    for title, other, score in rows:
+        result.setdefault(title, []).append((other, pytest.approx(score)))
+    return result
+
+
+class TestTopSimilar:
+
+    def test_cosine(self):
+        title_ids, matrix = build_matrix(RATINGS, adjusted=False)
+        result = by_title(top_similar(
+            matrix, title_ids, np.arange(len(title_ids)), top_k=2
+        ))
+        similarity_13 = 12 / (34 ** 0.5 * 32 ** 0.5)
+        assert result[1] == [(2, 1.0), (3, similarity_13)], (
+            'Проверьте, что похожие упорядочены по косинусному сходству '
+            'и само произведение исключено'
+        )
+        assert result[4] == [(3, 2 ** -0.5)], (
+            'Проверьте, что пары с нулевым сходством не сохраняются'
+        )
+
+    def test_blocks(self, monkeypatch):
+        title_ids, matrix = build_matrix(RATINGS, adjusted=False)
+        targets = np.arange(len(title_ids))
+        expected = list(top_similar(matrix, title_ids, targets, top_k=3))
+        monkeypatch.setattr(compute_similar_titles, 'BLOCK_CELLS', 1)
+        assert list(top_similar(matrix, title_ids, targets, top_k=3)) == (
+            expected
+        ), 'Проверьте, что расчет блоками не меняет результат'
+
+    def test_single_title(self):
+        title_ids, matrix = build_matrix(np.array([(1, 1, 5)]), False)
+        assert list(top_similar(matrix, title_ids, np.arange(1), 5)) == []
+
+
+@pytest.mark.django_db
+class TestAffectedTitles:
+
+    def test_affected(self):
+        titles = {
+            number: Title.objects.create(id=number, name=str(number),
+                                         year=2000)
+            for number in range(1, 6)
+        }
+        SimilarTitle.objects.create(title=titles[5], similar=titles[4],
+                                    score=0.5)
+        title_ids, matrix = build_matrix(RATINGS, adjusted=False)
+        affected = title_ids[affected_titles(matrix, title_ids, {4, 99})]
+        assert affected.tolist() == [3, 4], (
+            'Проверьте, что затронуты измененное произведение и имеющие '
+            'с ним общих рецензентов, а неизвестные id пропускаются'
+        )
+        titles_ids = np.append(title_ids, 5)
+        affected = titles_ids[affected_titles(matrix, titles_ids, {4})]
+        assert 5 in affected.tolist(), (
+            'Проверьте, что затронуты произведения, ссылавшиеся '
+            'на измененное в прошлом расчете'
+        )
+
+
+@pytest.mark.django_db
+class TestStaleMarks:
+
+    def test_marks_during_run_survive(self, monkeypatch):
+        author = User.objects.create(username='author',
+                                     email='author@yamdb.com')
+        first, second = (Title.objects.create(name=name, year=2000)
+                         for name in ('First', 'Second'))
+        for title in (first, second):
+            Review.objects.create(author=author, title=title, text='text',
+                                  score=5)
+        original = compute_similar_titles.top_similar
+
+        def top_similar_with_write(*args, **kwargs):
+            # Отзыв, сохраненный другим процессом во время расчета.
+            StaleSimilarity.objects.create(title=first.pk)
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(compute_similar_titles, 'top_similar',
+                            top_similar_with_write)
+        call_command('compute_similar_titles', incremental=True)
+        assert list(
+            StaleSimilarity.objects.values_list('title', flat=True)
+        ) == [first.pk], (
+            'Проверьте, что расчет удаляет только прочитанные отметки'
+        )
+        assert SimilarTitle.objects.filter(title=first,
+                                           similar=second).exists()
@@ -0,0 +1,115 @@
+import pytest
+from api.slow_queries import SlowQueryLog, capture, digest, normalize
+from django.urls import reverse
+from rest_framework.test import APIClient
+from reviews.models import Category, Genre, Title
+from users.models import User
+
+# Порог для проверки запросов в тестах и отпечатки запросов, которые
+# заведомо его превышают. Новый отпечаток в прогоне - повод
+# посмотреть план запроса в сообщении теста.
+TEST_THRESHOLD_MS = 50
+KNOWN_SLOW = ()
+
+
+@pytest.fixture
+def admin():
+    return User.objects.create(username='admin', email='admin@yamdb.com',
+                               role='admin')
+
+
+@pytest.fixture
+def titles():
+    category = Category.objects.create(name='Category', slug='category')
+    genre = Genre.objects.create(name='Genre', slug='genre')
+    titles = [
+        Title.objects.create(name=f'Title {number}', year=2000 + number,
+                             category=category)
+        for number in range(3)
+    ]
+    for title in titles:
+        title.genre.set([genre])
+    return titles
+
+
+def title_requests(client):
+    url = reverse('api:titles-list')
+    for params in ({}, {'ordering': '-rating'}, {'ordering': 'year'},
+                   {'genre': 'genre'}, {'category': 'category'},
+                   {'year__gte': 2001}, {'rating__gte': 5}):
+        assert client.get(url, params).status_code == 200
+
+
+class TestNormalize:
+
+    def test_fingerprint_ignores_values(self):
+        first = normalize(
+            "SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'a' "
+            'LIMIT 20'
+        )
+        second = normalize(
+            "SELECT *  FROM t\nWHERE id IN (%s) AND name = 'it''s' LIMIT 5"
+        )
+        assert first == second == (
+            'SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?'
+        ), (
+            'Проверьте, что отпечаток не зависит от литералов, длины '
+            'списка IN и пробелов'
+        )
+        assert digest(first) == digest(second)
+        assert normalize('SELECT t1.id FROM t1') == 'SELECT t1.id FROM t1'
+
+
+@pytest.mark.django_db
+class TestSlowQueries:
+
+    def test_endpoint(self, settings, admin, titles):
+        settings.SLOW_QUERY_THRESHOLD_MS = 0
+        settings.SLOW_QUERY_EXPLAIN = True
+        client = APIClient()
+        client.force_authenticate(admin)
+        url = reverse('api:slow-queries-list')
+        client.post(reverse('api:slow-queries-reset'))
+        assert client.get(reverse('api:titles-list')).status_code == 200
+        entries = [
+            entry for entry in client.get(url).json()
+            if 'GET api:titles-list' in entry['origins']
+        ]
+        assert entries, (
+            'Проверьте, что медленные запросы записываются вместе '
+            'с представлением, которое их выполнило'
+        )
+        assert all(
+            entry['plan'] for entry in entries
+            if entry['sql'].startswith('SELECT')
+        ), 'Проверьте, что для запросов SELECT сохраняется план'
+        response = client.post(reverse('api:slow-queries-reset'))
+        assert response.status_code == 204
+        assert all(
+            'GET api:titles-list' not in entry['origins']
+            for entry in client.get(url).json()
+        )
+        user = User.objects.create(username='user', email='user@yamdb.com')
+        client.force_authenticate(user)
+        assert client.get(url).status_code == 403
+
+    def test_bounded_table(self, titles):
+        with capture(SlowQueryLog(threshold_ms=0, max_entries=2)) as log:
+            title_requests(APIClient())
+        assert len(log.list()) == 2, (
+            'Проверьте, что таблица хранит не больше '
+            'SLOW_QUERY_MAX_ENTRIES отпечатков'
+        )
+
+    def test_new_fingerprints_fail(self, titles):
+        with capture(SlowQueryLog(threshold_ms=0, explain=True)) as log:
+            title_requests(APIClient())
+        with pytest.raises(AssertionError, match='GET api:titles-list'):
+            log.assert_no_new()
+        log.assert_no_new(entry['fingerprint'] for entry in log.list())
+
+    def test_title_queries_are_not_slow(self, titles):
+        with capture(SlowQueryLog(threshold_ms=TEST_THRESHOLD_MS,
+                                  explain=True)) as log:
+            title_requests(APIClient())
+        log.assert_no_new(KNOWN_SLOW)
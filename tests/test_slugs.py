@@ -0,0 +1,66 @@
+import pytest
+from reviews import slugs
+from reviews.models import Category
+from reviews.slugs import SlugMap
+
+
+@pytest.fixture
+def clock(monkeypatch, settings):
+    settings.SLUG_CACHE_CHECK_SECONDS = 1
+    now = [100.0]
+    monkeypatch.setattr(slugs, 'monotonic', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def slug_map(clock):
+    Category.objects.create(name='Movie', slug='movie')
+    return SlugMap(Category)
+
+
+@pytest.mark.django_db
+class TestSlugMap:
+
+    def test_known_slugs_are_cached(self, slug_map, clock,
+                                    django_assert_num_queries):
+        pk = Category.objects.get().pk
+        with django_assert_num_queries(1):
+            assert slug_map.resolve(['movie']) == {'movie': pk}
+        clock[0] += 5
+        with django_assert_num_queries(0):
+            slug_map.resolve(['movie'])
+
+    def test_unknown_slugs_reload_once_per_interval(
+        self, slug_map, clock, django_assert_num_queries
+    ):
+        slug_map.resolve(['movie'])
+        with django_assert_num_queries(0):
+            for number in range(100):
+                assert slug_map.resolve([f'garbage{number}']) == {}, (
+                    'Проверьте, что несуществующие slug не перезагружают '
+                    'справочник на каждый запрос'
+                )
+        book = Category.objects.create(name='Book', slug='book')
+        clock[0] += 1
+        with django_assert_num_queries(1):
+            assert slug_map.resolve(['book']) == {'book': book.pk}, (
+                'Проверьте, что после интервала промах перезагружает '
+                'справочник'
+            )
+
+    def test_version_change(self, slug_map, clock,
+                            django_assert_num_queries):
+        slug_map.resolve(['movie'])
+        book = Category.objects.create(name='Book', slug='book')
+        # Категория создана в другом воркере: он опубликовал версию.
+        slugs.get_channel().publish(slug_map.key)
+        assert slug_map.resolve(['book']) == {'book': book.pk}, (
+            'Проверьте, что промах сверяет версию в канале без ожидания '
+            'интервала'
+        )
+        Category.objects.filter(slug='movie').delete()
+        slugs.get_channel().publish(slug_map.key)
+        clock[0] += 1
+        assert slug_map.resolve(['movie']) == {}, (
+            'Проверьте, что удаление видно после проверки версии'
+        )
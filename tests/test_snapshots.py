@@ -0,0 +1,89 @@
+import pytest
+from django.apps import apps
+from django.contrib.admin.models import ADDITION, LogEntry
+from django.core.management import call_command
+from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.snapshots import references, snapshot_models
+from users.models import User
+
+
+@pytest.mark.django_db
+class TestSnapshots:
+
+    def test_snapshot_restore(self, tmp_path):
+        genre = Genre.objects.create(name='Драма', slug='drama')
+        title = Title.objects.create(name='Title', year=2000,
+                                     description=None)
+        title.genre.add(genre)
+        author = User.objects.create(username='author',
+                                     email='author@yamdb.com',
+                                     bio='строка\tс табуляцией\nи \\')
+        review = Review.objects.create(author=author, title=title,
+                                       text='text', score=7)
+        Comment.objects.create(author=author, review=review, text='')
+        path = str(tmp_path / 'snapshot.zip')
+        call_command('snapshot_data', path)
+
+        review.delete()
+        User.objects.create(username='other', email='other@yamdb.com')
+        title.genre.clear()
+        call_command('restore_data', path)
+
+        author = User.objects.get()
+        assert author.bio == 'строка\tс табуляцией\nи \\', (
+            'Проверьте, что снимок сохраняет спецсимволы в тексте'
+        )
+        assert author.is_active is True
+        assert (author.reviews_count, author.comments_count) == (1, 1)
+        assert Review.objects.get().score == 7
+        assert Comment.objects.get().text == '', (
+            'Проверьте, что пустая строка не превращается в NULL'
+        )
+        title = Title.objects.get()
+        assert title.description is None
+        assert list(title.genre.all()) == [genre]
+        category = Category.objects.create(name='Новая', slug='new')
+        assert category.pk == 1, (
+            'Проверьте, что восстановление сбрасывает последовательности'
+        )
+
+    def test_referencing_models_are_included(self):
+        models = set(snapshot_models())
+        assert LogEntry in models
+        for model in apps.get_models(include_auto_created=True):
+            if model not in models:
+                assert not references(model) & models, (
+                    f'Проверьте, что {model._meta.label} ссылается на '
+                    'таблицы снимка и очищается вместе с ними'
+                )
+
+    def test_restore_with_admin_log(self, tmp_path):
+        author = User.objects.create(username='author',
+                                     email='author@yamdb.com')
+        LogEntry.objects.log_action(author.pk, None, None, 'author',
+                                    ADDITION)
+        path = str(tmp_path / 'snapshot.zip')
+        call_command('snapshot_data', path)
+        LogEntry.objects.all().delete()
+        User.objects.all().delete()
+        call_command('restore_data', path)
+        assert LogEntry.objects.get().user == User.objects.get()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_restore_in_own_transaction(self, tmp_path):
+        # Без транзакции теста восстановление выполняется в собственной
+        # транзакции, как команда restore_data.
+        author = User.objects.create(username='author',
+                                     email='author@yamdb.com')
+        title = Title.objects.create(name='Title', year=2000)
+        review = Review.objects.create(author=author, title=title,
+                                       text='text', score=7)
+        Comment.objects.create(author=author, review=review, text='text')
+        path = str(tmp_path / 'snapshot.zip')
+        call_command('snapshot_data', path)
+        Review.objects.all().delete()
+        call_command('restore_data', path)
+        assert (Review.objects.count(), Comment.objects.count()) == (1, 1), (
+            'Проверьте, что снимок со строками восстанавливается '
+            'в отдельной транзакции'
+        )
@@ -0,0 +1,78 @@
+import time
+
+import pytest
+from api.models import ThrottleBucket
+from api.throttling import SignupThrottle, take_tokens
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def signup_rate(monkeypatch, settings):
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+    monkeypatch.setattr(SignupThrottle, 'THROTTLE_RATES',
+                        {'signup': '2/min'})
+    clock = [1000.0]
+    monkeypatch.setattr(SignupThrottle, 'timer', lambda self: clock[0])
+    return clock
+
+
+def signup(username, ip, data=None):
+    return APIClient().post(
+        reverse('api:signup'),
+        data if data is not None else {
+            'username': username, 'email': f'{username}@yamdb.com'
+        },
+        format='json', REMOTE_ADDR=ip
+    )
+
+
+@pytest.mark.django_db
+class TestThrottling:
+
+    def test_username_limit_across_ips(self, signup_rate):
+        statuses = [signup('victim', f'10.0.0.{number}').status_code
+                    for number in range(3)]
+        assert statuses == [200, 200, 429], (
+            'Проверьте, что регистрация ограничивается по username '
+            'независимо от IP'
+        )
+        signup_rate[0] += 30
+        assert signup('victim', '10.0.1.1').status_code == 200, (
+            'Проверьте, что токены восстанавливаются со временем'
+        )
+        assert signup('victim', '10.0.1.2').status_code == 429
+
+    def test_flood_does_not_reset_buckets(self, signup_rate):
+        for number in range(2):
+            signup('victim', f'10.0.0.{number}')
+        for number in range(50):
+            signup(f'flood{number}', f'10.1.0.{number}')
+        assert signup('victim', '10.2.0.1').status_code == 429, (
+            'Проверьте, что запросы с другими ключами не вытесняют '
+            'исчерпанную корзину'
+        )
+
+    def test_non_object_body(self, signup_rate):
+        for data in ([1, 2], 'text'):
+            assert signup(None, '10.0.0.1', data).status_code == 400, (
+                f'Проверьте, что тело {data!r} отклоняется с кодом 400'
+            )
+
+    def test_all_or_nothing(self):
+        assert take_tokens(['b'], 1, 60, 0.0) == 0.0
+        assert take_tokens(['a', 'b'], 1, 60, 0.0) == pytest.approx(60)
+        assert ThrottleBucket.objects.get(key='a').tokens == 1, (
+            'Проверьте, что при отказе токены других корзин не списываются'
+        )
+        assert take_tokens(['a'], 1, 60, 0.0) == 0.0
+
+    def test_purge(self):
+        now = time.time()
+        take_tokens(['old'], 5, 60, now - 2 * 24 * 60 * 60)
+        take_tokens(['recent'], 5, 60, now)
+        call_command('purge_throttle')
+        assert list(ThrottleBucket.objects.values_list('key', flat=True)) == [
+            'recent'
+        ]
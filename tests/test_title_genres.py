@@ -0,0 +1,90 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from reviews.models import Genre, Review, Title
+from users.models import User
+
+
+@pytest.fixture
+def titles():
+    drama = Genre.objects.create(name='Драма', slug='drama')
+    comedy = Genre.objects.create(name='Комедия', slug='comedy')
+    first = Title.objects.create(name='First', year=2000)
+    first.genre.add(comedy, drama)
+    second = Title.objects.create(name='Second', year=2000)
+    second.genre.add(drama)
+    return first, second, drama, comedy
+
+
+@pytest.mark.django_db
+class TestTitleGenres:
+
+    def test_genres_output(self, client, titles):
+        first, second, drama, comedy = titles
+        response = client.get(reverse('api:titles-detail', args=(first.pk,)))
+        assert response.json()['genre'] == [
+            {'name': 'Драма', 'slug': 'drama'},
+            {'name': 'Комедия', 'slug': 'comedy'},
+        ], 'Проверьте формат и порядок жанров произведения'
+        assert 'genres' not in response.json()
+        response = client.get(reverse('api:titles-list'), {'genre': 'comedy'})
+        assert [item['id'] for item in response.json()['results']] == [
+            first.pk
+        ]
+
+    def test_genres_sync(self, titles):
+        first, second, drama, comedy = titles
+        drama.name = 'Трагедия'
+        drama.save()
+        second.refresh_from_db()
+        assert second.genres == [{'name': 'Трагедия', 'slug': 'drama'}], (
+            'Проверьте, что переименование жанра обновляет произведения'
+        )
+        comedy.titles.add(second)
+        first.genre.remove(comedy)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert first.genres == [{'name': 'Трагедия', 'slug': 'drama'}]
+        assert len(second.genres) == 2
+        drama.delete()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert first.genres == [], (
+            'Проверьте, что удаление жанра обновляет произведения'
+        )
+        assert second.genres == [{'name': 'Комедия', 'slug': 'comedy'}]
+        comedy.titles.clear()
+        second.refresh_from_db()
+        assert second.genres == []
+
+    def test_list_queries(self, client, titles):
+        url = reverse('api:titles-list')
+        client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+        assert len(queries) == 2, (
+            'Проверьте, что список произведений не запрашивает жанры '
+            'отдельным запросом'
+        )
+
+    def test_stale_save_keeps_denormalized_fields(self, titles):
+        first, second, drama, comedy = titles
+        stale = Title.objects.get(pk=second.pk)
+        second.genre.add(comedy)
+        author = User.objects.create(username='author',
+                                     email='author@yamdb.com')
+        Review.objects.create(author=author, title=second, text='text',
+                              score=8)
+        stale.name = 'Renamed'
+        stale.save()
+        second.refresh_from_db()
+        assert second.name == 'Renamed'
+        assert second.rating == 8, (
+            'Проверьте, что save() произведения, прочитанного до нового '
+            'отзыва, не перезаписывает рейтинг'
+        )
+        assert len(second.genres) == 2, (
+            'Проверьте, что save() произведения, прочитанного до изменения '
+            'жанров, не перезаписывает genres'
+        )
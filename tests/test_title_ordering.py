@@ -0,0 +1,130 @@
+import pytest
+from api.filters import TITLE_ORDERINGS, TitleFilter
+from api.views import TitleViewSet
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from reviews.counters import recount_title_ratings
+from reviews.models import Category, Review, Title
+from users.models import User
+
+sqlite_only = pytest.mark.skipif(
+    connection.vendor != 'sqlite',
+    reason='Проверка плана запроса написана для SQLite'
+)
+
+
+@pytest.fixture
+def titles():
+    category = Category.objects.create(name='Книги', slug='books')
+    titles = [
+        Title.objects.create(name=name, year=year, category=category)
+        for name, year in (('B', 2001), ('A', 2003), ('C', 2002))
+    ]
+    for number, scores in enumerate(((9, 8), (4,), ())):
+        for score in scores:
+            author, _ = User.objects.get_or_create(
+                username=f'author{score}', email=f'author{score}@yamdb.com'
+            )
+            Review.objects.create(author=author, title=titles[number],
+                                  text='text', score=score)
+    return titles
+
+
+@pytest.mark.django_db
+class TestTitleOrdering:
+
+    def test_rating_is_maintained(self, titles):
+        first, second, third = titles
+        assert [Title.objects.get(pk=title.pk).rating
+                for title in titles] == [8.5, 4.0, None]
+        review = Review.objects.get(title=first, score=9)
+        review.score = 1
+        review.save()
+        first.refresh_from_db()
+        assert first.rating == 4.5, (
+            'Проверьте, что рейтинг пересчитывается при изменении оценки'
+        )
+        Review.objects.get(title=first, score=8).delete()
+        first.refresh_from_db()
+        assert (first.rating, first.rating_sum, first.rating_count) == (
+            1.0, 1, 1
+        ), 'Проверьте, что рейтинг пересчитывается при удалении отзыва'
+        review.title = second
+        review.save()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert (first.rating, first.rating_count) == (None, 0)
+        assert (second.rating_sum, second.rating_count) == (5, 2), (
+            'Проверьте, что перенос отзыва меняет оценки обоих произведений'
+        )
+
+    def test_rating_deltas(self, titles):
+        review = Review.objects.get(score=9)
+        review.text = 'Updated'
+        with CaptureQueriesContext(connection) as context:
+            review.save()
+        assert not any(
+            Title._meta.db_table in query['sql']
+            for query in context.captured_queries
+        ), 'Проверьте, что изменение текста отзыва не трогает произведение'
+        review.score = 10
+        with CaptureQueriesContext(connection) as context:
+            review.save()
+        assert not any(
+            'AVG' in query['sql'].upper() for query in context.captured_queries
+        ), 'Проверьте, что рейтинг обновляется без пересчета по отзывам'
+        titles[0].refresh_from_db()
+        assert titles[0].rating == 9.0
+        assert recount_title_ratings(Title, Review) == 0, (
+            'Проверьте, что сумма и количество оценок совпадают '
+            'с пересчетом по отзывам'
+        )
+
+    def test_ordering_and_ranges(self, client, titles):
+        url = reverse('api:titles-list')
+        cases = (
+            ({'ordering': '-rating'}, ['B', 'A', 'C']),
+            ({'ordering': 'rating'}, ['C', 'A', 'B']),
+            ({'ordering': '-year'}, ['A', 'C', 'B']),
+            ({'ordering': 'name', 'category': 'books'}, ['A', 'B', 'C']),
+            ({'ordering': 'year', 'year__gte': 2002}, ['C', 'A']),
+            ({'rating__gte': 8, 'rating__lte': 8}, ['B']),
+        )
+        for params, names in cases:
+            response = client.get(url, params)
+            assert [title['name'] for title in response.json()['results']] \
+                == names, f'Проверьте фильтрацию и сортировку {params}'
+        assert response.json()['results'][0]['rating'] == 8
+
+    def test_rejected_orderings(self, client, titles):
+        url = reverse('api:titles-list')
+        for params in ({'ordering': 'year,name'},
+                       {'ordering': 'description'},
+                       {'ordering': '-rating', 'genre': 'drama'},
+                       {'ordering': 'rating', 'year__gte': 2000}):
+            assert client.get(url, params).status_code == 400, (
+                f'Проверьте, что сортировка {params} без индекса отклоняется'
+            )
+
+    @sqlite_only
+    def test_orderings_use_indexes(self, titles):
+        combinations = [{'ordering': value} for value in TITLE_ORDERINGS]
+        combinations += [
+            {'ordering': value, 'category': 'books'}
+            for value in TITLE_ORDERINGS
+        ]
+        combinations += [
+            {'ordering': '-rating', 'rating__gte': 5, 'name': 'A'},
+            {'ordering': 'year', 'year__gte': 2000, 'year__lte': 2010},
+        ]
+        for params in combinations:
+            filterset = TitleFilter(params, queryset=TitleViewSet.queryset)
+            assert filterset.is_valid(), filterset.errors
+            plan = filterset.qs[:5].explain()
+            assert 'USING INDEX title_' in plan, (
+                f'Проверьте, что для {params} используется индекс: {plan}'
+            )
+            assert 'TEMP B-TREE' not in plan, (
+                f'Проверьте, что {params} не сортирует выборку: {plan}'
+            )
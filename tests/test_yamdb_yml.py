@@ -48,3 +48,14 @@ class TestWorkflow:
             'Проверьте, что настроили отправку telegram сообщения '
             f'в файл {filename}'
         )
+
+    def test_github_workflow_matches(self):
+        with open(os.path.join(root_dir, 'yamdb_workflow.yml')) as f:
+            workflow = f.read()
+        github = os.path.join(root_dir, '.github', 'workflows',
+                              'yamdb_workflow.yml')
+        with open(github) as f:
+            assert f.read() == workflow, (
+                'Проверьте, что .github/workflows/yamdb_workflow.yml '
+                'совпадает с yamdb_workflow.yml: GitHub запускает его'
+            )